@@ -0,0 +1,41 @@
+"""add card name lookup indexes
+
+Revision ID: 2b7d4c1e9a30
+Revises: fb9f077c5d40
+Create Date: 2026-10-19 09:12:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b7d4c1e9a30'
+down_revision: Union[str, None] = 'fb9f077c5d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Exact lookups by normalized full name and by front face ("Fire // Ice" -> "fire").
+    op.create_index('ix_card_definitions_lower_name', 'card_definitions', [sa.text('lower(name)')])
+    op.create_index('ix_card_definitions_lower_front_name', 'card_definitions', [sa.text("lower(split_part(name, ' // ', 1))")])
+    # Trigram index for fuzzy fallback on typos.
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_card_definitions_lower_name_trgm', 'card_definitions', [sa.text('lower(name) gin_trgm_ops')],
+        postgresql_using='gin',
+    )
+    # Set/collector number lookups from imports.
+    op.create_index('ix_card_definitions_set_code_collector_number', 'card_definitions', ['set_code', 'collector_number'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_card_definitions_set_code_collector_number', table_name='card_definitions')
+    op.drop_index('ix_card_definitions_lower_name_trgm', table_name='card_definitions')
+    op.drop_index('ix_card_definitions_lower_front_name', table_name='card_definitions')
+    op.drop_index('ix_card_definitions_lower_name', table_name='card_definitions')
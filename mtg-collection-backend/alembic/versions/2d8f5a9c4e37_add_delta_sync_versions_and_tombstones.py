@@ -0,0 +1,63 @@
+"""add delta sync versions and tombstones
+
+Revision ID: 2d8f5a9c4e37
+Revises: 9e4b2d7c1a58
+Create Date: 2026-10-19 17:48:20.671394
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d8f5a9c4e37'
+down_revision: Union[str, None] = '9e4b2d7c1a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_collection_entries', sa.Column('change_version', sa.BigInteger(), nullable=True))
+    op.add_column('decks', sa.Column('change_version', sa.BigInteger(), nullable=True))
+    op.add_column('deck_entries', sa.Column('change_version', sa.BigInteger(), nullable=True))
+    op.create_table(
+        'sync_tombstones',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('change_version', sa.BigInteger(), nullable=True),
+        sa.Column('date_deleted', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+    # Existing rows are stamped with a fresh version, so a first sync (since=0) returns them all
+    op.execute("UPDATE users SET collection_version = collection_version + 1, deck_version = deck_version + 1")
+    op.execute("""
+        UPDATE user_collection_entries e SET change_version = u.collection_version
+        FROM users u WHERE u.id = e.user_id
+    """)
+    op.execute("UPDATE decks d SET change_version = u.deck_version FROM users u WHERE u.id = d.user_id")
+    op.execute("UPDATE deck_entries e SET change_version = d.change_version FROM decks d WHERE d.id = e.deck_id")
+
+    # Changes since a version, and the unstamped (NULL) rows of a write
+    op.create_index('ix_user_collection_entries_user_id_change_version', 'user_collection_entries', ['user_id', 'change_version'])
+    op.create_index('ix_decks_user_id_change_version', 'decks', ['user_id', 'change_version'])
+    op.create_index('ix_deck_entries_deck_id_change_version', 'deck_entries', ['deck_id', 'change_version'])
+    op.create_index('ix_sync_tombstones_user_id_change_version', 'sync_tombstones', ['user_id', 'change_version'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sync_tombstones_user_id_change_version', table_name='sync_tombstones')
+    op.drop_index('ix_deck_entries_deck_id_change_version', table_name='deck_entries')
+    op.drop_index('ix_decks_user_id_change_version', table_name='decks')
+    op.drop_index('ix_user_collection_entries_user_id_change_version', table_name='user_collection_entries')
+    op.drop_table('sync_tombstones')
+    op.drop_column('deck_entries', 'change_version')
+    op.drop_column('decks', 'change_version')
+    op.drop_column('user_collection_entries', 'change_version')
@@ -0,0 +1,68 @@
+"""add deck validation columns to card features
+
+Revision ID: 3f7a9c2d5e18
+Revises: 8b2e6f4a1c93
+Create Date: 2026-10-19 15:12:44.903162
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7a9c2d5e18'
+down_revision: Union[str, None] = '8b2e6f4a1c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# card_features.FORMATS as of this revision; bit i is FORMATS[i]
+FORMATS = (
+    "standard", "future", "historic", "timeless", "gladiator", "pioneer", "explorer",
+    "modern", "legacy", "pauper", "vintage", "penny", "commander", "oathbreaker",
+    "standardbrawl", "brawl", "alchemy", "paupercommander", "duel", "oldschool",
+    "premodern", "predh",
+)
+
+
+def _status_mask_sql(status: str) -> str:
+    return " | ".join(
+        f"(CASE WHEN c.legalities ->> '{fmt}' = '{status}' THEN {1 << i} ELSE 0 END)"
+        for i, fmt in enumerate(FORMATS)
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('card_features', sa.Column('legal_mask', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('card_features', sa.Column('restricted_mask', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('card_features', sa.Column('unlimited_copies', sa.Boolean(), server_default='false', nullable=False))
+    op.add_column('card_features', sa.Column('copy_limit', sa.SmallInteger(), nullable=True))
+    op.add_column('card_features', sa.Column('can_be_commander', sa.Boolean(), server_default='false', nullable=False))
+    # Fill the masks and flags for existing rows; scripts/refresh_card_features.py computes the
+    # same values (copy_limit included) from app/card_features.py
+    op.execute(f"""
+        UPDATE card_features AS f
+        SET legal_mask = {_status_mask_sql('legal')},
+            restricted_mask = {_status_mask_sql('restricted')},
+            unlimited_copies = (
+                split_part(split_part(COALESCE(c.type_line, ''), '//', 1), '—', 1) ILIKE '%basic%'
+                OR COALESCE(c.oracle_text, '') ILIKE '%a deck can have any number of cards named%'
+            ),
+            can_be_commander = (
+                split_part(split_part(COALESCE(c.type_line, ''), '//', 1), '—', 1) ILIKE '%legendary%creature%'
+                OR COALESCE(c.oracle_text, '') ILIKE '%can be your commander%'
+            )
+        FROM card_definitions AS c
+        WHERE c.id = f.card_definition_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('card_features', 'can_be_commander')
+    op.drop_column('card_features', 'copy_limit')
+    op.drop_column('card_features', 'unlimited_copies')
+    op.drop_column('card_features', 'restricted_mask')
+    op.drop_column('card_features', 'legal_mask')
@@ -0,0 +1,50 @@
+"""add price and collection value history
+
+Revision ID: 4a6e1c8d2b95
+Revises: 2d8f5a9c4e37
+Create Date: 2026-10-19 18:21:06.145832
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a6e1c8d2b95'
+down_revision: Union[str, None] = '2d8f5a9c4e37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Partitioned by year; app/value_history.py creates each year's partition on first use
+    op.create_table(
+        'card_price_history',
+        sa.Column('card_definition_id', sa.Integer(), nullable=False),
+        sa.Column('price_date', sa.Date(), nullable=False),
+        sa.Column('usd_cents', sa.Integer(), nullable=True),
+        sa.Column('usd_foil_cents', sa.Integer(), nullable=True),
+        sa.Column('eur_cents', sa.Integer(), nullable=True),
+        sa.Column('eur_foil_cents', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['card_definition_id'], ['card_definitions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('card_definition_id', 'price_date'),
+        postgresql_partition_by='RANGE (price_date)',
+    )
+    op.create_table(
+        'user_collection_value_history',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('value_date', sa.Date(), nullable=False),
+        sa.Column('value_usd_cents', sa.BigInteger(), nullable=False),
+        sa.Column('value_eur_cents', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'value_date'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_collection_value_history')
+    op.drop_table('card_price_history') # Drops its partitions too
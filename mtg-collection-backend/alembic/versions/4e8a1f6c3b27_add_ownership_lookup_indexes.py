@@ -0,0 +1,33 @@
+"""add ownership lookup indexes
+
+Revision ID: 4e8a1f6c3b27
+Revises: 9c41e07a5d2f
+Create Date: 2026-10-19 10:31:42.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8a1f6c3b27'
+down_revision: Union[str, None] = '9c41e07a5d2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Per-card ownership lookups for card search results (include_owned=true)
+    op.create_index('ix_user_collection_entries_user_id_card_definition_id', 'user_collection_entries', ['user_id', 'card_definition_id'])
+    op.create_index('ix_deck_entries_card_definition_id_deck_id', 'deck_entries', ['card_definition_id', 'deck_id'])
+    op.create_index('ix_decks_user_id', 'decks', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_decks_user_id', table_name='decks')
+    op.drop_index('ix_deck_entries_card_definition_id_deck_id', table_name='deck_entries')
+    op.drop_index('ix_user_collection_entries_user_id_card_definition_id', table_name='user_collection_entries')
@@ -0,0 +1,38 @@
+"""add pre-serialized card json documents
+
+Revision ID: 5a0c7e3d9b61
+Revises: 7d3f9b2e6a14
+Create Date: 2026-10-19 12:03:27.641930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a0c7e3d9b61'
+down_revision: Union[str, None] = '7d3f9b2e6a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('card_definitions', sa.Column('json_full', sa.LargeBinary(), nullable=True))
+    op.add_column('card_definitions', sa.Column('json_slim', sa.LargeBinary(), nullable=True))
+    op.add_column('card_definitions', sa.Column('json_version', sa.Integer(), nullable=True))
+    op.create_index(
+        'ix_card_definitions_json_pending', 'card_definitions', ['id'],
+        postgresql_where=sa.text('json_version IS NULL'),
+    )
+    # Fill the new columns with scripts/refresh_card_documents.py
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_card_definitions_json_pending', table_name='card_definitions')
+    op.drop_column('card_definitions', 'json_version')
+    op.drop_column('card_definitions', 'json_slim')
+    op.drop_column('card_definitions', 'json_full')
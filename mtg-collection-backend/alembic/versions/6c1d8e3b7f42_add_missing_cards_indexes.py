@@ -0,0 +1,32 @@
+"""add missing cards lookup indexes
+
+Revision ID: 6c1d8e3b7f42
+Revises: 3f7a9c2d5e18
+Create Date: 2026-10-19 16:05:31.587210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c1d8e3b7f42'
+down_revision: Union[str, None] = '3f7a9c2d5e18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Cheapest printing per card name (DISTINCT ON name ORDER BY name, usd price)
+    op.create_index('ix_card_definitions_name_usd', 'card_definitions', ['name', sa.text("CAST(prices ->> 'usd' AS NUMERIC)")])
+    # A deck's entries, joined to their cards
+    op.create_index('ix_deck_entries_deck_id_card_definition_id', 'deck_entries', ['deck_id', 'card_definition_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_deck_entries_deck_id_card_definition_id', table_name='deck_entries')
+    op.drop_index('ix_card_definitions_name_usd', table_name='card_definitions')
@@ -0,0 +1,36 @@
+"""add user import progress
+
+Revision ID: 7b3f9a2e5c61
+Revises: 4a6e1c8d2b95
+Create Date: 2026-10-19 20:05:42.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3f9a2e5c61'
+down_revision: Union[str, None] = '4a6e1c8d2b95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_import_progress',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('progress', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('date_updated', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_import_progress')
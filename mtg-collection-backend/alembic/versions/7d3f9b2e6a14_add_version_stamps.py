@@ -0,0 +1,32 @@
+"""add collection and deck version stamps
+
+Revision ID: 7d3f9b2e6a14
+Revises: 4e8a1f6c3b27
+Create Date: 2026-10-19 11:12:05.904316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f9b2e6a14'
+down_revision: Union[str, None] = '4e8a1f6c3b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('collection_version', sa.BigInteger(), nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('deck_version', sa.BigInteger(), nullable=False, server_default='0'))
+    op.add_column('decks', sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('decks', 'version')
+    op.drop_column('users', 'deck_version')
+    op.drop_column('users', 'collection_version')
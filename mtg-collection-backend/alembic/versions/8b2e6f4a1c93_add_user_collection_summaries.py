@@ -0,0 +1,60 @@
+"""add user collection summaries
+
+Revision ID: 8b2e6f4a1c93
+Revises: 5a0c7e3d9b61
+Create Date: 2026-10-19 13:41:08.219574
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e6f4a1c93'
+down_revision: Union[str, None] = '5a0c7e3d9b61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_collection_summaries',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('quantity_normal', sa.BigInteger(), nullable=False),
+        sa.Column('quantity_foil', sa.BigInteger(), nullable=False),
+        sa.Column('unique_printings', sa.Integer(), nullable=False),
+        sa.Column('value_usd_normal', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('value_usd_foil', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('value_eur_normal', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('value_eur_foil', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('date_updated', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    # Summarize existing collections; afterwards every collection write keeps them current
+    op.execute("""
+        INSERT INTO user_collection_summaries (
+            user_id, quantity_normal, quantity_foil, unique_printings,
+            value_usd_normal, value_usd_foil, value_eur_normal, value_eur_foil
+        )
+        SELECT users.id,
+               COALESCE(SUM(e.quantity_normal), 0),
+               COALESCE(SUM(e.quantity_foil), 0),
+               COUNT(e.id),
+               COALESCE(SUM(e.quantity_normal * COALESCE(CAST(c.prices ->> 'usd' AS NUMERIC), 0)), 0),
+               COALESCE(SUM(e.quantity_foil * COALESCE(CAST(c.prices ->> 'usd_foil' AS NUMERIC), 0)), 0),
+               COALESCE(SUM(e.quantity_normal * COALESCE(CAST(c.prices ->> 'eur' AS NUMERIC), 0)), 0),
+               COALESCE(SUM(e.quantity_foil * COALESCE(CAST(c.prices ->> 'eur_foil' AS NUMERIC), 0)), 0)
+        FROM users
+        LEFT OUTER JOIN user_collection_entries AS e ON e.user_id = users.id
+        LEFT OUTER JOIN card_definitions AS c ON c.id = e.card_definition_id
+        GROUP BY users.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_collection_summaries')
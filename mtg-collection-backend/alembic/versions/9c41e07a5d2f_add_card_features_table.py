@@ -0,0 +1,54 @@
+"""add card_features table
+
+Revision ID: 9c41e07a5d2f
+Revises: 2b7d4c1e9a30
+Create Date: 2026-10-19 10:04:18.230557
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c41e07a5d2f'
+down_revision: Union[str, None] = '2b7d4c1e9a30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'card_features',
+        sa.Column('card_definition_id', sa.Integer, sa.ForeignKey('card_definitions.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('pips_w', sa.SmallInteger, nullable=False, server_default='0'),
+        sa.Column('pips_u', sa.SmallInteger, nullable=False, server_default='0'),
+        sa.Column('pips_b', sa.SmallInteger, nullable=False, server_default='0'),
+        sa.Column('pips_r', sa.SmallInteger, nullable=False, server_default='0'),
+        sa.Column('pips_g', sa.SmallInteger, nullable=False, server_default='0'),
+        sa.Column('pips_c', sa.SmallInteger, nullable=False, server_default='0'),
+        sa.Column('color_mask', sa.SmallInteger, nullable=False, server_default='0'),
+        sa.Column('color_identity_mask', sa.SmallInteger, nullable=False, server_default='0'),
+        sa.Column('type_flags', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('primary_type', sa.String, nullable=True),
+        sa.Column('is_land', sa.Boolean, nullable=False, server_default=sa.text('false')),
+        sa.Column('produces_mana', sa.Boolean, nullable=False, server_default=sa.text('false')),
+        sa.Column('is_ramp', sa.Boolean, nullable=False, server_default=sa.text('false')),
+        sa.Column('front_face_cmc', sa.Float, nullable=True),
+        sa.Column('date_updated', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_card_features_color_identity_mask', 'card_features', ['color_identity_mask'])
+    op.create_index('ix_card_features_type_flags', 'card_features', ['type_flags'])
+    op.create_index('ix_card_features_primary_type', 'card_features', ['primary_type'])
+    op.create_index('ix_card_features_is_land', 'card_features', ['is_land'])
+    op.create_index('ix_card_features_produces_mana', 'card_features', ['produces_mana'])
+    op.create_index('ix_card_features_is_ramp', 'card_features', ['is_ramp'])
+    op.create_index('ix_card_features_front_face_cmc', 'card_features', ['front_face_cmc'])
+    # Rows are filled by scripts/refresh_card_features.py (also run at the end of populate_cards.py).
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('card_features')
@@ -0,0 +1,87 @@
+"""unique collection and deck entries
+
+Revision ID: 9e4b2d7c1a58
+Revises: 6c1d8e3b7f42
+Create Date: 2026-10-19 17:12:44.309518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b2d7c1a58'
+down_revision: Union[str, None] = '6c1d8e3b7f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Concurrent adds could leave several entries per card: fold them into the oldest one
+    op.execute("""
+        CREATE TEMPORARY TABLE collection_duplicates ON COMMIT DROP AS
+        SELECT id, user_id, min(id) OVER (PARTITION BY user_id, card_definition_id) AS keep_id
+        FROM user_collection_entries
+    """)
+    op.execute("DELETE FROM collection_duplicates WHERE keep_id IN (SELECT keep_id FROM collection_duplicates GROUP BY keep_id HAVING count(*) = 1)")
+    op.execute("""
+        UPDATE user_collection_entries e
+        SET quantity_normal = t.quantity_normal, quantity_foil = t.quantity_foil, date_updated_in_collection = now()
+        FROM (
+            SELECT d.keep_id, sum(x.quantity_normal) AS quantity_normal, sum(x.quantity_foil) AS quantity_foil
+            FROM collection_duplicates d JOIN user_collection_entries x ON x.id = d.id
+            GROUP BY d.keep_id
+        ) t
+        WHERE e.id = t.keep_id
+    """)
+    op.execute("DELETE FROM user_collection_entries WHERE id IN (SELECT id FROM collection_duplicates WHERE id <> keep_id)")
+    # Copies are unchanged; entry counts and ETags are not
+    op.execute("""
+        UPDATE user_collection_summaries s
+        SET unique_printings = (SELECT count(*) FROM user_collection_entries e WHERE e.user_id = s.user_id), date_updated = now()
+        WHERE s.user_id IN (SELECT user_id FROM collection_duplicates)
+    """)
+    op.execute("UPDATE users SET collection_version = collection_version + 1 WHERE id IN (SELECT user_id FROM collection_duplicates)")
+
+    op.execute("UPDATE deck_entries SET is_sideboard = false WHERE is_sideboard IS NULL")
+    op.execute("""
+        CREATE TEMPORARY TABLE deck_duplicates ON COMMIT DROP AS
+        SELECT id, deck_id, min(id) OVER (PARTITION BY deck_id, card_definition_id, is_sideboard) AS keep_id
+        FROM deck_entries
+    """)
+    op.execute("DELETE FROM deck_duplicates WHERE keep_id IN (SELECT keep_id FROM deck_duplicates GROUP BY keep_id HAVING count(*) = 1)")
+    op.execute("""
+        UPDATE deck_entries e
+        SET quantity = t.quantity, is_commander = t.is_commander
+        FROM (
+            SELECT d.keep_id, sum(x.quantity) AS quantity, coalesce(bool_or(x.is_commander), false) AS is_commander
+            FROM deck_duplicates d JOIN deck_entries x ON x.id = d.id
+            GROUP BY d.keep_id
+        ) t
+        WHERE e.id = t.keep_id
+    """)
+    op.execute("DELETE FROM deck_entries WHERE id IN (SELECT id FROM deck_duplicates WHERE id <> keep_id)")
+    op.execute("UPDATE decks SET version = version + 1 WHERE id IN (SELECT deck_id FROM deck_duplicates)")
+    op.execute("""
+        UPDATE users SET deck_version = deck_version + 1
+        WHERE id IN (SELECT user_id FROM decks WHERE id IN (SELECT deck_id FROM deck_duplicates))
+    """)
+
+    op.alter_column('deck_entries', 'is_sideboard', existing_type=sa.Boolean(), nullable=False, server_default=sa.text('false'))
+    # The unique constraints' indexes replace the (user_id, card_definition_id) and (deck_id, card_definition_id) ones
+    op.create_unique_constraint('uq_user_collection_entries_user_id_card_definition_id', 'user_collection_entries', ['user_id', 'card_definition_id'])
+    op.drop_index('ix_user_collection_entries_user_id_card_definition_id', table_name='user_collection_entries')
+    op.create_unique_constraint('uq_deck_entries_deck_id_card_definition_id_is_sideboard', 'deck_entries', ['deck_id', 'card_definition_id', 'is_sideboard'])
+    op.drop_index('ix_deck_entries_deck_id_card_definition_id', table_name='deck_entries')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_deck_entries_deck_id_card_definition_id', 'deck_entries', ['deck_id', 'card_definition_id'])
+    op.drop_constraint('uq_deck_entries_deck_id_card_definition_id_is_sideboard', 'deck_entries', type_='unique')
+    op.create_index('ix_user_collection_entries_user_id_card_definition_id', 'user_collection_entries', ['user_id', 'card_definition_id'])
+    op.drop_constraint('uq_user_collection_entries_user_id_card_definition_id', 'user_collection_entries', type_='unique')
+    op.alter_column('deck_entries', 'is_sideboard', existing_type=sa.Boolean(), nullable=True, server_default=None)
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc
 from app.database import get_db
 from app.models import MetaDeck
+from app import deck_analytics, schemas
 
 router = APIRouter()
 
@@ -41,4 +42,11 @@ async def get_top_commanders(db: AsyncSession = Depends(get_db)):
                 } for d in decks
             ]
         })
-    return data
\ No newline at end of file
+    return data
+
+@router.get("/meta/decks/{deck_id}/analytics", response_model=schemas.DeckAnalytics)
+async def get_meta_deck_analytics(deck_id: int, db: AsyncSession = Depends(get_db)):
+    analytics = await deck_analytics.get_meta_deck_analytics(db, deck_id)
+    if analytics is None:
+        raise HTTPException(status_code=404, detail="Meta deck not found")
+    return analytics
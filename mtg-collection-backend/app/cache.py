@@ -0,0 +1,34 @@
+# app/cache.py
+"""
+Small in-process caches for values derived from versioned data.
+
+A VersionedCache entry is only returned for the exact version it was computed at (e.g. a
+user's collection_version or a deck's version), so a write never has to invalidate anything:
+the next read simply misses and replaces the entry. Each uvicorn worker has its own cache;
+the least recently used keys are dropped beyond `max_entries`.
+"""
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class VersionedCache:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        """The value stored for `key` at `version`, or None."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, version: Any, value: Any) -> None:
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
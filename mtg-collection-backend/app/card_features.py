@@ -0,0 +1,240 @@
+# app/card_features.py
+"""
+Compact integer encodings of card attributes (colors, format legality, types, rarity).
+
+These bit layouts are shared by the columnar card index and anything else that stores
+or compares cards as integers. Only ever append to FORMATS, TYPE_FLAGS and RARITIES:
+existing bit positions are persisted in index files.
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+
+COLORS = ("W", "U", "B", "R", "G")
+COLOR_BITS: Dict[str, int] = {color: 1 << i for i, color in enumerate(COLORS)}
+ALL_COLORS_MASK = (1 << len(COLORS)) - 1
+
+# Scryfall legality keys, one bit each.
+FORMATS = (
+    "standard", "future", "historic", "timeless", "gladiator", "pioneer", "explorer",
+    "modern", "legacy", "pauper", "vintage", "penny", "commander", "oathbreaker",
+    "standardbrawl", "brawl", "alchemy", "paupercommander", "duel", "oldschool",
+    "premodern", "predh",
+)
+FORMAT_BITS: Dict[str, int] = {fmt: 1 << i for i, fmt in enumerate(FORMATS)}
+
+TYPE_FLAGS: Dict[str, int] = {
+    name: 1 << i for i, name in enumerate((
+        "land", "creature", "artifact", "enchantment", "planeswalker",
+        "instant", "sorcery", "battle", "legendary", "basic", "kindred",
+    ))
+}
+_TYPE_ALIASES = {"tribal": "kindred"}
+
+RARITIES = ("common", "uncommon", "rare", "mythic", "special", "bonus")
+RARITY_BITS: Dict[str, int] = {rarity: 1 << i for i, rarity in enumerate(RARITIES)} # 0 = unknown
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def color_mask(colors: Optional[Iterable[str]]) -> int:
+    """Encode a list of color letters (e.g. ['U', 'G']) as a bitmask."""
+    mask = 0
+    for color in colors or ():
+        mask |= COLOR_BITS.get(color.upper(), 0)
+    return mask
+
+
+def colors_from_mask(mask: int) -> List[str]:
+    """Decode a color bitmask back to WUBRG-ordered color letters."""
+    return [color for color in COLORS if mask & COLOR_BITS[color]]
+
+
+def parse_color_string(value: str) -> int:
+    """Parse user input like "ug" or "WUBRG" into a color bitmask; "c" means colorless."""
+    mask = 0
+    for letter in value.upper():
+        if letter == "C":
+            continue
+        if letter not in COLOR_BITS:
+            raise ValueError(f"Unknown color '{letter}'. Use any of W, U, B, R, G or C for colorless.")
+        mask |= COLOR_BITS[letter]
+    return mask
+
+
+def legality_mask(legalities: Optional[Dict[str, str]]) -> int:
+    """One bit per format in which the card may be played (legal or restricted)."""
+    mask = 0
+    for fmt, status in (legalities or {}).items():
+        if status in ("legal", "restricted") and fmt in FORMAT_BITS:
+            mask |= FORMAT_BITS[fmt]
+    return mask
+
+
+def status_mask(legalities: Optional[Dict[str, str]], status: str) -> int:
+    """One bit per format in which the card has exactly `status` ("legal", "restricted", ...)."""
+    mask = 0
+    for fmt, fmt_status in (legalities or {}).items():
+        if fmt_status == status and fmt in FORMAT_BITS:
+            mask |= FORMAT_BITS[fmt]
+    return mask
+
+
+def format_bit(fmt: str) -> int:
+    try:
+        return FORMAT_BITS[fmt.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown format '{fmt}'.")
+
+
+def type_flags(type_line: Optional[str]) -> int:
+    """Bitmask of the card types and supertypes found anywhere in the type line (all faces)."""
+    flags = 0
+    for face in (type_line or "").lower().split("//"):
+        types_part = face.split("—")[0] # Drop subtypes ("Creature — Elf Druid")
+        for word in _WORD_RE.findall(types_part):
+            flags |= TYPE_FLAGS.get(_TYPE_ALIASES.get(word, word), 0)
+    return flags
+
+
+def type_flag(name: str) -> int:
+    try:
+        return TYPE_FLAGS[_TYPE_ALIASES.get(name.lower(), name.lower())]
+    except KeyError:
+        raise ValueError(f"Unknown card type '{name}'.")
+
+
+def rarity_bit(rarity: Optional[str]) -> int:
+    """One-hot rarity encoding, so "any of these rarities" is a single AND."""
+    return RARITY_BITS.get((rarity or "").lower(), 0)
+
+
+def rarity_mask(rarities: Iterable[str]) -> int:
+    mask = 0
+    for rarity in rarities:
+        if rarity.lower() not in RARITY_BITS:
+            raise ValueError(f"Unknown rarity '{rarity}'.")
+        mask |= RARITY_BITS[rarity.lower()]
+    return mask
+
+
+# --- Derived per-card features (stored in the card_features table) ---
+
+PIP_COLORS = ("W", "U", "B", "R", "G", "C")
+# Main type used to group a card, in order of precedence ("Artifact Creature" -> "Creature").
+PRIMARY_TYPES = ("Land", "Creature", "Planeswalker", "Battle", "Artifact", "Enchantment", "Instant", "Sorcery", "Kindred")
+
+_MANA_SYMBOL_RE = re.compile(r"\{([^}]+)\}")
+_ADDS_MANA_RE = re.compile(r"\badd\b[^.]*?(\{[WUBRGCSX0-9]\}|\bmana\b)", re.IGNORECASE)
+_RAMP_RE = re.compile(
+    r"search your library for [^.]*\blands?\b[^.]*onto the battlefield"
+    r"|put [^.]*\bland cards?\b[^.]*onto the battlefield"
+    r"|play an additional land",
+    re.IGNORECASE,
+)
+
+_ANY_NUMBER_RE = re.compile(r"a deck can have any number of cards named", re.IGNORECASE)
+_UP_TO_RE = re.compile(r"a deck can have up to (\w+) cards named", re.IGNORECASE)
+_NUMBER_WORDS = {word: n for n, word in enumerate(("zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten"))}
+_COMMANDER_RE = re.compile(r"can be your commander", re.IGNORECASE)
+
+
+def _get(card, key: str):
+    # Works for ORM instances, result rows and raw Scryfall dicts alike
+    return card.get(key) if isinstance(card, dict) else getattr(card, key, None)
+
+
+def _front_face(card) -> dict:
+    faces = _get(card, "card_faces") or []
+    return faces[0] if faces else {}
+
+
+def _front_mana_cost(card) -> str:
+    face = _front_face(card)
+    if face.get("mana_cost") is not None:
+        return face["mana_cost"]
+    return _get(card, "mana_cost") or ""
+
+
+def _front_type_line(card) -> str:
+    face = _front_face(card)
+    return face.get("type_line") or (_get(card, "type_line") or "").split("//")[0]
+
+
+def _all_oracle_text(card) -> str:
+    faces = _get(card, "card_faces") or []
+    texts = [face.get("oracle_text") or "" for face in faces] or [_get(card, "oracle_text") or ""]
+    return "\n".join(texts)
+
+
+def mana_cost_pips(mana_cost: Optional[str]) -> Dict[str, int]:
+    """Count colored (and {C}) pips in a mana cost. Hybrid and phyrexian symbols count for each color."""
+    pips = dict.fromkeys(PIP_COLORS, 0)
+    for symbol in _MANA_SYMBOL_RE.findall(mana_cost or ""):
+        for part in symbol.upper().split("/"):
+            part = part[1:] if len(part) == 2 and part[0] == "H" else part # Half-mana, e.g. {HW}
+            if part in pips:
+                pips[part] += 1
+    return pips
+
+
+def mana_value(mana_cost: Optional[str]) -> float:
+    """Mana value of a single mana cost string, e.g. "{2}{W}{W}" -> 4."""
+    total = 0.0
+    for symbol in _MANA_SYMBOL_RE.findall(mana_cost or ""):
+        parts = symbol.upper().split("/")
+        if symbol.isdigit():
+            total += int(symbol)
+        elif symbol.upper() in ("X", "Y", "Z"):
+            continue
+        elif symbol == "1/2" or (len(symbol) == 2 and symbol[0].upper() == "H"):
+            total += 0.5
+        elif parts[0].isdigit(): # Monocolored hybrid, e.g. {2/W}
+            total += int(parts[0])
+        else:
+            total += 1
+    return total
+
+
+def primary_type(type_line: Optional[str]) -> Optional[str]:
+    """The front face's main card type, e.g. "Legendary Artifact Creature — Golem" -> "Creature"."""
+    types_part = (type_line or "").split("//")[0].split("—")[0]
+    words = {word.capitalize() for word in types_part.split()}
+    if "Tribal" in words:
+        words.add("Kindred")
+    return next((card_type for card_type in PRIMARY_TYPES if card_type in words), None)
+
+
+def compute_card_features(card) -> dict:
+    """
+    Derive the card_features row for a card (ORM instance, row or Scryfall dict) from its
+    mana cost, type line, oracle text and faces. Keys match models.CardFeatures columns.
+    """
+    front_cost = _front_mana_cost(card)
+    front_type_line = _front_type_line(card)
+    pips = mana_cost_pips(front_cost)
+    main_type = primary_type(front_type_line)
+    is_land = main_type == "Land"
+    oracle_text = _all_oracle_text(card)
+    produces_mana = bool(_ADDS_MANA_RE.search(oracle_text))
+    faces = _get(card, "card_faces") or []
+    front_words = set(front_type_line.lower().split("—")[0].split())
+    copy_limit = _UP_TO_RE.search(oracle_text)
+
+    return {
+        **{f"pips_{color.lower()}": count for color, count in pips.items()},
+        "color_mask": color_mask(_get(card, "colors") or (faces[0].get("colors") if faces else None)),
+        "color_identity_mask": color_mask(_get(card, "color_identity")),
+        "type_flags": type_flags(_get(card, "type_line")),
+        "primary_type": main_type,
+        "is_land": is_land,
+        "produces_mana": produces_mana,
+        "is_ramp": not is_land and (produces_mana or bool(_RAMP_RE.search(oracle_text))),
+        "front_face_cmc": mana_value(front_cost) if faces else _get(card, "cmc"),
+        "legal_mask": status_mask(_get(card, "legalities"), "legal"),
+        "restricted_mask": status_mask(_get(card, "legalities"), "restricted"),
+        # Basic lands and "A deck can have any number of cards named ..."
+        "unlimited_copies": "basic" in front_words or bool(_ANY_NUMBER_RE.search(oracle_text)),
+        # "A deck can have up to seven cards named ..."
+        "copy_limit": _NUMBER_WORDS.get(copy_limit.group(1).lower()) if copy_limit else None,
+        "can_be_commander": {"legendary", "creature"} <= front_words or bool(_COMMANDER_RE.search(oracle_text)),
+    }
@@ -0,0 +1,170 @@
+# app/card_index.py
+"""
+Columnar, memory-mapped index of every CardDefinition for vectorized filtering.
+
+`build_card_index` (run after ingest by populate_cards.py, or via scripts/build_card_index.py)
+writes one NumPy array per filterable attribute. Each worker maps the current build read-only
+through `get_card_index()` and evaluates filters as boolean masks over the whole catalog,
+which takes well under a millisecond for ~100k printings.
+"""
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import card_features, index_store, models
+from .core.config import settings
+
+INDEX_FORMAT_VERSION = 1
+
+
+class CardIndex:
+    """Read-only view over one build of the card index. Rows are in name order."""
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.version: str = meta["version"]
+        self.ids = arrays["ids"]                       # int32 CardDefinition.id
+        self.cmc = arrays["cmc"]                       # float32, NaN when unknown
+        self.colors = arrays["colors"]                 # uint8 color bitmask
+        self.color_identity = arrays["color_identity"] # uint8 color bitmask
+        self.legal = arrays["legal"]                   # uint32 format bitmask
+        self.types = arrays["types"]                   # uint16 type flags
+        self.rarity = arrays["rarity"]                 # uint8 one-hot rarity bit
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, directory: str, version: Optional[str] = None) -> "CardIndex":
+        arrays, meta = index_store.load_arrays(directory, version)
+        return cls(arrays, meta)
+
+    def filter_mask(
+        self,
+        identity_mask: Optional[int] = None,
+        colors_mask: Optional[int] = None,
+        colorless_only: bool = False,
+        cmc_min: Optional[float] = None,
+        cmc_max: Optional[float] = None,
+        type_mask: int = 0,
+        format_mask: int = 0,
+        rarity_mask: int = 0,
+    ) -> np.ndarray:
+        """
+        Boolean mask of rows matching every given filter:
+        - identity_mask: color identity must be a subset (commander-style)
+        - colors_mask: card colors must include all of these
+        - colorless_only: card must have no colors
+        - type_mask: card must have all of these type flags
+        - format_mask: card must be legal in all of these formats
+        - rarity_mask: card must have any of these rarities
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if identity_mask is not None:
+            mask &= (self.color_identity & np.uint8(card_features.ALL_COLORS_MASK ^ identity_mask)) == 0
+        if colors_mask:
+            mask &= (self.colors & np.uint8(colors_mask)) == colors_mask
+        if colorless_only:
+            mask &= self.colors == 0
+        if cmc_min is not None:
+            mask &= self.cmc >= cmc_min
+        if cmc_max is not None:
+            mask &= self.cmc <= cmc_max
+        if type_mask:
+            mask &= (self.types & np.uint16(type_mask)) == type_mask
+        if format_mask:
+            mask &= (self.legal & np.uint32(format_mask)) == format_mask
+        if rarity_mask:
+            mask &= (self.rarity & np.uint8(rarity_mask)) != 0
+        return mask
+
+    def filter_ids(self, **filters) -> np.ndarray:
+        """CardDefinition ids matching `filters` (see filter_mask), in name order."""
+        return self.ids[self.filter_mask(**filters)]
+
+
+def filters_from_query(
+    identity: Optional[str] = None,
+    colors: Optional[str] = None,
+    cmc_min: Optional[float] = None,
+    cmc_max: Optional[float] = None,
+    types: Iterable[str] = (),
+    format: Optional[str] = None,
+    rarities: Iterable[str] = (),
+) -> dict:
+    """Translate API query parameters into filter_mask() arguments. Raises ValueError on bad input."""
+    type_mask = 0
+    for type_name in types:
+        type_mask |= card_features.type_flag(type_name)
+    colors_mask = card_features.parse_color_string(colors) if colors else None
+    # parse_color_string ignores "C", which as a colors filter means "no colors" rather than "any"
+    colorless_only = bool(colors) and "C" in colors.upper()
+    if colorless_only and colors_mask:
+        raise ValueError("Colorless (C) can't be combined with other colors.")
+    return {
+        "identity_mask": card_features.parse_color_string(identity) if identity is not None else None,
+        "colors_mask": colors_mask,
+        "colorless_only": colorless_only,
+        "cmc_min": cmc_min,
+        "cmc_max": cmc_max,
+        "type_mask": type_mask,
+        "format_mask": card_features.format_bit(format) if format else 0,
+        "rarity_mask": card_features.rarity_mask(rarities),
+    }
+
+
+_loaded_index: Optional[CardIndex] = None
+
+
+def get_card_index() -> Optional[CardIndex]:
+    """
+    The current card index for this worker, or None if none has been built.
+    A rebuilt index is picked up on the next call.
+    """
+    global _loaded_index
+    version = index_store.current_version(settings.CARD_INDEX_DIR)
+    if version is None:
+        return None
+    if _loaded_index is None or _loaded_index.version != version:
+        _loaded_index = CardIndex.load(settings.CARD_INDEX_DIR, version)
+    return _loaded_index
+
+
+async def build_card_index(db: AsyncSession, directory: Optional[str] = None) -> str:
+    """Read the filterable columns of every CardDefinition and write a new index build."""
+    card = models.CardDefinition
+    query = (
+        select(card.id, card.cmc, card.colors, card.color_identity, card.legalities, card.type_line, card.rarity)
+        .order_by(card.name, card.set_code, card.collector_number)
+        .execution_options(yield_per=5000)
+    )
+    ids, cmc, colors, identity, legal, types, rarity = [], [], [], [], [], [], []
+    result = await db.stream(query)
+    async for partition in result.partitions():
+        for row in partition:
+            ids.append(row.id)
+            cmc.append(np.nan if row.cmc is None else row.cmc)
+            colors.append(card_features.color_mask(row.colors))
+            identity.append(card_features.color_mask(row.color_identity))
+            legal.append(card_features.legality_mask(row.legalities))
+            types.append(card_features.type_flags(row.type_line))
+            rarity.append(card_features.rarity_bit(row.rarity))
+
+    arrays = {
+        "ids": np.array(ids, dtype=np.int32),
+        "cmc": np.array(cmc, dtype=np.float32),
+        "colors": np.array(colors, dtype=np.uint8),
+        "color_identity": np.array(identity, dtype=np.uint8),
+        "legal": np.array(legal, dtype=np.uint32),
+        "types": np.array(types, dtype=np.uint16),
+        "rarity": np.array(rarity, dtype=np.uint8),
+    }
+    meta = {
+        "format_version": INDEX_FORMAT_VERSION,
+        "rows": len(ids),
+        "formats": list(card_features.FORMATS),
+        "types": list(card_features.TYPE_FLAGS),
+        "rarities": list(card_features.RARITIES),
+    }
+    return index_store.write_arrays(directory or settings.CARD_INDEX_DIR, arrays, meta)
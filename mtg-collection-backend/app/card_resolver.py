@@ -0,0 +1,165 @@
+# app/card_resolver.py
+"""
+Bulk resolution of typed card names (decklists, CSV exports) to CardDefinition printings.
+
+All input lines are resolved together: one query for exact (normalized) name matches and,
+only if something is left over, one pg_trgm query for fuzzy matches. Both queries are backed
+by the expression indexes from the add_card_name_lookup_indexes migration.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Sequence
+
+from sqlalchemy import String, bindparam, func, or_, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import models, schemas
+
+FACE_SEPARATOR = " // "
+MAX_FUZZY_CANDIDATES = 3
+
+_QUOTES = str.maketrans({"’": "'", "‘": "'", "`": "'", "“": '"', "”": '"'})
+_FACE_SEPARATOR_RE = re.compile(r"\s*/{1,2}\s*")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Columns needed to pick a printing; image blobs and JSONB columns are never loaded here.
+_PRINTING_COLUMNS = (
+    models.CardDefinition.id,
+    models.CardDefinition.scryfall_id,
+    models.CardDefinition.name,
+    models.CardDefinition.set_code,
+    models.CardDefinition.collector_number,
+    models.CardDefinition.released_at,
+    models.CardDefinition.lang,
+    models.CardDefinition.digital,
+    models.CardDefinition.promo,
+)
+
+_FUZZY_MATCH_SQL = text("""
+    SELECT q.key AS key, m.score AS score,
+           cd.id, cd.scryfall_id, cd.name, cd.set_code, cd.collector_number,
+           cd.released_at, cd.lang, cd.digital, cd.promo
+    FROM unnest(:keys) AS q(key)
+    CROSS JOIN LATERAL (
+        SELECT c.name,
+               max(greatest(similarity(lower(c.name), q.key), word_similarity(q.key, lower(c.name)))) AS score
+        FROM card_definitions c
+        WHERE lower(c.name) % q.key OR q.key <% lower(c.name)
+        GROUP BY c.name
+        ORDER BY score DESC
+        LIMIT :max_candidates
+    ) AS m
+    JOIN card_definitions cd ON cd.name = m.name
+""").bindparams(bindparam("keys", type_=ARRAY(String)), bindparam("max_candidates"))
+
+
+def normalize_card_name(name: str) -> str:
+    """
+    Normalize a typed card name for lookups: case, curly quotes, whitespace and
+    split/DFC separators ("Fire/Ice", "Fire//Ice" -> "fire // ice").
+    """
+    name = unicodedata.normalize("NFKC", name).translate(_QUOTES).strip().strip('"').lower()
+    name = _FACE_SEPARATOR_RE.sub(FACE_SEPARATOR, name)
+    return _WHITESPACE_RE.sub(" ", name).strip()
+
+
+def _printing_preference(printing) -> tuple:
+    # Prefer English, paper, non-promo, most recent printings.
+    return (printing.lang == "en", not printing.digital, not printing.promo, printing.released_at or "", printing.id)
+
+
+def _choose_printing(printings: Sequence, line: schemas.CardResolveLine) -> tuple:
+    """Pick the printing matching the line's set/collector number hints, else the preferred default."""
+    candidates = list(printings)
+    note = None
+    if line.set_code:
+        in_set = [p for p in candidates if (p.set_code or "").lower() == line.set_code.strip().lower()]
+        if in_set:
+            candidates = in_set
+            if line.collector_number:
+                exact = [p for p in in_set if p.collector_number == line.collector_number.strip()]
+                if exact:
+                    candidates = exact
+                else:
+                    note = f"Collector number '{line.collector_number}' not found in set '{line.set_code}'; using another printing from that set."
+        else:
+            note = f"No printing in set '{line.set_code}'; using the default printing."
+    return max(candidates, key=_printing_preference), note
+
+
+def _to_resolved_printing(printing) -> schemas.ResolvedPrinting:
+    return schemas.ResolvedPrinting(
+        id=printing.id,
+        scryfall_id=printing.scryfall_id,
+        name=printing.name,
+        set_code=printing.set_code,
+        collector_number=printing.collector_number,
+    )
+
+
+async def _find_exact_matches(db: AsyncSession, keys: List[str]) -> Dict[str, Dict[str, list]]:
+    """Return {key: {card name: [printings]}} for keys matching a full name or a front face."""
+    full_key = func.lower(models.CardDefinition.name)
+    front_key = func.lower(func.split_part(models.CardDefinition.name, FACE_SEPARATOR, 1))
+    result = await db.execute(
+        select(*_PRINTING_COLUMNS, full_key.label("full_key"), front_key.label("front_key"))
+        .where(or_(full_key.in_(keys), front_key.in_(keys)))
+    )
+    matches: Dict[str, Dict[str, list]] = defaultdict(lambda: defaultdict(list))
+    for row in result.all():
+        matches[row.full_key][row.name].append(row)
+        if row.front_key != row.full_key:
+            matches[row.front_key][row.name].append(row)
+    return matches
+
+
+async def _find_fuzzy_matches(db: AsyncSession, keys: List[str]) -> Dict[str, Dict[str, list]]:
+    """Return {key: {card name: [printings]}} for the closest trigram matches, best name first."""
+    result = await db.execute(_FUZZY_MATCH_SQL, {"keys": keys, "max_candidates": MAX_FUZZY_CANDIDATES})
+    scored: Dict[str, Dict[str, list]] = defaultdict(lambda: defaultdict(list))
+    scores: Dict[tuple, float] = {}
+    for row in result.all():
+        scored[row.key][row.name].append(row)
+        scores[(row.key, row.name)] = row.score
+    return {
+        key: dict(sorted(by_name.items(), key=lambda item: scores[(key, item[0])], reverse=True))
+        for key, by_name in scored.items()
+    }
+
+
+async def resolve_card_lines(db: AsyncSession, lines: List[schemas.CardResolveLine]) -> List[schemas.CardResolveResult]:
+    """
+    Resolve a batch of typed card names to printings in at most two queries.
+    Results are returned in input order, one per line.
+    """
+    keys = [normalize_card_name(line.name) for line in lines]
+    unique_keys = sorted({key for key in keys if key})
+    exact = await _find_exact_matches(db, unique_keys) if unique_keys else {}
+
+    missing_keys = [key for key in unique_keys if key not in exact]
+    fuzzy = await _find_fuzzy_matches(db, missing_keys) if missing_keys else {}
+
+    results: List[schemas.CardResolveResult] = []
+    for index, (line, key) in enumerate(zip(lines, keys)):
+        result = schemas.CardResolveResult(index=index, input_name=line.name, status=schemas.ResolveStatus.not_found)
+        if key in exact:
+            by_name = exact[key]
+            # A full-name match always wins over a front-face match of another card.
+            full_matches = [name for name in by_name if name.lower() == key]
+            names = full_matches or list(by_name)
+            result.status = schemas.ResolveStatus.exact if len(names) == 1 else schemas.ResolveStatus.ambiguous
+            result.candidates = sorted(by_name) if len(names) > 1 else []
+            printing, result.note = _choose_printing(by_name[sorted(names)[0]], line)
+            result.card = _to_resolved_printing(printing)
+        elif key in fuzzy:
+            by_name = fuzzy[key]
+            best_name = next(iter(by_name))
+            result.status = schemas.ResolveStatus.fuzzy
+            result.candidates = list(by_name)
+            printing, result.note = _choose_printing(by_name[best_name], line)
+            result.card = _to_resolved_printing(printing)
+        results.append(result)
+    return results
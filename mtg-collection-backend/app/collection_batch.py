@@ -0,0 +1,221 @@
+# app/collection_batch.py
+"""
+Apply many add/set/remove operations to a user's collection in one transaction.
+
+Cards are resolved together (one query for Scryfall IDs, card_resolver for names), the
+user's collection is locked (crud.lock_collection) so no concurrent write can interleave, the
+existing entries for those cards are read in one query, the operations are folded in memory
+in request order, and the result is written back with one INSERT ... RETURNING, one
+executemany UPDATE and one DELETE. The collection summary is adjusted with one UPDATE and
+the collection version is bumped once.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import card_resolver, collection_summary, crud, models, schemas, sync
+
+_ENTRY_FIELDS = ("quantity_normal", "quantity_foil", "condition", "language", "notes")
+
+
+@dataclass
+class _EntryState:
+    """A collection entry as it will be after the batch (id is None until inserted)."""
+    card_definition_id: int
+    id: Optional[int] = None
+    quantity_normal: int = 0
+    quantity_foil: int = 0
+    condition: Optional[str] = None
+    language: Optional[str] = "en"
+    notes: Optional[str] = None
+    exists: bool = False   # Row is in the database before the batch
+    stored_normal: int = 0 # Quantities in the database before the batch
+    stored_foil: int = 0
+    deleted: bool = False
+    changed: bool = False
+
+    def values(self) -> dict:
+        return {field: getattr(self, field) for field in _ENTRY_FIELDS}
+
+
+async def _resolve_operations(db: AsyncSession, operations: List[schemas.CollectionBatchOperation]) -> Dict[int, tuple]:
+    """Map operation index -> (card_definition_id, scryfall_id), or (None, reason) if unresolved."""
+    resolved: Dict[int, tuple] = {}
+
+    scryfall_ids = sorted({op.card_definition_scryfall_id for op in operations if op.card_definition_scryfall_id})
+    by_scryfall_id = {}
+    if scryfall_ids:
+        result = await db.execute(
+            select(models.CardDefinition.id, models.CardDefinition.scryfall_id)
+            .filter(models.CardDefinition.scryfall_id.in_(scryfall_ids))
+        )
+        by_scryfall_id = {row.scryfall_id: row.id for row in result}
+
+    named = []
+    for index, op in enumerate(operations):
+        if op.card_definition_scryfall_id:
+            card_id = by_scryfall_id.get(op.card_definition_scryfall_id)
+            resolved[index] = (card_id, op.card_definition_scryfall_id) if card_id else (None, "Scryfall ID is not in the card catalog")
+        else:
+            named.append(index)
+
+    if named:
+        lines = [
+            schemas.CardResolveLine(name=operations[i].name, set_code=operations[i].set_code, collector_number=operations[i].collector_number)
+            for i in named
+        ]
+        for index, match in zip(named, await card_resolver.resolve_card_lines(db, lines)):
+            # Only exact name matches change a collection; fuzzy and ambiguous ones are reported back
+            if match.status == schemas.ResolveStatus.exact:
+                resolved[index] = (match.card.id, match.card.scryfall_id)
+            elif match.status == schemas.ResolveStatus.not_found:
+                resolved[index] = (None, "No card with this name")
+            else:
+                resolved[index] = (None, f"{match.status.value} match; candidates: {', '.join(match.candidates)}")
+    return resolved
+
+
+async def _load_entries(db: AsyncSession, user_id: int, card_definition_ids: List[int]) -> Dict[int, _EntryState]:
+    result = await db.execute(
+        select(models.UserCollectionEntry.id, models.UserCollectionEntry.card_definition_id, *(getattr(models.UserCollectionEntry, f) for f in _ENTRY_FIELDS))
+        .filter(models.UserCollectionEntry.user_id == user_id, models.UserCollectionEntry.card_definition_id.in_(card_definition_ids))
+    )
+    entries: Dict[int, _EntryState] = {}
+    for row in result: # At most one entry per card (unique user_id, card_definition_id)
+        entries.setdefault(row.card_definition_id, _EntryState(
+            card_definition_id=row.card_definition_id, id=row.id, exists=True,
+            stored_normal=row.quantity_normal, stored_foil=row.quantity_foil,
+            **{field: getattr(row, field) for field in _ENTRY_FIELDS},
+        ))
+    return entries
+
+
+def _apply(entry: _EntryState, op: schemas.CollectionBatchOperation) -> schemas.CollectionBatchStatus:
+    """Fold one operation into `entry` and return its status."""
+    was_present = not entry.deleted and (entry.exists or entry.changed)
+    attributes = op.model_dump(include={"condition", "language", "notes"}, exclude_none=True)
+
+    if op.action == schemas.CollectionBatchAction.remove:
+        if not was_present:
+            return schemas.CollectionBatchStatus.unchanged
+        if op.quantity_normal or op.quantity_foil:
+            entry.quantity_normal = max(entry.quantity_normal - op.quantity_normal, 0)
+            entry.quantity_foil = max(entry.quantity_foil - op.quantity_foil, 0)
+        else:
+            entry.quantity_normal = entry.quantity_foil = 0
+    elif op.action == schemas.CollectionBatchAction.set:
+        entry.quantity_normal, entry.quantity_foil = op.quantity_normal, op.quantity_foil
+    else:
+        if not was_present: # Re-adding a card deleted earlier in the batch starts from scratch
+            entry.quantity_normal = entry.quantity_foil = 0
+            entry.condition, entry.language, entry.notes = None, "en", None
+        entry.quantity_normal += op.quantity_normal
+        entry.quantity_foil += op.quantity_foil
+
+    if op.action != schemas.CollectionBatchAction.remove:
+        for field, value in attributes.items():
+            setattr(entry, field, value)
+
+    if entry.quantity_normal == 0 and entry.quantity_foil == 0 and op.action != schemas.CollectionBatchAction.add:
+        entry.deleted, entry.changed = True, True
+        return schemas.CollectionBatchStatus.deleted if was_present else schemas.CollectionBatchStatus.unchanged
+    entry.deleted, entry.changed = False, True
+    return schemas.CollectionBatchStatus.updated if was_present else schemas.CollectionBatchStatus.created
+
+
+async def _write_entries(db: AsyncSession, user_id: int, entries: List[_EntryState]) -> None:
+    table = models.UserCollectionEntry.__table__
+
+    to_delete = [entry.id for entry in entries if entry.deleted and entry.exists]
+    if to_delete:
+        await sync.record_deletions(db, user_id, sync.COLLECTION_ENTRY, to_delete)
+        await db.execute(delete(models.UserCollectionEntry).where(models.UserCollectionEntry.id.in_(to_delete)).execution_options(synchronize_session=False))
+
+    to_update = [entry for entry in entries if not entry.deleted and entry.exists]
+    if to_update:
+        await db.execute(
+            update(table)
+            .where(table.c.id == bindparam("entry_id"))
+            .values(date_updated_in_collection=func.now(), **{field: bindparam(f"new_{field}") for field in _ENTRY_FIELDS}),
+            [{"entry_id": entry.id, **{f"new_{field}": value for field, value in entry.values().items()}} for entry in to_update],
+        )
+
+    to_insert = [entry for entry in entries if not entry.deleted and not entry.exists]
+    if to_insert:
+        result = await db.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            [{"user_id": user_id, "card_definition_id": entry.card_definition_id, **entry.values(), "language": entry.language or "en"} for entry in to_insert],
+        )
+        for entry, new_id in zip(to_insert, result.scalars()):
+            entry.id = new_id
+
+
+async def apply_resolved_operations(
+    db: AsyncSession, user_id: int, operations: List[schemas.CollectionBatchOperation], resolved: Dict[int, tuple]
+) -> Tuple[List[schemas.CollectionBatchItemResult], bool]:
+    """
+    Apply `operations` whose cards are already resolved (operation index -> (card_definition_id,
+    scryfall_id) or (None, reason)). Returns one result per operation and whether anything was
+    written. The collection version is left to the caller.
+    """
+    card_ids = sorted({card_id for card_id, _ in resolved.values() if card_id})
+    entries = {}
+    if card_ids:
+        # The batch is folded from this read and written back as absolute quantities
+        await crud.lock_collection(db, user_id)
+        entries = await _load_entries(db, user_id, card_ids)
+
+    # Quantities are reported as of each operation, entry ids once the batch is written
+    results: List[schemas.CollectionBatchItemResult] = []
+    result_entries: List[Optional[_EntryState]] = []
+    for index, op in enumerate(operations):
+        card_id, scryfall_id_or_reason = resolved[index]
+        if card_id is None:
+            results.append(schemas.CollectionBatchItemResult(index=index, status=schemas.CollectionBatchStatus.not_found, detail=scryfall_id_or_reason))
+            result_entries.append(None)
+            continue
+        entry = entries.setdefault(card_id, _EntryState(card_definition_id=card_id))
+        status = _apply(entry, op)
+        results.append(schemas.CollectionBatchItemResult(
+            index=index, status=status, card_definition_id=card_id, scryfall_id=scryfall_id_or_reason,
+            quantity_normal=entry.quantity_normal, quantity_foil=entry.quantity_foil,
+        ))
+        result_entries.append(entry)
+
+    # Entries created and deleted again within the batch never reach the database
+    changed = [entry for entry in entries.values() if entry.changed and (entry.exists or not entry.deleted)]
+    if changed:
+        await _write_entries(db, user_id, changed)
+        await collection_summary.apply_changes(db, user_id, [
+            collection_summary.EntryChange(
+                entry.card_definition_id,
+                quantity_normal=(0 if entry.deleted else entry.quantity_normal) - entry.stored_normal,
+                quantity_foil=(0 if entry.deleted else entry.quantity_foil) - entry.stored_foil,
+                entries=int(not entry.exists) - int(entry.deleted),
+            )
+            for entry in changed
+        ])
+
+    for result, entry in zip(results, result_entries):
+        if entry is not None and not entry.deleted:
+            result.collection_entry_id = entry.id
+    return results, bool(changed)
+
+
+async def apply_collection_batch(
+    db: AsyncSession, user_id: int, operations: List[schemas.CollectionBatchOperation]
+) -> schemas.CollectionBatchResult:
+    """
+    Apply `operations` in order and return one result per operation. Operations whose card
+    cannot be resolved are reported as not_found and do not stop the rest of the batch.
+    """
+    resolved = await _resolve_operations(db, operations)
+    results, changed = await apply_resolved_operations(db, user_id, operations, resolved)
+    if changed:
+        collection_version = await crud.bump_collection_version(db, user_id)
+    else:
+        collection_version = (await db.execute(select(models.User.collection_version).filter(models.User.id == user_id))).scalar_one()
+    return schemas.CollectionBatchResult(results=results, collection_version=collection_version)
@@ -0,0 +1,394 @@
+# app/collection_import.py
+"""
+Server-side import of collection CSV exports from other tools (Moxfield, Deckbox, TCGplayer,
+ManaBox) and from this API's own CSV export.
+
+The uploaded file (spooled to disk by Starlette) is parsed in batches of IMPORT_BATCH_SIZE
+rows using a column profile per format. Each batch is resolved with at most a handful of
+queries - Scryfall IDs, then (set_code, collector_number) through the
+ix_card_definitions_set_code_collector_number index, then names through card_resolver - and
+written with collection_batch's set-based upsert. Memory is bounded by the batch size, and
+the whole import is one transaction with one collection version bump. Progress is written
+to user_import_progress after each batch, outside that transaction, for polling.
+"""
+import csv
+import io
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from starlette.concurrency import run_in_threadpool
+
+from . import card_resolver, collection_batch, crud, models, schemas
+from .database import AsyncSessionLocal
+from .exporters import MOXFIELD_LANGUAGES
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_UNRESOLVED = 1000
+
+# Condition names used by the supported tools, lowercased with everything but letters removed
+CONDITION_CODES = {
+    "mint": "M", "m": "M",
+    "nearmint": "NM", "nm": "NM",
+    "excellent": "LP", "goodlightlyplayed": "LP", "lightlyplayed": "LP", "lightplayed": "LP", "good": "LP", "lp": "LP",
+    "played": "MP", "moderatelyplayed": "MP", "mp": "MP",
+    "heavilyplayed": "HP", "hp": "HP",
+    "damaged": "DMG", "poor": "DMG", "dmg": "DMG", "d": "DMG",
+}
+LANGUAGE_CODES = {name.lower(): code for code, name in MOXFIELD_LANGUAGES.items()}
+FOIL_VALUES = {"foil", "etched", "true", "yes", "1"}
+
+
+@dataclass(frozen=True)
+class ImportProfile:
+    """
+    Header names (any of several, matched case-insensitively) for each field of one
+    tool's CSV export. `signature` lists headers that must all be present for detection.
+    """
+    format: schemas.CollectionImportFormat
+    signature: Tuple[str, ...]
+    quantity: Tuple[str, ...]
+    name: Tuple[str, ...]
+    set_code: Tuple[str, ...] = ()
+    set_name: Tuple[str, ...] = ()
+    collector_number: Tuple[str, ...] = ()
+    scryfall_id: Tuple[str, ...] = ()
+    foil: Tuple[str, ...] = ()            # A flag column; the row's quantity is foil when set
+    foil_quantity: Tuple[str, ...] = ()   # A separate foil count column
+    condition: Tuple[str, ...] = ()
+    language: Tuple[str, ...] = ()
+    notes: Tuple[str, ...] = ()
+
+
+# Checked in order during detection; more specific signatures first
+PROFILES = (
+    ImportProfile(
+        format=schemas.CollectionImportFormat.native,
+        signature=("quantity_normal", "quantity_foil", "name"),
+        quantity=("quantity_normal",), foil_quantity=("quantity_foil",), name=("name",), set_code=("set_code",),
+        collector_number=("collector_number",), scryfall_id=("scryfall_id",), condition=("condition",),
+        language=("language",), notes=("notes",),
+    ),
+    ImportProfile(
+        format=schemas.CollectionImportFormat.manabox,
+        signature=("name", "set code", "collector number", "quantity"),
+        quantity=("quantity",), name=("name",), set_code=("set code",), set_name=("set name",),
+        collector_number=("collector number",), scryfall_id=("scryfall id",), foil=("foil",),
+        condition=("condition",), language=("language",),
+    ),
+    ImportProfile(
+        format=schemas.CollectionImportFormat.moxfield,
+        signature=("count", "name", "edition", "collector number"),
+        quantity=("count",), name=("name",), set_code=("edition",), collector_number=("collector number",),
+        foil=("foil",), condition=("condition",), language=("language",),
+    ),
+    ImportProfile(
+        format=schemas.CollectionImportFormat.deckbox,
+        signature=("count", "name", "edition", "card number"),
+        quantity=("count",), name=("name",), set_code=("edition code",), set_name=("edition",),
+        collector_number=("card number",), foil=("foil",), condition=("condition",), language=("language",),
+    ),
+    ImportProfile(
+        format=schemas.CollectionImportFormat.tcgplayer,
+        signature=("quantity", "name", "set", "card number"),
+        quantity=("quantity",), name=("simple name", "name"), set_code=("set code",), set_name=("set",),
+        collector_number=("card number",), foil=("printing",), condition=("condition",), language=("language",),
+    ),
+)
+PROFILES_BY_FORMAT = {profile.format: profile for profile in PROFILES}
+
+
+def detect_profile(headers: List[str]) -> ImportProfile:
+    present = {header.strip().lower() for header in headers}
+    for profile in PROFILES:
+        if all(column in present for column in profile.signature):
+            return profile
+    raise ValueError("Unrecognized CSV header; choose the format explicitly (moxfield, deckbox, tcgplayer, manabox or native).")
+
+
+@dataclass
+class _ImportRow:
+    row: int
+    name: Optional[str]
+    set_code: Optional[str] = None
+    set_name: Optional[str] = None
+    collector_number: Optional[str] = None
+    scryfall_id: Optional[str] = None
+    quantity_normal: int = 0
+    quantity_foil: int = 0
+    condition: Optional[str] = None
+    language: Optional[str] = None
+    notes: Optional[str] = None
+    error: Optional[str] = None
+
+
+class _RowParser:
+    """Maps the header of one file to column positions for a profile and parses its rows."""
+
+    def __init__(self, profile: ImportProfile, headers: List[str]):
+        self.profile = profile
+        positions = {header.strip().lower(): position for position, header in enumerate(headers)}
+        self.columns = {
+            field_name: next((positions[c] for c in getattr(profile, field_name) if c in positions), None)
+            for field_name in ("quantity", "name", "set_code", "set_name", "collector_number", "scryfall_id",
+                               "foil", "foil_quantity", "condition", "language", "notes")
+        }
+        if self.columns["name"] is None and self.columns["scryfall_id"] is None:
+            raise ValueError("The CSV has no card name column.")
+
+    def _get(self, values: List[str], field_name: str) -> Optional[str]:
+        position = self.columns[field_name]
+        if position is None or position >= len(values):
+            return None
+        value = values[position].strip()
+        return value or None
+
+    @staticmethod
+    def _quantity(value: Optional[str], default: int) -> int:
+        if value is None:
+            return default
+        try:
+            quantity = int(value)
+        except ValueError:
+            number = float(value) # Spreadsheets may write "2.0"; "1.9" is an error, not 1
+            if not number.is_integer():
+                raise
+            quantity = int(number)
+        if not 0 <= quantity <= schemas.MAX_ENTRY_QUANTITY:
+            raise ValueError
+        return quantity
+
+    def parse(self, row_number: int, values: List[str]) -> _ImportRow:
+        row = _ImportRow(
+            row=row_number, name=self._get(values, "name"), set_code=self._get(values, "set_code"),
+            set_name=self._get(values, "set_name"), collector_number=self._get(values, "collector_number"),
+            scryfall_id=self._get(values, "scryfall_id"), notes=self._get(values, "notes"),
+        )
+        try:
+            quantity = self._quantity(self._get(values, "quantity"), 1)
+            foil_quantity = self._quantity(self._get(values, "foil_quantity"), 0)
+        except (ValueError, OverflowError):
+            row.error = f"Invalid quantity (expected a whole number from 0 to {schemas.MAX_ENTRY_QUANTITY})"
+            return row
+
+        condition = (self._get(values, "condition") or "").lower()
+        foil_flag = (self._get(values, "foil") or "").lower()
+        if condition.endswith(" foil"): # TCGplayer puts the finish in the condition: "Near Mint Foil"
+            condition, foil_flag = condition[:-5], "foil"
+        is_foil = foil_flag in FOIL_VALUES
+        row.quantity_normal, row.quantity_foil = (0, quantity + foil_quantity) if is_foil else (quantity, foil_quantity)
+        row.condition = CONDITION_CODES.get("".join(ch for ch in condition if ch.isalpha())) if condition else None
+        language = (self._get(values, "language") or "").lower()
+        row.language = LANGUAGE_CODES.get(language, language if 0 < len(language) <= 3 else None)
+        row.set_code = row.set_code.lower() if row.set_code else None
+        if row.name is None and row.scryfall_id is None:
+            row.error = "No card name"
+        return row
+
+
+def _read_header(reader) -> Optional[List[str]]:
+    try:
+        return next(reader, None)
+    except csv.Error as e:
+        raise ValueError(f"Malformed CSV on line {reader.line_num}: {e}") from e
+
+
+def _read_rows(reader, parser: _RowParser, limit: int) -> List[_ImportRow]:
+    """Parse up to `limit` non-empty rows (runs in a worker thread: the file may be on disk)."""
+    rows = []
+    try:
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            rows.append(parser.parse(reader.line_num, values))
+            if len(rows) >= limit:
+                break
+    except csv.Error as e: # e.g. a field over csv.field_size_limit()
+        raise ValueError(f"Malformed CSV on line {reader.line_num}: {e}") from e
+    return rows
+
+
+async def _save_progress(user_id: int, progress: Optional[schemas.CollectionImportProgress]) -> None:
+    """
+    Write the user's import progress (None clears it) in its own short transaction, so a poll
+    served by any worker sees it while the import's transaction is still open.
+    """
+    table = models.UserImportProgress
+    async with AsyncSessionLocal() as session:
+        if progress is None:
+            await session.execute(delete(table).where(table.user_id == user_id))
+        else:
+            values = progress.model_dump(mode="json", include=set(schemas.CollectionImportProgress.model_fields))
+            upsert = pg_insert(table).values(user_id=user_id, progress=values)
+            await session.execute(upsert.on_conflict_do_update(
+                index_elements=[table.user_id], set_={"progress": upsert.excluded.progress, "date_updated": func.now()},
+            ))
+        await session.commit()
+
+
+async def get_import_progress(db: AsyncSession, user_id: int) -> Optional[schemas.CollectionImportProgress]:
+    """The user's running (or last) import's progress, polled through GET /collection/import/progress."""
+    progress = (await db.execute(
+        select(models.UserImportProgress.progress).filter(models.UserImportProgress.user_id == user_id)
+    )).scalar_one_or_none()
+    return schemas.CollectionImportProgress.model_validate(progress) if progress is not None else None
+
+
+@dataclass
+class _Resolver:
+    db: AsyncSession
+    set_codes_by_name: Optional[Dict[str, str]] = None
+
+    async def _set_codes(self) -> Dict[str, str]:
+        if self.set_codes_by_name is None:
+            result = await self.db.execute(
+                select(func.lower(models.CardDefinition.set_name), models.CardDefinition.set_code)
+                .filter(models.CardDefinition.set_name.isnot(None))
+                .distinct()
+            )
+            self.set_codes_by_name = {set_name: set_code for set_name, set_code in result}
+        return self.set_codes_by_name
+
+    async def resolve(self, rows: List[_ImportRow]) -> Dict[int, tuple]:
+        """Map row position -> (card_definition_id, scryfall_id) or (None, reason), like collection_batch."""
+        resolved: Dict[int, tuple] = {}
+        pending = []
+        for position, row in enumerate(rows):
+            if row.error:
+                resolved[position] = (None, row.error)
+            else:
+                pending.append(position)
+
+        if any(rows[p].set_name and not rows[p].set_code for p in pending):
+            set_codes = await self._set_codes()
+            for p in pending:
+                if rows[p].set_name and not rows[p].set_code:
+                    rows[p].set_code = set_codes.get(rows[p].set_name.lower())
+
+        # 1. Scryfall IDs
+        scryfall_ids = sorted({rows[p].scryfall_id for p in pending if rows[p].scryfall_id})
+        if scryfall_ids:
+            result = await self.db.execute(
+                select(models.CardDefinition.id, models.CardDefinition.scryfall_id)
+                .filter(models.CardDefinition.scryfall_id.in_(scryfall_ids))
+            )
+            by_scryfall_id = {row.scryfall_id: row.id for row in result}
+            still_pending = []
+            for p in pending:
+                card_id = by_scryfall_id.get(rows[p].scryfall_id)
+                if card_id:
+                    resolved[p] = (card_id, rows[p].scryfall_id)
+                else:
+                    still_pending.append(p)
+            pending = still_pending
+
+        # 2. Set code + collector number
+        pairs = sorted({(rows[p].set_code, rows[p].collector_number) for p in pending if rows[p].set_code and rows[p].collector_number})
+        if pairs:
+            result = await self.db.execute(
+                select(models.CardDefinition.id, models.CardDefinition.scryfall_id, models.CardDefinition.set_code,
+                       models.CardDefinition.collector_number, models.CardDefinition.lang)
+                .filter(tuple_(models.CardDefinition.set_code, models.CardDefinition.collector_number).in_(pairs))
+            )
+            by_printing: Dict[tuple, tuple] = {}
+            for row in result:
+                key = (row.set_code, row.collector_number)
+                # Several languages can share a set and number; English wins
+                if key not in by_printing or row.lang == "en":
+                    by_printing[key] = (row.id, row.scryfall_id)
+            still_pending = []
+            for p in pending:
+                match = by_printing.get((rows[p].set_code, rows[p].collector_number))
+                if match:
+                    resolved[p] = match
+                else:
+                    still_pending.append(p)
+            pending = still_pending
+
+        # 3. Names, with the set code as a hint
+        named = [p for p in pending if rows[p].name]
+        if named:
+            lines = [schemas.CardResolveLine(name=rows[p].name, set_code=rows[p].set_code, collector_number=rows[p].collector_number) for p in named]
+            for p, match in zip(named, await card_resolver.resolve_card_lines(self.db, lines)):
+                if match.status == schemas.ResolveStatus.exact:
+                    resolved[p] = (match.card.id, match.card.scryfall_id)
+                elif match.status == schemas.ResolveStatus.not_found:
+                    resolved[p] = (None, "No card with this name")
+                else:
+                    resolved[p] = (None, f"{match.status.value} match; candidates: {', '.join(match.candidates)}")
+        for p in pending:
+            resolved.setdefault(p, (None, "Scryfall ID is not in the card catalog"))
+        return resolved
+
+
+async def import_collection_csv(
+    db: AsyncSession, user_id: int, upload: UploadFile,
+    import_format: schemas.CollectionImportFormat = schemas.CollectionImportFormat.auto,
+) -> schemas.CollectionImportReport:
+    """
+    Add every row of an uploaded CSV to the user's collection and commit. Raises ValueError
+    for a file whose header matches no profile or that isn't well-formed CSV.
+    """
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        reader = csv.reader(text)
+        headers = await run_in_threadpool(_read_header, reader)
+        if not headers:
+            raise ValueError("The CSV file is empty.")
+        if import_format == schemas.CollectionImportFormat.auto:
+            profile = detect_profile(headers)
+        else:
+            profile = PROFILES_BY_FORMAT[import_format]
+        parser = _RowParser(profile, headers)
+
+        report = schemas.CollectionImportReport(format=profile.format)
+        await _save_progress(user_id, report)
+        resolver = _Resolver(db)
+        created_entries, updated_entries = set(), set()
+        while rows := await run_in_threadpool(_read_rows, reader, parser, IMPORT_BATCH_SIZE):
+            resolved = await resolver.resolve(rows)
+            operations = [
+                schemas.CollectionBatchOperation.model_construct(
+                    action=schemas.CollectionBatchAction.add, quantity_normal=row.quantity_normal, quantity_foil=row.quantity_foil,
+                    condition=row.condition, language=row.language, notes=row.notes,
+                )
+                for row in rows
+            ]
+            results, _ = await collection_batch.apply_resolved_operations(db, user_id, operations, resolved)
+
+            report.rows_read += len(rows)
+            for row, result in zip(rows, results):
+                if result.status == schemas.CollectionBatchStatus.not_found:
+                    report.unresolved_count += 1
+                    if len(report.unresolved) < MAX_REPORTED_UNRESOLVED:
+                        report.unresolved.append(schemas.CollectionImportUnresolvedRow(
+                            row=row.row, name=row.name, set_code=row.set_code or row.set_name,
+                            collector_number=row.collector_number, reason=result.detail or "Not found",
+                        ))
+                    continue
+                report.rows_imported += 1
+                report.quantity_imported += row.quantity_normal + row.quantity_foil
+                if result.status == schemas.CollectionBatchStatus.created:
+                    created_entries.add(result.card_definition_id)
+                elif result.card_definition_id not in created_entries:
+                    updated_entries.add(result.card_definition_id)
+            await _save_progress(user_id, report)
+
+        report.cards_created, report.cards_updated = len(created_entries), len(updated_entries)
+        if report.rows_imported:
+            report.collection_version = await crud.bump_collection_version(db, user_id)
+        else:
+            report.collection_version = (await db.execute(select(models.User.collection_version).filter(models.User.id == user_id))).scalar_one()
+        await db.commit() # Pollers only see "done" once the rows and the version are visible
+    except BaseException:
+        await _save_progress(user_id, None)
+        raise
+    finally:
+        text.detach() # Leave closing the upload to Starlette
+    report.done = True
+    await _save_progress(user_id, report)
+    return report
@@ -0,0 +1,90 @@
+# app/collection_stats.py
+"""
+Collection breakdowns by color identity, rarity, set, primary type and mana value.
+
+All five distributions (and the totals) come from one GROUP BY GROUPING SETS query over
+user_collection_entries joined with card_definitions and card_features; GROUPING() tells
+the result rows of each set apart. Results are cached per user at their collection_version,
+so repeated requests between writes cost a dictionary lookup.
+"""
+from typing import Any, Dict, List
+
+from sqlalchemy import Integer, case, func, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import card_features, models, schemas
+from .cache import VersionedCache
+
+MAX_CMC_BUCKET = 7 # Mana values of 7 and more share one bucket
+
+_stats_cache = VersionedCache(max_entries=2048)
+
+
+def _color_identity_label(mask: int) -> str:
+    return "".join(card_features.colors_from_mask(mask)) or "C"
+
+
+async def _compute(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+    entry, card, features = models.UserCollectionEntry, models.CardDefinition, models.CardFeatures
+    # Lands are left out of the mana value curve. No bound parameters: the SELECT and GROUPING
+    # SETS copies of each expression must be identical for PostgreSQL to match them.
+    cmc_bucket = case(
+        (features.is_land, None),
+        else_=func.least(func.floor(features.front_face_cmc), literal_column(str(MAX_CMC_BUCKET))).cast(Integer),
+    )
+    dimensions = {
+        "color_identity": features.color_identity_mask,
+        "rarity": card.rarity,
+        "set_code": card.set_code,
+        "type": features.primary_type,
+        "cmc": cmc_bucket,
+    }
+    query = (
+        select(
+            *(expression.label(name) for name, expression in dimensions.items()),
+            func.grouping(*dimensions.values()).label("grouping_bits"),
+            func.sum(entry.quantity_normal + entry.quantity_foil).label("copies"),
+            func.count(entry.id).label("entries"),
+        )
+        .select_from(entry)
+        .join(card, card.id == entry.card_definition_id)
+        .outerjoin(features, features.card_definition_id == entry.card_definition_id)
+        .filter(entry.user_id == user_id)
+        .group_by(func.grouping_sets(*dimensions.values(), literal_column("()")))
+    )
+
+    # GROUPING() sets one bit per dimension left out of the row's grouping set, first dimension highest
+    all_bits = (1 << len(dimensions)) - 1
+    dimension_by_grouping = {all_bits ^ (1 << (len(dimensions) - 1 - i)): name for i, name in enumerate(dimensions)}
+    stats: Dict[str, List[schemas.CollectionStatsBucket]] = {name: [] for name in dimensions}
+    totals = {"total_copies": 0, "total_entries": 0}
+    for row in await db.execute(query):
+        if row.grouping_bits == all_bits:
+            totals = {"total_copies": row.copies or 0, "total_entries": row.entries}
+            continue
+        name = dimension_by_grouping[row.grouping_bits]
+        key = getattr(row, name)
+        if key is None:
+            if name == "cmc":
+                continue
+            key = "unknown"
+        elif name == "color_identity":
+            key = _color_identity_label(key)
+        stats[name].append(schemas.CollectionStatsBucket(key=str(key), copies=row.copies, entries=row.entries))
+
+    for name, buckets in stats.items():
+        if name == "cmc":
+            buckets.sort(key=lambda bucket: int(bucket.key))
+        else:
+            buckets.sort(key=lambda bucket: (-bucket.copies, bucket.key))
+    return {**totals, **stats}
+
+
+async def get_collection_stats(db: AsyncSession, user: models.User) -> schemas.CollectionStats:
+    """The user's collection breakdowns, from the cache when their collection hasn't changed."""
+    stats = _stats_cache.get(user.id, user.collection_version)
+    if stats is None:
+        stats = schemas.CollectionStats(collection_version=user.collection_version, **await _compute(db, user.id))
+        _stats_cache.put(user.id, user.collection_version, stats)
+    return stats
@@ -0,0 +1,128 @@
+# app/collection_summary.py
+"""
+Per-user collection totals (copies, entries, USD/EUR value) kept in user_collection_summaries,
+so /collection/summary is one primary-key read however large the collection is.
+
+Every collection write reports the quantity change per card through `apply_changes`, and one
+UPDATE adds the priced deltas to the user's row. A user without a row yet gets it computed in
+full instead. `recompute` rebuilds rows from the entries with one INSERT ... SELECT ... ON
+CONFLICT; populate_cards.py runs it for everyone after refreshing card prices.
+"""
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Integer, Numeric, column, func, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import models, schemas
+
+# Summary column -> (Scryfall price key, quantity column it is multiplied by)
+_VALUE_COLUMNS = {
+    "value_usd_normal": ("usd", "quantity_normal"),
+    "value_usd_foil": ("usd_foil", "quantity_foil"),
+    "value_eur_normal": ("eur", "quantity_normal"),
+    "value_eur_foil": ("eur_foil", "quantity_foil"),
+}
+_QUANTITY_COLUMNS = ("quantity_normal", "quantity_foil", "unique_printings")
+
+
+@dataclass
+class EntryChange:
+    """How one collection write changed a card's copies (negative for removals)."""
+    card_definition_id: int
+    quantity_normal: int = 0
+    quantity_foil: int = 0
+    entries: int = 0 # +1 for a new entry, -1 for a deleted one
+
+
+def _price(key: str):
+    # Unpriced cards count as 0
+    return func.coalesce(models.CardDefinition.prices[key].astext.cast(Numeric), 0)
+
+
+async def recompute(db: AsyncSession, user_ids: Optional[List[int]] = None) -> int:
+    """Rebuild the summaries of `user_ids` (default: every user) from their entries. Returns the rows written."""
+    entry = models.UserCollectionEntry
+    totals = (
+        select(
+            models.User.id,
+            func.coalesce(func.sum(entry.quantity_normal), 0),
+            func.coalesce(func.sum(entry.quantity_foil), 0),
+            func.count(entry.id),
+            *(func.coalesce(func.sum(getattr(entry, quantity) * _price(key)), 0) for key, quantity in _VALUE_COLUMNS.values()),
+        )
+        .select_from(models.User)
+        .outerjoin(entry, entry.user_id == models.User.id)
+        .outerjoin(models.CardDefinition, models.CardDefinition.id == entry.card_definition_id)
+        .group_by(models.User.id)
+    )
+    if user_ids is not None:
+        totals = totals.filter(models.User.id.in_(user_ids))
+
+    summary_columns = [*_QUANTITY_COLUMNS, *_VALUE_COLUMNS]
+    upsert = pg_insert(models.UserCollectionSummary).from_select(["user_id", *summary_columns], totals)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[models.UserCollectionSummary.user_id],
+        set_={**{name: upsert.excluded[name] for name in summary_columns}, "date_updated": func.now()},
+    )
+    result = await db.execute(upsert)
+    return result.rowcount
+
+
+async def apply_changes(db: AsyncSession, user_id: int, changes: Iterable[EntryChange]) -> None:
+    """
+    Add the effect of `changes` (already flushed to user_collection_entries) to the user's
+    summary, valued at current prices.
+    """
+    rows = [
+        (change.card_definition_id, change.quantity_normal, change.quantity_foil, change.entries)
+        for change in changes if change.quantity_normal or change.quantity_foil or change.entries
+    ]
+    if not rows:
+        return
+    deltas = values(
+        column("card_definition_id", Integer), column("quantity_normal", Integer),
+        column("quantity_foil", Integer), column("unique_printings", Integer),
+        name="deltas",
+    ).data(rows)
+    totals = (
+        select(
+            *(func.coalesce(func.sum(deltas.c[name]), 0).label(name) for name in _QUANTITY_COLUMNS),
+            *(func.coalesce(func.sum(deltas.c[quantity] * _price(key)), 0).label(name) for name, (key, quantity) in _VALUE_COLUMNS.items()),
+        )
+        .select_from(deltas.join(models.CardDefinition, models.CardDefinition.id == deltas.c.card_definition_id))
+        .subquery("totals")
+    )
+    summary = models.UserCollectionSummary
+    result = await db.execute(
+        update(summary)
+        .where(summary.user_id == user_id)
+        .values(date_updated=func.now(), **{name: getattr(summary, name) + totals.c[name] for name in (*_QUANTITY_COLUMNS, *_VALUE_COLUMNS)})
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0: # First write since the summaries were introduced
+        await recompute(db, [user_id])
+
+
+async def get_summary(db: AsyncSession, user_id: int) -> schemas.CollectionSummary:
+    summary = models.UserCollectionSummary
+    query = select(summary).filter(summary.user_id == user_id)
+    row = (await db.execute(query)).scalar_one_or_none()
+    if row is None:
+        await recompute(db, [user_id])
+        row = (await db.execute(query)).scalar_one()
+    return schemas.CollectionSummary(
+        total_quantity=row.quantity_normal + row.quantity_foil,
+        quantity_normal=row.quantity_normal,
+        quantity_foil=row.quantity_foil,
+        unique_printings=row.unique_printings,
+        value_usd=row.value_usd_normal + row.value_usd_foil,
+        value_usd_normal=row.value_usd_normal,
+        value_usd_foil=row.value_usd_foil,
+        value_eur=row.value_eur_normal + row.value_eur_foil,
+        value_eur_normal=row.value_eur_normal,
+        value_eur_foil=row.value_eur_foil,
+        date_updated=row.date_updated,
+    )
@@ -0,0 +1,84 @@
+# app/compression.py
+"""
+Response compression: brotli when the client accepts it (and the brotli package is
+installed), gzip otherwise. Built on Starlette's GZipMiddleware responders, so the
+minimum size threshold, Vary header and streaming responses behave the same way.
+Images are already compressed and are passed through untouched.
+"""
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError: # Optional; gzip is used when it isn't installed
+    brotli = None
+
+EXCLUDED_CONTENT_TYPES = ("text/event-stream", "image/", "application/zip", "application/gzip")
+
+
+class _SkipPrecompressedMixin:
+    """Leave already-compressed content types alone (Starlette only skips event streams)."""
+
+    async def send_with_compression(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            await super().send_with_compression(message)
+            self.content_type_is_excluded = self.content_type_is_excluded or content_type.startswith(EXCLUDED_CONTENT_TYPES)
+            return
+        await super().send_with_compression(message)
+
+
+class _IdentityResponder(_SkipPrecompressedMixin, IdentityResponder):
+    content_encoding = "identity"
+
+
+class _GZipResponder(_SkipPrecompressedMixin, GZipResponder):
+    pass
+
+
+class _BrotliResponder(_SkipPrecompressedMixin, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.process(body)
+        return compressed + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class CompressionMiddleware:
+    """
+    Compress responses of at least `minimum_size` bytes. Brotli quality 4 and gzip
+    level 6 keep compression well under a millisecond for typical JSON pages.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, brotli_quality: int = 4, gzip_level: int = 6) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip_level = gzip_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("Accept-Encoding", "")
+        if brotli is not None and _accepts(accept_encoding, "br"):
+            responder = _BrotliResponder(self.app, self.minimum_size, quality=self.brotli_quality)
+        elif _accepts(accept_encoding, "gzip"):
+            responder = _GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = _IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
@@ -0,0 +1,68 @@
+# app/conditional.py
+"""
+Weak ETags and conditional GET (If-None-Match -> 304) for JSON responses.
+
+User collection and deck responses use version stamps that crud bumps on every write
+(users.collection_version, users.deck_version, decks.version), so a matching request
+is answered before anything is loaded or serialized. Card catalog responses have no
+such stamp and are tagged with a hash of the encoded body instead, which still saves
+the transfer.
+"""
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .serializers import json_response
+
+# Clients must revalidate every time, but may keep the body for a 304; never shared caches.
+CACHE_CONTROL = "private, no-cache"
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.blake2b("\x1f".join(str(part) for part in parts).encode(), digest_size=12).hexdigest()
+
+
+def version_etag(request: Request, *version_parts: Any) -> str:
+    """
+    Weak ETag for a response determined by `version_parts` (e.g. user id and collection
+    version) and the request's path and query string (paging, view, fields...).
+    """
+    query = "&".join(sorted(str(request.query_params).split("&")))
+    return f'W/"{_digest(request.url.path, query, *version_parts)}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    # Weak comparison: W/ prefixes are ignored on both sides
+    return any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == opaque
+        for candidate in (part.strip() for part in if_none_match.split(","))
+    )
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client already has the representation tagged `etag`, else None."""
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
+
+def tagged_json_response(request: Request, content: Any, etag: Optional[str] = None, headers: Optional[dict] = None) -> Response:
+    """
+    JSON response carrying `etag`, or a weak ETag of the encoded body when none is given.
+    Returns a 304 instead when the client's If-None-Match matches.
+    """
+    response = json_response(content, headers=headers)
+    etag = etag or f'W/"{hashlib.blake2b(response.body, digest_size=12).hexdigest()}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={**(headers or {}), "ETag": etag, "Cache-Control": CACHE_CONTROL})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
@@ -6,6 +6,8 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     SECRET_KEY: str = "your_default_secret_key_please_change_in_env" # Should be overridden by .env
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 5256000 # Default to 30 minutes
+    CARD_INDEX_DIR: str = "data/card_index" # Memory-mapped card index written by scripts/build_card_index.py
+    SIMILARITY_INDEX_DIR: str = "data/similarity_index" # TF-IDF vectors written by scripts/build_similarity_index.py
 
     class Config:
         env_file = ".env" # Specifies the .env file to load variables from
@@ -1,11 +1,14 @@
 # app/crud.py
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select # For SQLAlchemy 2.0 style select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, defer, load_only
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql import func # For now() in update
-from typing import Optional, List, Dict, Any # Import Dict, Any for update_card if needed, though not directly used in this snippet
+from sqlalchemy import Integer, Numeric, String, any_, bindparam, case, distinct, literal_column, or_, true, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from typing import Optional, List, Dict, Any, Tuple, Sequence # Import Dict, Any for update_card if needed, though not directly used in this snippet
 import asyncio # For potential concurrent image downloads
-from . import models, schemas
+from . import models, schemas, card_features, collection_summary, deck_validation, serializers, sync
 from .security import get_password_hash
 import httpx # Moved import to top level
 
@@ -53,6 +56,14 @@ async def _fetch_and_store_card_definition_from_scryfall(db: AsyncSession, scryf
                 "image_uri_art_crop": image_uris.get("art_crop"),
                 "image_uri_border_crop": image_uris.get("border_crop"),
                 "type_line": scryfall_data.get("type_line"),
+                "mana_cost": scryfall_data.get("mana_cost"),
+                "cmc": scryfall_data.get("cmc"),
+                "oracle_text": scryfall_data.get("oracle_text"),
+                "colors": scryfall_data.get("colors"),
+                "color_identity": scryfall_data.get("color_identity"),
+                "card_faces": scryfall_data.get("card_faces"),
+                "rarity": scryfall_data.get("rarity"),
+                "layout": scryfall_data.get("layout"),
                 "image_data_small": None, # Initialize
                 "image_data_normal": None,
                 "image_data_large": None,
@@ -74,6 +85,8 @@ async def _fetch_and_store_card_definition_from_scryfall(db: AsyncSession, scryf
             db.add(db_card_def)
             await db.flush()
             await db.refresh(db_card_def)
+            await refresh_card_features(db, card_definition_ids=[db_card_def.id])
+            await refresh_card_documents(db, card_definition_ids=[db_card_def.id])
             print(f"Successfully fetched and stored CardDefinition for {scryfall_id} ('{card_def_model_data['name']}') from Scryfall.")
             return db_card_def
 
@@ -114,6 +127,20 @@ async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User
     return db_user
 
 # --- CardDefinition CRUD ---
+def _without_image_blobs():
+    """Loader options that leave the stored image blobs out of a CardDefinition query (see has_image_*)."""
+    return (
+        defer(models.CardDefinition.image_data_small),
+        defer(models.CardDefinition.image_data_normal),
+        defer(models.CardDefinition.image_data_large),
+    )
+
+def _card_load_options(card_columns: Optional[Sequence[Any]] = None):
+    """Load only `card_columns` of CardDefinition (see serializers.card_columns), or everything but the image blobs."""
+    if card_columns:
+        return (load_only(*card_columns),)
+    return _without_image_blobs()
+
 async def get_card_definition_by_scryfall_id(db: AsyncSession, scryfall_id: str) -> Optional[models.CardDefinition]:
     """
     Retrieve a card definition from the database by its Scryfall ID.
@@ -127,16 +154,58 @@ async def get_card_definition(db: AsyncSession, card_definition_id: int) -> Opti
     """
     Retrieve a card definition from the database by its primary key ID.
     """
-    result = await db.execute(select(models.CardDefinition).filter(models.CardDefinition.id == card_definition_id))
+    result = await db.execute(
+        select(models.CardDefinition).filter(models.CardDefinition.id == card_definition_id).options(*_without_image_blobs())
+    )
     return result.scalars().first()
 
+def _filter_card_definitions(query, name: Optional[str] = None, type_line: Optional[str] = None, set_code: Optional[str] = None):
+    """Apply the shared card search filters to a select() over CardDefinition."""
+    if name:
+        query = query.filter(models.CardDefinition.name.ilike(f"%{name}%"))
+    if type_line:
+        query = query.filter(models.CardDefinition.type_line.ilike(f"%{type_line}%"))
+    if set_code:
+        query = query.filter(models.CardDefinition.set_code.ilike(f"%{set_code}%"))
+    # Add more filters for other fields as needed
+    return query
+
+async def get_card_definitions_by_ids(db: AsyncSession, card_definition_ids: List[int], card_columns: Optional[Sequence[Any]] = None) -> List[models.CardDefinition]:
+    """
+    Retrieve card definitions by primary key, in the order the ids were given.
+    Ids that don't exist are skipped.
+    """
+    if not card_definition_ids:
+        return []
+    # One array parameter (= ANY) instead of one bind per id keeps the statement the same for any batch size
+    result = await db.execute(
+        select(models.CardDefinition)
+        .filter(models.CardDefinition.id == any_(bindparam("card_definition_ids", list(card_definition_ids), type_=ARRAY(Integer))))
+        .options(*_card_load_options(card_columns))
+    )
+    by_id = {card_def.id: card_def for card_def in result.scalars().all()}
+    return [by_id[card_id] for card_id in card_definition_ids if card_id in by_id]
+
+async def get_card_definitions_by_scryfall_ids(db: AsyncSession, scryfall_ids: List[str], card_columns: Optional[Sequence[Any]] = None) -> List[models.CardDefinition]:
+    """Like get_card_definitions_by_ids, by Scryfall ID."""
+    if not scryfall_ids:
+        return []
+    result = await db.execute(
+        select(models.CardDefinition)
+        .filter(models.CardDefinition.scryfall_id == any_(bindparam("scryfall_ids", list(scryfall_ids), type_=ARRAY(String))))
+        .options(*_card_load_options(card_columns))
+    )
+    by_scryfall_id = {card_def.scryfall_id: card_def for card_def in result.scalars().all()}
+    return [by_scryfall_id[scryfall_id] for scryfall_id in scryfall_ids if scryfall_id in by_scryfall_id]
+
 async def get_card_definitions(
     db: AsyncSession,
     skip: int = 0,
     limit: int = 100,
     name: Optional[str] = None,
     type_line: Optional[str] = None,
-    set_code: Optional[str] = None
+    set_code: Optional[str] = None,
+    card_columns: Optional[Sequence[Any]] = None
     # Add other searchable fields as parameters here
 ) -> List[models.CardDefinition]:
     """
@@ -144,17 +213,127 @@ async def get_card_definitions(
     - If 'name' is provided, it will list all printings of that card.
     - Other fields can be used for more specific filtering.
     """
-    query = select(models.CardDefinition)
-    if name:
-        query = query.filter(models.CardDefinition.name.ilike(f"%{name}%"))
-    if type_line:
-        query = query.filter(models.CardDefinition.type_line.ilike(f"%{type_line}%"))
-    if set_code:
-        query = query.filter(models.CardDefinition.set_code.ilike(f"%{set_code}%"))
-    # Add more filters for other fields as needed
+    query = _filter_card_definitions(select(models.CardDefinition).options(*_card_load_options(card_columns)), name=name, type_line=type_line, set_code=set_code)
+    query = query.order_by(models.CardDefinition.name, models.CardDefinition.set_code, models.CardDefinition.collector_number).offset(skip).limit(limit)
+    result = await db.execute(query)
+    return result.scalars().all()
 
+def _with_ownership(query, user_id: int):
+    """
+    Add the user's owned quantities and deck usage for each CardDefinition row of `query`.
+    Both are LEFT JOIN LATERAL aggregates, so they are only evaluated for the rows that
+    survive the outer query's LIMIT, through the (user_id, card_definition_id) and
+    (card_definition_id, deck_id) indexes.
+    """
+    card = models.CardDefinition
+    entry = models.UserCollectionEntry
+    owned = (
+        select(
+            func.coalesce(func.sum(entry.quantity_normal), 0).label("quantity_normal"),
+            func.coalesce(func.sum(entry.quantity_foil), 0).label("quantity_foil"),
+        )
+        .filter(entry.user_id == user_id, entry.card_definition_id == card.id)
+        .lateral("owned")
+    )
+    in_decks = (
+        select(
+            func.coalesce(func.sum(models.DeckEntry.quantity), 0).label("deck_quantity"),
+            func.count(distinct(models.DeckEntry.deck_id)).label("deck_count"),
+        )
+        .join(models.Deck, models.Deck.id == models.DeckEntry.deck_id)
+        .filter(models.Deck.user_id == user_id, models.DeckEntry.card_definition_id == card.id)
+        .lateral("in_decks")
+    )
+    return (
+        query.select_from(card)
+        .outerjoin(owned, true())
+        .outerjoin(in_decks, true())
+        .add_columns(owned.c.quantity_normal, owned.c.quantity_foil, in_decks.c.deck_quantity, in_decks.c.deck_count)
+    )
+
+async def get_card_definitions_with_ownership(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    name: Optional[str] = None,
+    type_line: Optional[str] = None,
+    set_code: Optional[str] = None,
+    card_columns: Optional[Sequence[Any]] = None
+) -> List[Tuple[models.CardDefinition, int, int, int, int]]:
+    """
+    Same search as get_card_definitions, but each row also carries the user's owned
+    normal/foil quantities and how many copies are used across how many of their decks:
+    (card_definition, quantity_normal, quantity_foil, deck_quantity, deck_count).
+    """
+    query = _filter_card_definitions(select(models.CardDefinition).options(*_card_load_options(card_columns)), name=name, type_line=type_line, set_code=set_code)
+    query = _with_ownership(query, user_id)
     query = query.order_by(models.CardDefinition.name, models.CardDefinition.set_code, models.CardDefinition.collector_number).offset(skip).limit(limit)
     result = await db.execute(query)
+    return result.all()
+
+async def get_collapsed_card_definitions(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    name: Optional[str] = None,
+    type_line: Optional[str] = None,
+    set_code: Optional[str] = None,
+    card_columns: Optional[Sequence[Any]] = None
+) -> List[Tuple[models.CardDefinition, int, int]]:
+    """
+    Like get_card_definitions, but returns one representative printing per card name.
+    The representative is the newest printing; each row also carries the number of
+    matching printings and the id of the cheapest one by USD price (None if none is priced).
+    Everything is computed in SQL with window functions, so only one row per name
+    ever leaves the database.
+    """
+    card = models.CardDefinition
+    usd_price = card.prices["usd"].astext.cast(Numeric)
+    ranked = _filter_card_definitions(
+        select(
+            card.id.label("id"),
+            func.row_number().over(
+                partition_by=card.name,
+                order_by=(card.released_at.desc().nulls_last(), card.id.desc())
+            ).label("newest_rank"),
+            func.count().over(partition_by=card.name).label("printing_count"),
+            case( # None unless some printing has a price; first_value alone would pick the lowest id
+                (func.max(usd_price).over(partition_by=card.name).is_(None), None),
+                else_=func.first_value(card.id).over(
+                    partition_by=card.name,
+                    order_by=(usd_price.asc().nulls_last(), card.id)
+                ),
+            ).label("cheapest_printing_id"),
+        ),
+        name=name, type_line=type_line, set_code=set_code
+    ).subquery()
+
+    query = (
+        select(card, ranked.c.printing_count, ranked.c.cheapest_printing_id)
+        .join(ranked, ranked.c.id == card.id)
+        .filter(ranked.c.newest_rank == 1)
+        .options(*_card_load_options(card_columns))
+        .order_by(card.name)
+        .offset(skip)
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    return result.all()
+
+async def get_card_printings(db: AsyncSession, name: str, skip: int = 0, limit: int = 100, card_columns: Optional[Sequence[Any]] = None) -> List[models.CardDefinition]:
+    """
+    Retrieve the printings of a single card (exact name match), newest first.
+    This is the follow-up to a collapsed search result.
+    """
+    result = await db.execute(
+        select(models.CardDefinition)
+        .filter(models.CardDefinition.name == name)
+        .options(*_card_load_options(card_columns))
+        .order_by(models.CardDefinition.released_at.desc().nulls_last(), models.CardDefinition.id.desc())
+        .offset(skip)
+        .limit(limit)
+    )
     return result.scalars().all()
 
 async def create_card_definition(db: AsyncSession, card_def: schemas.CardDefinitionCreate) -> models.CardDefinition:
@@ -166,27 +345,242 @@ async def create_card_definition(db: AsyncSession, card_def: schemas.CardDefinit
     db.add(db_card_def)
     await db.flush()
     await db.refresh(db_card_def)
+    await refresh_card_features(db, card_definition_ids=[db_card_def.id])
+    await refresh_card_documents(db, card_definition_ids=[db_card_def.id])
     return db_card_def
 
 # (update_card_definition and delete_card_definition can be added if needed for admin purposes)
 
+# --- CardFeatures (derived columns) ---
+async def refresh_card_features(db: AsyncSession, card_definition_ids: Optional[List[int]] = None, batch_size: int = 1000) -> int:
+    """
+    Recompute the derived card_features rows (pips, color identity mask, types, mana flags,
+    front-face cmc, legality masks and deck-building flags) from card_definitions and upsert
+    them in batches.
+    Refreshes every card unless card_definition_ids is given. Returns the number of rows written.
+    """
+    card = models.CardDefinition
+    feature_columns = [column.name for column in models.CardFeatures.__table__.columns if column.name not in ("card_definition_id", "date_updated")]
+    upsert = pg_insert(models.CardFeatures)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[models.CardFeatures.card_definition_id],
+        set_={**{name: upsert.excluded[name] for name in feature_columns}, "date_updated": func.now()},
+    )
+
+    written = 0
+    last_id = 0
+    while True: # Keyset pagination keeps each batch an indexed range scan
+        query = (
+            select(card.id, card.mana_cost, card.cmc, card.type_line, card.oracle_text, card.card_faces, card.colors, card.color_identity, card.legalities)
+            .filter(card.id > last_id)
+            .order_by(card.id)
+            .limit(batch_size)
+        )
+        if card_definition_ids is not None:
+            query = query.filter(card.id.in_(card_definition_ids))
+        rows = (await db.execute(query)).all()
+        if not rows:
+            break
+        await db.execute(upsert, [{"card_definition_id": row.id, **card_features.compute_card_features(row)} for row in rows])
+        written += len(rows)
+        last_id = rows[-1].id
+    return written
+
+async def refresh_card_documents(
+    db: AsyncSession, card_definition_ids: Optional[List[int]] = None, stale_only: bool = False, batch_size: int = 1000
+) -> int:
+    """
+    Rebuild the stored full/slim JSON documents (serializers.build_card_documents) in batches.
+    Refreshes every card unless card_definition_ids is given, or only cards whose documents are
+    missing (json_version IS NULL) with stale_only. Returns the number of rows written.
+    """
+    card = models.CardDefinition
+    table = card.__table__
+    fields = sorted({name for name in serializers.FULL_CARD_FIELDS + serializers.SLIM_CARD_FIELDS if not name.startswith("local_image_url_")})
+    store = (
+        update(table)
+        .where(table.c.id == bindparam("card_id"))
+        # Keep date_updated as serialized in the documents instead of letting onupdate bump it
+        .values(json_full=bindparam("new_json_full"), json_slim=bindparam("new_json_slim"),
+                json_version=serializers.CARD_DOCUMENT_VERSION, date_updated=table.c.date_updated)
+    )
+
+    written = 0
+    last_id = 0
+    while True: # Keyset pagination keeps each batch an indexed range scan
+        query = select(*(getattr(card, name) for name in fields)).filter(card.id > last_id).order_by(card.id).limit(batch_size)
+        if card_definition_ids is not None:
+            query = query.filter(card.id.in_(card_definition_ids))
+        if stale_only:
+            query = query.filter(card.json_version.is_(None))
+        rows = (await db.execute(query)).all()
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            documents = serializers.build_card_documents(row)
+            params.append({"card_id": row.id, "new_json_full": documents["json_full"], "new_json_slim": documents["json_slim"]})
+        await db.execute(store, params)
+        written += len(rows)
+        last_id = rows[-1].id
+    return written
+
+async def card_documents_current(db: AsyncSession) -> bool:
+    """Whether every card has stored documents of the current serializers.CARD_DOCUMENT_VERSION."""
+    result = await db.execute(
+        select(models.CardDefinition.id)
+        .filter(or_(models.CardDefinition.json_version.is_(None), models.CardDefinition.json_version != serializers.CARD_DOCUMENT_VERSION))
+        .limit(1)
+    )
+    return result.first() is None
+
+# --- Version stamps (ETags) ---
+async def lock_collection(db: AsyncSession, user_id: int) -> None:
+    """
+    Take the user row's lock (the one bump_collection_version's UPDATE takes) until commit. Every
+    collection write calls this before reading the entries it changes, so concurrent writers queue
+    up instead of deadlocking, tripping the unique entry key or writing quantities from a stale read.
+    """
+    await db.execute(select(models.User.id).filter(models.User.id == user_id).with_for_update(key_share=True))
+
+async def bump_collection_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """
+    Mark the user's collection as changed; call from every write to user_collection_entries,
+    after the write. Stamps the written rows for delta sync (see app/sync.py). Returns the new version.
+    """
+    await db.flush() # Pending ORM changes are stamped too
+    result = await db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(collection_version=models.User.collection_version + 1)
+        .returning(models.User.collection_version)
+        .execution_options(synchronize_session=False)
+    )
+    version = result.scalar_one_or_none()
+    if version is not None:
+        await sync.stamp_collection(db, user_id, version)
+    return version
+
+async def bump_deck_version(db: AsyncSession, user_id: Optional[int] = None, deck_id: Optional[int] = None) -> Optional[int]:
+    """
+    Mark a deck (if given) and the owner's deck list as changed; call from every write to
+    decks or deck_entries, after the write. The owner is looked up from the deck when user_id
+    isn't given. Stamps the written rows for delta sync (see app/sync.py). Returns the deck's
+    new version (None without a deck).
+    """
+    await db.flush() # Pending ORM changes are stamped too
+    deck_version = None
+    if deck_id is not None:
+        result = await db.execute(
+            update(models.Deck)
+            .where(models.Deck.id == deck_id)
+            .values(version=models.Deck.version + 1, date_updated=func.now())
+            .returning(models.Deck.user_id, models.Deck.version)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.first()
+        if row is not None:
+            deck_version = row.version
+            user_id = user_id if user_id is not None else row.user_id
+    if user_id is not None:
+        result = await db.execute(
+            update(models.User)
+            .where(models.User.id == user_id)
+            .values(deck_version=models.User.deck_version + 1)
+            .returning(models.User.deck_version)
+            .execution_options(synchronize_session=False)
+        )
+        user_deck_version = result.scalar_one_or_none()
+        if user_deck_version is not None:
+            await sync.stamp_decks(db, user_id, user_deck_version)
+    return deck_version
+
+async def get_deck_version(db: AsyncSession, user_id: int, deck_id: int) -> Optional[int]:
+    """The deck's version stamp, or None if the user has no such deck."""
+    result = await db.execute(select(models.Deck.version).filter(models.Deck.id == deck_id, models.Deck.user_id == user_id))
+    return result.scalar_one_or_none()
+
+# --- Delta sync (see app/sync.py) ---
+async def _deleted_ids(db: AsyncSession, user_id: int, entity: str, since: int, version: int) -> List[int]:
+    tombstone = models.SyncTombstone
+    result = await db.execute(
+        select(tombstone.entity_id)
+        .filter(tombstone.user_id == user_id, tombstone.entity == entity, tombstone.change_version > since, tombstone.change_version <= version)
+        .order_by(tombstone.entity_id)
+    )
+    return list(result.scalars())
+
+async def get_collection_changes(
+    db: AsyncSession, user_id: int, since: int, version: int, card_columns: Optional[Sequence[Any]] = None
+) -> sync.CollectionChanges:
+    """
+    Collection entries changed and deleted after version `since`, up to `version` (the user's
+    collection_version read before this call). A `since` of 0 or beyond `version` returns everything.
+    """
+    changes = sync.CollectionChanges(reset=since <= 0 or since > version)
+    if changes.reset:
+        since = 0
+    entry = models.UserCollectionEntry
+    result = await db.execute(
+        select(entry)
+        .filter(entry.user_id == user_id, entry.change_version > since, entry.change_version <= version)
+        .order_by(entry.id)
+        .options(selectinload(entry.card_definition).options(*_card_load_options(card_columns)))
+    )
+    changes.entries = list(result.scalars())
+    if not changes.reset:
+        changes.deleted_entry_ids = await _deleted_ids(db, user_id, sync.COLLECTION_ENTRY, since, version)
+    return changes
+
+async def get_deck_changes(
+    db: AsyncSession, user_id: int, since: int, version: int, card_columns: Optional[Sequence[Any]] = None
+) -> sync.DeckChanges:
+    """Like get_collection_changes, for decks and deck entries against the user's deck_version."""
+    changes = sync.DeckChanges(reset=since <= 0 or since > version)
+    if changes.reset:
+        since = 0
+    deck, entry = models.Deck, models.DeckEntry
+    result = await db.execute(
+        select(deck)
+        .filter(deck.user_id == user_id, deck.change_version > since, deck.change_version <= version)
+        .order_by(deck.id)
+    )
+    changes.decks = list(result.scalars())
+    result = await db.execute(
+        select(entry)
+        .join(deck, deck.id == entry.deck_id)
+        .filter(deck.user_id == user_id, entry.change_version > since, entry.change_version <= version)
+        .order_by(entry.id)
+        .options(selectinload(entry.card_definition).options(*_card_load_options(card_columns)))
+    )
+    changes.entries = list(result.scalars())
+    if not changes.reset:
+        changes.deleted_deck_ids = await _deleted_ids(db, user_id, sync.DECK, since, version)
+        changes.deleted_entry_ids = await _deleted_ids(db, user_id, sync.DECK_ENTRY, since, version)
+    return changes
+
+async def get_deck_name(db: AsyncSession, user_id: int, deck_id: int) -> Optional[str]:
+    """The deck's name, or None if the user has no such deck."""
+    result = await db.execute(select(models.Deck.name).filter(models.Deck.id == deck_id, models.Deck.user_id == user_id))
+    return result.scalar_one_or_none()
+
 # --- UserCollectionEntry CRUD ---
 async def get_collection_entry(db: AsyncSession, user_id: int, collection_entry_id: int) -> Optional[models.UserCollectionEntry]:
     result = await db.execute(
         select(models.UserCollectionEntry)
         .filter(models.UserCollectionEntry.id == collection_entry_id, models.UserCollectionEntry.user_id == user_id)
-        .options(selectinload(models.UserCollectionEntry.card_definition)) # Eager load card_definition
+        .options(selectinload(models.UserCollectionEntry.card_definition).options(*_without_image_blobs())) # Eager load card_definition
     )
     return result.scalars().first()
 
-async def get_user_collection(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100) -> List[models.UserCollectionEntry]:
+async def get_user_collection(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100, card_columns: Optional[Sequence[Any]] = None) -> List[models.UserCollectionEntry]:
     result = await db.execute(
         select(models.UserCollectionEntry)
         .filter(models.UserCollectionEntry.user_id == user_id)
         .order_by(models.UserCollectionEntry.id) # Or by card name, date added etc.
         .offset(skip)
         .limit(limit)
-        .options(selectinload(models.UserCollectionEntry.card_definition)) # Eager load card_definition
+        .options(selectinload(models.UserCollectionEntry.card_definition).options(*_card_load_options(card_columns))) # Eager load card_definition
     )
     return result.scalars().all()
 
@@ -198,49 +592,48 @@ async def add_card_to_collection(db: AsyncSession, user_id: int, entry_create: s
         if not card_def:
             raise ValueError(f"Could not find or fetch CardDefinition with Scryfall ID {entry_create.card_definition_scryfall_id} from Scryfall.")
 
-    # 2. Check if an entry for this card already exists for the user
-    stmt = select(models.UserCollectionEntry).filter_by(
-        user_id=user_id, 
+    # 2. Add the entry, or increment the existing one, in a single statement: the unique
+    # (user_id, card_definition_id) key makes concurrent adds of the same card safe
+    await lock_collection(db, user_id)
+    entry = models.UserCollectionEntry
+    stmt = pg_insert(entry).values(
+        user_id=user_id,
         card_definition_id=card_def.id,
-        # You might also want to filter by condition, language if you treat these as distinct entries
-        # For this example, we assume same card_definition_id means it's the same conceptual entry.
-    )
-    result = await db.execute(stmt)
-    db_collection_entry = result.scalars().first()
-
-    if db_collection_entry:
-        # Update existing entry
-        update_data = entry_create.model_dump(exclude={"card_definition_scryfall_id"}, exclude_unset=True)
-        if 'quantity_normal' in update_data:
-            db_collection_entry.quantity_normal += update_data['quantity_normal'] # Increment
-        if 'quantity_foil' in update_data:
-            db_collection_entry.quantity_foil += update_data['quantity_foil'] # Increment
-        
-        # For other fields, you might want to overwrite or have specific logic
-        if 'condition' in update_data: db_collection_entry.condition = update_data['condition']
-        if 'language' in update_data: db_collection_entry.language = update_data['language']
-        if 'notes' in update_data: db_collection_entry.notes = update_data['notes']
-        
-        db_collection_entry.date_updated_in_collection = func.now() # Explicitly set update timestamp
-    else:
-        # Create new entry
-        db_collection_entry = models.UserCollectionEntry(
-            user_id=user_id,
-            card_definition_id=card_def.id,
-            **entry_create.model_dump(exclude={"card_definition_scryfall_id"})
-        )
-        db.add(db_collection_entry)
+        **entry_create.model_dump(exclude={"card_definition_scryfall_id"})
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[entry.user_id, entry.card_definition_id],
+        set_={
+            # Quantities are incremented (unset ones are 0); other fields are overwritten only when given
+            "quantity_normal": entry.quantity_normal + stmt.excluded.quantity_normal,
+            "quantity_foil": entry.quantity_foil + stmt.excluded.quantity_foil,
+            **{name: stmt.excluded[name] for name in ("condition", "language", "notes") if name in entry_create.model_fields_set},
+            "date_updated_in_collection": func.now(),
+            "change_version": None, # Column onupdates don't apply to ON CONFLICT; stamped by the version bump
+        },
+    )
+    # xmax is 0 for a freshly inserted row and set for one updated by ON CONFLICT
+    result = await db.execute(
+        stmt.returning(entry, literal_column("xmax = 0").label("inserted")),
+        execution_options={"populate_existing": True},
+    )
+    db_collection_entry, inserted = result.one()
 
-    await db.flush()
-    await db.refresh(db_collection_entry)
-    # To include card_definition in the response, load it after refresh if not already loaded by relationship
-    await db.refresh(db_collection_entry, attribute_names=['card_definition'])
+    change = collection_summary.EntryChange(card_def.id, entry_create.quantity_normal, entry_create.quantity_foil, entries=1 if inserted else 0)
+    await collection_summary.apply_changes(db, user_id, [change])
+    await bump_collection_version(db, user_id)
+    set_committed_value(db_collection_entry, "card_definition", card_def) # Already loaded above; saves a refresh
     return db_collection_entry
 async def update_collection_entry(db: AsyncSession, db_collection_entry: models.UserCollectionEntry, entry_update: schemas.UserCollectionEntryUpdate) -> models.UserCollectionEntry:
     """
     Update an existing UserCollectionEntry.
     """
+    await lock_collection(db, db_collection_entry.user_id)
+    await db.refresh(db_collection_entry) # Quantities as of the lock, for the summary delta
     update_data = entry_update.model_dump(exclude_unset=True)
+    change = collection_summary.EntryChange(
+        db_collection_entry.card_definition_id, -db_collection_entry.quantity_normal, -db_collection_entry.quantity_foil
+    )
     for key, value in update_data.items():
         setattr(db_collection_entry, key, value)
     
@@ -249,12 +642,26 @@ async def update_collection_entry(db: AsyncSession, db_collection_entry: models.
 
     db.add(db_collection_entry)
     await db.flush()
+    change.quantity_normal += db_collection_entry.quantity_normal
+    change.quantity_foil += db_collection_entry.quantity_foil
+    await collection_summary.apply_changes(db, db_collection_entry.user_id, [change])
+    await bump_collection_version(db, db_collection_entry.user_id)
     await db.refresh(db_collection_entry)
     await db.refresh(db_collection_entry, attribute_names=['card_definition'])
     return db_collection_entry
 
 async def delete_collection_entry(db: AsyncSession, db_collection_entry: models.UserCollectionEntry) -> None:
+    user_id = db_collection_entry.user_id
+    await lock_collection(db, user_id)
+    await db.refresh(db_collection_entry)
+    change = collection_summary.EntryChange(
+        db_collection_entry.card_definition_id, -db_collection_entry.quantity_normal, -db_collection_entry.quantity_foil, entries=-1
+    )
+    await sync.record_deletions(db, user_id, sync.COLLECTION_ENTRY, [db_collection_entry.id])
     await db.delete(db_collection_entry)
+    await db.flush()
+    await collection_summary.apply_changes(db, user_id, [change])
+    await bump_collection_version(db, user_id)
     return None
 
 # --- Deck CRUD ---
@@ -262,28 +669,110 @@ async def create_deck(db: AsyncSession, user_id: int, deck_create: schemas.DeckC
     db_deck = models.Deck(**deck_create.model_dump(), user_id=user_id)
     db.add(db_deck)
     await db.flush()
+    await bump_deck_version(db, user_id=user_id)
     await db.refresh(db_deck)
     return db_deck
 
-async def get_deck(db: AsyncSession, user_id: int, deck_id: int) -> Optional[models.Deck]:
+async def get_deck(db: AsyncSession, user_id: int, deck_id: int, card_columns: Optional[Sequence[Any]] = None) -> Optional[models.Deck]:
     result = await db.execute(
         select(models.Deck)
         .filter(models.Deck.id == deck_id, models.Deck.user_id == user_id)
-        .options(selectinload(models.Deck.deck_entries).selectinload(models.DeckEntry.card_definition))
+        .options(selectinload(models.Deck.deck_entries).selectinload(models.DeckEntry.card_definition).options(*_card_load_options(card_columns)))
     )
     return result.scalars().first()
 
-async def get_user_decks(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100) -> List[models.Deck]:
+async def get_user_decks(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100, card_columns: Optional[Sequence[Any]] = None) -> List[models.Deck]:
     result = await db.execute(
         select(models.Deck)
         .filter(models.Deck.user_id == user_id)
         .order_by(models.Deck.name)
         .offset(skip)
         .limit(limit)
-        .options(selectinload(models.Deck.deck_entries).selectinload(models.DeckEntry.card_definition)) # Optionally load entries here or make it separate
+        .options(selectinload(models.Deck.deck_entries).selectinload(models.DeckEntry.card_definition).options(*_card_load_options(card_columns))) # Optionally load entries here or make it separate
     )
     return result.scalars().all()
 
+async def get_user_deck_summaries(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100) -> List[Any]:
+    """
+    One row per deck with its entry counts, commander names and the union of its cards'
+    color identities, aggregated in a single query without loading any entries.
+    Rows carry the deck's own columns (as in schemas.DeckSummary) plus card_count,
+    sideboard_count, entry_count, commander_names and color_identity_mask.
+    """
+    deck = models.Deck
+    entry = models.DeckEntry
+    features = models.CardFeatures
+    query = (
+        select(
+            deck.id, deck.user_id, deck.name, deck.description, deck.format, deck.date_created, deck.date_updated,
+            func.coalesce(func.sum(entry.quantity).filter(entry.is_sideboard.isnot(True)), 0).label("card_count"),
+            func.coalesce(func.sum(entry.quantity).filter(entry.is_sideboard.is_(True)), 0).label("sideboard_count"),
+            func.count(entry.id).label("entry_count"),
+            func.array_agg(models.CardDefinition.name).filter(entry.is_commander.is_(True)).label("commander_names"),
+            func.coalesce(func.bit_or(features.color_identity_mask), 0).label("color_identity_mask"),
+        )
+        .outerjoin(entry, entry.deck_id == deck.id)
+        .outerjoin(models.CardDefinition, models.CardDefinition.id == entry.card_definition_id)
+        .outerjoin(features, features.card_definition_id == entry.card_definition_id)
+        .filter(deck.user_id == user_id)
+        .group_by(deck.id)
+        .order_by(deck.name)
+        .offset(skip)
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    return result.all()
+
+async def get_missing_cards_by_deck(db: AsyncSession, user_id: int) -> List[Any]:
+    """
+    Cards each of the user's decks needs beyond what the collection holds, matched by card
+    name so any printing counts, in one query. Each deck is compared with the whole
+    collection on its own. Rows: (deck_id, deck_name, card_name, needed, owned,
+    cheapest_printing_id, cheapest_usd), with card_name None for decks that are complete.
+    """
+    deck, entry, card = models.Deck, models.DeckEntry, models.CardDefinition
+    needs = (
+        select(entry.deck_id, card.name.label("name"), func.sum(entry.quantity).label("needed"))
+        .join(deck, deck.id == entry.deck_id)
+        .join(card, card.id == entry.card_definition_id)
+        .filter(deck.user_id == user_id)
+        .group_by(entry.deck_id, card.name)
+        .cte("needs")
+    )
+    collection_entry = models.UserCollectionEntry
+    owned = (
+        select(card.name.label("name"), func.sum(collection_entry.quantity_normal + collection_entry.quantity_foil).label("owned"))
+        .join(card, card.id == collection_entry.card_definition_id)
+        .filter(collection_entry.user_id == user_id, card.name.in_(select(needs.c.name)))
+        .group_by(card.name)
+        .cte("owned")
+    )
+    short = (
+        select(needs.c.deck_id, needs.c.name, needs.c.needed, func.coalesce(owned.c.owned, 0).label("owned"))
+        .outerjoin(owned, owned.c.name == needs.c.name)
+        .filter(needs.c.needed > func.coalesce(owned.c.owned, 0))
+        .cte("short")
+    )
+    # Cheapest priced printing of each missing name. The key is inlined rather than bound so the
+    # expression matches ix_card_definitions_name_usd, which serves the DISTINCT ON.
+    usd_price = card.prices.op("->>")(literal_column("'usd'")).cast(Numeric)
+    cheapest = (
+        select(card.name.label("name"), card.id.label("id"), usd_price.label("usd"))
+        .filter(card.name.in_(select(short.c.name)), usd_price.isnot(None))
+        .distinct(card.name)
+        .order_by(card.name, usd_price, card.id)
+        .cte("cheapest")
+    )
+    query = (
+        select(deck.id, deck.name, short.c.name, short.c.needed, short.c.owned, cheapest.c.id, cheapest.c.usd)
+        .outerjoin(short, short.c.deck_id == deck.id)
+        .outerjoin(cheapest, cheapest.c.name == short.c.name)
+        .filter(deck.user_id == user_id)
+        .order_by(deck.name, deck.id, short.c.name)
+    )
+    result = await db.execute(query)
+    return result.all()
+
 async def update_deck(db: AsyncSession, db_deck: models.Deck, deck_update: schemas.DeckUpdate) -> models.Deck:
     update_data = deck_update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
@@ -292,15 +781,16 @@ async def update_deck(db: AsyncSession, db_deck: models.Deck, deck_update: schem
         db_deck.date_updated = func.now()
     db.add(db_deck)
     await db.flush()
-    await db.refresh(db_deck)
-    # Refresh relationships if they might have changed or if needed for the response
-    await db.refresh(db_deck, attribute_names=['deck_entries'])
-    for entry in db_deck.deck_entries: # Ensure card_definitions within entries are loaded
-        await db.refresh(entry, attribute_names=['card_definition'])
+    await bump_deck_version(db, user_id=db_deck.user_id, deck_id=db_deck.id)
+    # Only the deck's own columns changed; entries and their cards loaded by get_deck are still current
+    await db.refresh(db_deck, attribute_names=['name', 'description', 'format', 'date_updated', 'version'])
     return db_deck
 
 async def delete_deck(db: AsyncSession, db_deck: models.Deck) -> None:
+    user_id = db_deck.user_id
+    await sync.record_deletions(db, user_id, sync.DECK, [db_deck.id]) # Covers its entries
     await db.delete(db_deck)
+    await bump_deck_version(db, user_id=user_id)
     return None
 
 # --- DeckEntry CRUD ---
@@ -316,44 +806,28 @@ async def add_card_to_deck(db: AsyncSession, deck_model: models.Deck, deck_entry
         if not card_def:
             raise ValueError(f"Could not find or fetch CardDefinition with Scryfall ID {deck_entry_create.card_definition_scryfall_id} from Scryfall.")
 
-    # Perform legality check if the deck has a format specified
+    # Perform legality check if the deck has a format specified (precomputed masks, see deck_validation)
     if deck_model.format:
-        if not card_def.legalities:
-            # This case implies legalities were not fetched/cached for this card.
-            # For a robust system, you might attempt a Scryfall fetch here for legalities.
-            raise ValueError(f"Legality information not available for card '{card_def.name}'. Please ensure card data is up to date.")
-        
-        card_legality_in_format = card_def.legalities.get(deck_model.format.lower()) # Ensure format comparison is case-insensitive
-        if card_legality_in_format != "legal":
-            raise ValueError(f"Card '{card_def.name}' is not legal in the '{deck_model.format}' format (Status: {card_legality_in_format or 'unknown'}).")
-
-    # Check if this card (with the same sideboard status) already exists in the deck.
-    stmt = select(models.DeckEntry).filter_by(
+        card_status = (await deck_validation.card_statuses(db, [card_def.id], deck_model.format)).get(card_def.id)
+        if card_status not in ("legal", "restricted"):
+            raise ValueError(f"Card '{card_def.name}' is not legal in the '{deck_model.format}' format (Status: {card_status or 'unknown'}).")
+
+    # Add the entry, or increment the one for this card and board, in a single statement
+    # against the unique (deck_id, card_definition_id, is_sideboard) key
+    entry = models.DeckEntry
+    stmt = pg_insert(entry).values(
         deck_id=deck_model.id,
         card_definition_id=card_def.id,
-        is_sideboard=deck_entry_create.is_sideboard 
-        # is_commander might also be part of the uniqueness if a card can be both commander and in the 99 (though unusual)
-    )
-    result = await db.execute(stmt)
-    db_deck_entry = result.scalars().first()
-
-    if db_deck_entry:
-        # Update quantity of existing entry
-        db_deck_entry.quantity += deck_entry_create.quantity
-        # Potentially update is_commander if that's being changed for an existing entry
-        if deck_entry_create.is_commander is not None: # Check if it's explicitly passed
-             db_deck_entry.is_commander = deck_entry_create.is_commander
-    else:
-        # Create new entry
-        db_deck_entry = models.DeckEntry(
-            deck_id=deck_model.id,
-            card_definition_id=card_def.id,
-            **deck_entry_create.model_dump(exclude={"card_definition_scryfall_id"})
-        )
-        db.add(db_deck_entry)
-    await db.flush()
-    await db.refresh(db_deck_entry)
-    await db.refresh(db_deck_entry, attribute_names=['card_definition']) # Ensure card_definition is loaded
+        **deck_entry_create.model_dump(exclude={"card_definition_scryfall_id"})
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[entry.deck_id, entry.card_definition_id, entry.is_sideboard],
+        set_={"quantity": entry.quantity + stmt.excluded.quantity, "is_commander": stmt.excluded.is_commander, "change_version": None},
+    )
+    result = await db.execute(stmt.returning(entry), execution_options={"populate_existing": True})
+    db_deck_entry = result.scalar_one()
+    await bump_deck_version(db, user_id=deck_model.user_id, deck_id=deck_model.id)
+    set_committed_value(db_deck_entry, "card_definition", card_def)
     return db_deck_entry
 
 async def get_deck_entry(db: AsyncSession, deck_entry_id: int) -> Optional[models.DeckEntry]:
@@ -371,10 +845,15 @@ async def update_deck_entry(db: AsyncSession, db_deck_entry: models.DeckEntry, e
         setattr(db_deck_entry, key, value)
     db.add(db_deck_entry) # Add to session to track changes
     await db.flush()
+    await bump_deck_version(db, deck_id=db_deck_entry.deck_id)
     await db.refresh(db_deck_entry)
     await db.refresh(db_deck_entry, attribute_names=['card_definition'])
     return db_deck_entry
 
 async def remove_card_from_deck(db: AsyncSession, db_deck_entry: models.DeckEntry) -> None:
+    deck_id = db_deck_entry.deck_id
+    user_id = (await db.execute(select(models.Deck.user_id).filter(models.Deck.id == deck_id))).scalar_one()
+    await sync.record_deletions(db, user_id, sync.DECK_ENTRY, [db_deck_entry.id])
     await db.delete(db_deck_entry)
+    await bump_deck_version(db, user_id=user_id, deck_id=deck_id)
     return None
@@ -0,0 +1,180 @@
+# app/deck_analytics.py
+"""
+Deck analytics: mana curve, colored pips, type breakdown, average mana value, land and ramp
+counts, and color identity conformance.
+
+A deck is reduced to (card, quantity, is_commander) entries, the derived features of all its
+cards are read from card_features with one query into parallel NumPy arrays, and every figure
+is then a weighted sum or bincount over those arrays. Sideboards are left out. Results are
+cached per deck version; meta decks (cards stored by name) are resolved through card_resolver,
+go through the same engine and are cached per state of their card rows and the catalog.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import card_features, card_resolver, models, schemas
+from .cache import VersionedCache
+
+MAX_CMC_BUCKET = 7 # Mana values of 7 and more share the last curve bucket
+
+_analytics_cache = VersionedCache(max_entries=4096)
+
+
+@dataclass
+class AnalyticsEntry:
+    card_definition_id: int
+    quantity: int
+    is_commander: bool = False
+
+
+def _identity_string(mask: int) -> str:
+    return "".join(card_features.colors_from_mask(mask)) or "C"
+
+
+async def _load_features(db: AsyncSession, card_definition_ids: List[int]) -> Dict[str, np.ndarray]:
+    """Feature arrays for the given cards, in the order of `card_definition_ids`."""
+    card, features = models.CardDefinition, models.CardFeatures
+    pip_columns = [getattr(features, f"pips_{color.lower()}") for color in card_features.PIP_COLORS]
+    result = await db.execute(
+        select(
+            card.id, card.name,
+            func.coalesce(features.front_face_cmc, card.cmc, 0).label("cmc"),
+            *(func.coalesce(column, 0) for column in pip_columns),
+            func.coalesce(features.color_identity_mask, 0).label("identity"),
+            func.coalesce(features.type_flags, 0).label("types"),
+            func.coalesce(features.is_land, False).label("is_land"),
+            func.coalesce(features.is_ramp, False).label("is_ramp"),
+        )
+        .outerjoin(features, features.card_definition_id == card.id)
+        .filter(card.id.in_(card_definition_ids))
+    )
+    rows = {row[0]: row for row in result}
+    ordered = [rows[card_id] for card_id in card_definition_ids]
+    pip_count = len(card_features.PIP_COLORS)
+    return {
+        "names": [row.name for row in ordered],
+        "cmc": np.array([row.cmc for row in ordered], dtype=np.float32),
+        "pips": np.array([row[3:3 + pip_count] for row in ordered], dtype=np.int32).reshape(len(ordered), pip_count),
+        "identity": np.array([row.identity for row in ordered], dtype=np.uint8),
+        "types": np.array([row.types for row in ordered], dtype=np.uint16),
+        "is_land": np.array([row.is_land for row in ordered], dtype=bool),
+        "is_ramp": np.array([row.is_ramp for row in ordered], dtype=bool),
+    }
+
+
+async def analyze_entries(db: AsyncSession, entries: List[AnalyticsEntry]) -> schemas.DeckAnalytics:
+    """Analytics for a main deck (commanders included) given as entries."""
+    # Fold duplicate cards into one row each
+    quantities: Dict[int, int] = {}
+    commanders = set()
+    for entry in entries:
+        quantities[entry.card_definition_id] = quantities.get(entry.card_definition_id, 0) + entry.quantity
+        if entry.is_commander:
+            commanders.add(entry.card_definition_id)
+    if not quantities:
+        return schemas.DeckAnalytics()
+
+    card_ids = list(quantities)
+    data = await _load_features(db, card_ids)
+    quantity = np.array([quantities[card_id] for card_id in card_ids], dtype=np.int64)
+    is_commander = np.array([card_id in commanders for card_id in card_ids], dtype=bool)
+    land, nonland = data["is_land"], ~data["is_land"]
+
+    nonland_quantity = quantity[nonland]
+    curve_buckets = np.minimum(np.floor(data["cmc"][nonland]), MAX_CMC_BUCKET).astype(np.int64)
+    mana_curve = np.bincount(curve_buckets, weights=nonland_quantity, minlength=MAX_CMC_BUCKET + 1)
+    pips = quantity @ data["pips"]
+    type_counts = {
+        name: int(quantity[(data["types"] & np.uint16(bit)) != 0].sum())
+        for name, bit in card_features.TYPE_FLAGS.items()
+    }
+
+    total = int(quantity.sum())
+    land_count = int(quantity[land].sum())
+    nonland_count = int(nonland_quantity.sum())
+    cmc_total = float((data["cmc"][nonland] * nonland_quantity).sum())
+
+    # Commander decks are checked against the commanders' identity; others just report their own
+    if is_commander.any():
+        identity = int(np.bitwise_or.reduce(data["identity"][is_commander]))
+        outside = (data["identity"] & np.uint8(card_features.ALL_COLORS_MASK ^ identity)) != 0
+    else:
+        identity = int(np.bitwise_or.reduce(data["identity"]))
+        outside = np.zeros(len(card_ids), dtype=bool)
+
+    return schemas.DeckAnalytics(
+        total_cards=total,
+        land_count=land_count,
+        nonland_count=nonland_count,
+        ramp_count=int(quantity[data["is_ramp"]].sum()),
+        land_ratio=round(land_count / total, 4) if total else 0.0,
+        average_cmc=round(cmc_total / nonland_count, 2) if nonland_count else 0.0,
+        mana_curve=[int(count) for count in mana_curve],
+        pips={color: int(count) for color, count in zip(card_features.PIP_COLORS, pips)},
+        types={name: count for name, count in type_counts.items() if count},
+        color_identity=_identity_string(identity),
+        off_identity_cards=[
+            schemas.DeckAnalyticsCard(card_definition_id=card_ids[i], name=data["names"][i], color_identity=_identity_string(int(data["identity"][i])))
+            for i in np.flatnonzero(outside)
+        ],
+    )
+
+
+async def get_deck_analytics(db: AsyncSession, deck_id: int, version: int) -> schemas.DeckAnalytics:
+    """
+    Analytics for a deck at `version` (crud.get_deck_version, which also checks ownership),
+    from the cache while the deck version is unchanged.
+    """
+    analytics = _analytics_cache.get(("deck", deck_id), version)
+    if analytics is None:
+        result = await db.execute(
+            select(models.DeckEntry.card_definition_id, models.DeckEntry.quantity, models.DeckEntry.is_commander)
+            .filter(models.DeckEntry.deck_id == deck_id, models.DeckEntry.is_sideboard.isnot(True))
+        )
+        entries = [AnalyticsEntry(row.card_definition_id, row.quantity, bool(row.is_commander)) for row in result]
+        analytics = await analyze_entries(db, entries)
+        analytics.version = version
+        _analytics_cache.put(("deck", deck_id), version, analytics)
+    return analytics
+
+
+async def get_meta_deck_analytics(db: AsyncSession, meta_deck_id: int) -> Optional[schemas.DeckAnalytics]:
+    """Analytics for a scraped meta deck, resolving its card names to printings. None if there is no such deck."""
+    # Meta decks have no version stamp. Their card rows change if a scraper rewrites them, and
+    # names can resolve differently once new printings reach the catalog, so key on both.
+    deck_card = models.MetaDeckCard
+    stamp = (await db.execute(
+        select(
+            select(func.count(deck_card.id)).filter(deck_card.deck_id == meta_deck_id).scalar_subquery(),
+            select(func.max(deck_card.id)).filter(deck_card.deck_id == meta_deck_id).scalar_subquery(),
+            select(func.max(models.CardDefinition.id)).scalar_subquery(),
+        ).filter(models.MetaDeck.id == meta_deck_id)
+    )).first()
+    if stamp is None:
+        return None
+    version = tuple(stamp)
+    analytics = _analytics_cache.get(("meta", meta_deck_id), version)
+    if analytics is None:
+        result = await db.execute(
+            select(models.MetaDeckCard.card_name, models.MetaDeckCard.set_code, models.MetaDeckCard.quantity, models.MetaDeckCard.is_commander)
+            .filter(models.MetaDeckCard.deck_id == meta_deck_id)
+        )
+        cards = result.all()
+        matches = await card_resolver.resolve_card_lines(db, [
+            schemas.CardResolveLine(name=card.card_name, set_code=card.set_code) for card in cards
+        ]) if cards else []
+        entries, unresolved = [], []
+        for card, match in zip(cards, matches):
+            if match.status == schemas.ResolveStatus.exact:
+                entries.append(AnalyticsEntry(match.card.id, card.quantity, bool(card.is_commander)))
+            else:
+                unresolved.append(card.card_name)
+        analytics = await analyze_entries(db, entries)
+        analytics.unresolved_cards = unresolved
+        _analytics_cache.put(("meta", meta_deck_id), version, analytics)
+    return analytics
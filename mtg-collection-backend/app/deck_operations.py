@@ -0,0 +1,216 @@
+# app/deck_operations.py
+"""
+Apply a list of deck entry operations (add, remove, set quantity, commander/sideboard
+moves) atomically.
+
+The deck row is locked, its entries and the referenced cards are read with one query each,
+and the operations are folded in memory. Any invalid operation fails the whole batch
+before anything is written. Changes are then written with at most one DELETE, one
+UPDATE ... FROM (VALUES ...) and one INSERT, each with RETURNING, and the deck version is
+bumped once.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import Boolean, Integer, column, delete, insert, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import crud, deck_validation, models, schemas, sync
+
+
+class DeckVersionConflict(Exception):
+    """The deck changed since the version the client expected."""
+
+
+@dataclass
+class _Entry:
+    card_definition_id: int
+    quantity: int
+    is_commander: bool
+    is_sideboard: bool
+    id: Optional[int] = None # None until inserted
+    deleted: bool = False
+    changed: bool = False
+
+
+@dataclass
+class DeckPatchOutcome:
+    deck_id: int
+    version: int
+    entries: List = field(default_factory=list) # RETURNING rows of created/changed entries
+    removed_entry_ids: List[int] = field(default_factory=list)
+
+
+class _DeckState:
+    def __init__(self, entries: List[_Entry]):
+        self.entries = entries
+        self.by_id = {entry.id: entry for entry in entries}
+
+    def live(self):
+        return (entry for entry in self.entries if not entry.deleted)
+
+    def find(self, card_definition_id: int, is_sideboard: bool, exclude: Optional[_Entry] = None) -> Optional[_Entry]:
+        # Same matching as add_card_to_deck: one entry per card and board
+        return next(
+            (e for e in self.live() if e is not exclude and e.card_definition_id == card_definition_id and bool(e.is_sideboard) == is_sideboard),
+            None,
+        )
+
+    def target(self, op: schemas.DeckEntryOperation, card_ids: Dict[str, int]) -> _Entry:
+        if op.entry_id is not None:
+            entry = self.by_id.get(op.entry_id)
+            if entry is None or entry.deleted:
+                raise ValueError(f"Deck entry {op.entry_id} is not in this deck.")
+            return entry
+        # set_sideboard names the destination board; the card is looked up on the other one
+        is_sideboard = bool(op.is_sideboard)
+        if op.action == schemas.DeckEntryAction.set_sideboard:
+            is_sideboard = not is_sideboard
+        entry = self.find(card_ids[op.card_definition_scryfall_id], is_sideboard)
+        if entry is None:
+            raise ValueError(f"Card {op.card_definition_scryfall_id} is not in this deck{' sideboard' if is_sideboard else ''}.")
+        return entry
+
+    def apply(self, op: schemas.DeckEntryOperation, card_ids: Dict[str, int]) -> None:
+        if op.action == schemas.DeckEntryAction.add:
+            card_id = card_ids[op.card_definition_scryfall_id]
+            is_sideboard = bool(op.is_sideboard)
+            entry = self.find(card_id, is_sideboard)
+            if entry is None:
+                entry = _Entry(card_definition_id=card_id, quantity=0, is_commander=bool(op.is_commander), is_sideboard=is_sideboard)
+                self.entries.append(entry)
+            elif op.is_commander is not None:
+                entry.is_commander = op.is_commander
+            entry.quantity += op.quantity if op.quantity is not None else 1
+            entry.changed = True
+            if entry.quantity == 0:
+                entry.deleted = True
+            return
+
+        entry = self.target(op, card_ids)
+        entry.changed = True
+        if op.action == schemas.DeckEntryAction.remove:
+            entry.quantity = max(entry.quantity - op.quantity, 0) if op.quantity is not None else 0
+            entry.deleted = entry.quantity == 0
+        elif op.action == schemas.DeckEntryAction.set_quantity:
+            entry.quantity = op.quantity
+            entry.deleted = entry.quantity == 0
+        elif op.action == schemas.DeckEntryAction.set_commander:
+            entry.is_commander = op.is_commander
+        elif op.action == schemas.DeckEntryAction.set_sideboard and bool(entry.is_sideboard) != op.is_sideboard:
+            other = self.find(entry.card_definition_id, op.is_sideboard, exclude=entry)
+            if other is not None:
+                other.quantity += entry.quantity
+                other.changed, entry.deleted = True, True
+            else:
+                entry.is_sideboard = op.is_sideboard
+
+
+async def _resolve_cards(db: AsyncSession, scryfall_ids: List[str], added_ids: Set[str], deck_format: Optional[str]) -> Dict[str, int]:
+    """Map Scryfall IDs to card definition ids, checking cards being added for legality like add_card_to_deck."""
+    if not scryfall_ids:
+        return {}
+    result = await db.execute(
+        select(models.CardDefinition.id, models.CardDefinition.scryfall_id, models.CardDefinition.name)
+        .filter(models.CardDefinition.scryfall_id.in_(scryfall_ids))
+    )
+    rows = result.all()
+    added = [row for row in rows if row.scryfall_id in added_ids]
+    if deck_format and added:
+        statuses = await deck_validation.card_statuses(db, [row.id for row in added], deck_format)
+        for row in added:
+            if statuses.get(row.id) not in ("legal", "restricted"):
+                raise ValueError(f"Card '{row.name}' is not legal in the '{deck_format}' format (Status: {statuses.get(row.id) or 'unknown'}).")
+    card_ids = {row.scryfall_id: row.id for row in rows}
+    missing = [scryfall_id for scryfall_id in scryfall_ids if scryfall_id not in card_ids]
+    if missing:
+        raise ValueError(f"Cards not in the card catalog: {', '.join(missing)}")
+    return card_ids
+
+
+_RETURNING = (
+    models.DeckEntry.id, models.DeckEntry.deck_id, models.DeckEntry.card_definition_id,
+    models.DeckEntry.quantity, models.DeckEntry.is_commander, models.DeckEntry.is_sideboard,
+)
+
+
+async def _write(db: AsyncSession, user_id: int, deck_id: int, entries: List[_Entry], outcome: DeckPatchOutcome) -> None:
+    table = models.DeckEntry.__table__
+
+    to_delete = [entry.id for entry in entries if entry.deleted and entry.id is not None]
+    if to_delete:
+        await sync.record_deletions(db, user_id, sync.DECK_ENTRY, to_delete)
+        result = await db.execute(delete(table).where(table.c.id.in_(to_delete)).returning(table.c.id))
+        outcome.removed_entry_ids = sorted(result.scalars())
+
+    to_update = [entry for entry in entries if not entry.deleted and entry.id is not None]
+    if to_update:
+        changes = values(
+            column("id", Integer), column("quantity", Integer), column("is_commander", Boolean), column("is_sideboard", Boolean),
+            name="changes",
+        ).data([(entry.id, entry.quantity, entry.is_commander, entry.is_sideboard) for entry in to_update])
+        result = await db.execute(
+            update(table)
+            .where(table.c.id == changes.c.id)
+            .values(quantity=changes.c.quantity, is_commander=changes.c.is_commander, is_sideboard=changes.c.is_sideboard)
+            .returning(*(table.c[c.key] for c in _RETURNING))
+        )
+        outcome.entries.extend(result.all())
+
+    to_insert = [entry for entry in entries if not entry.deleted and entry.id is None]
+    if to_insert:
+        result = await db.execute(
+            insert(table).values([
+                {"deck_id": deck_id, "card_definition_id": entry.card_definition_id, "quantity": entry.quantity,
+                 "is_commander": entry.is_commander, "is_sideboard": entry.is_sideboard}
+                for entry in to_insert
+            ]).returning(*(table.c[c.key] for c in _RETURNING))
+        )
+        outcome.entries.extend(result.all())
+
+
+async def apply_deck_operations(
+    db: AsyncSession, user_id: int, deck_id: int, patch: schemas.DeckEntriesPatch
+) -> Optional[DeckPatchOutcome]:
+    """
+    Apply `patch` to the user's deck. Returns None if the user has no such deck; raises
+    ValueError for an invalid operation and DeckVersionConflict if expected_version is stale.
+    """
+    deck = (await db.execute(
+        select(models.Deck.id, models.Deck.format, models.Deck.version)
+        .filter(models.Deck.id == deck_id, models.Deck.user_id == user_id)
+        .with_for_update()
+    )).first()
+    if deck is None:
+        return None
+    if patch.expected_version is not None and patch.expected_version != deck.version:
+        raise DeckVersionConflict(f"Deck is at version {deck.version}, not {patch.expected_version}.")
+
+    scryfall_ids = sorted({op.card_definition_scryfall_id for op in patch.operations if op.card_definition_scryfall_id})
+    added_ids = {op.card_definition_scryfall_id for op in patch.operations if op.action == schemas.DeckEntryAction.add}
+    card_ids = await _resolve_cards(db, scryfall_ids, added_ids, deck.format)
+
+    result = await db.execute(
+        select(models.DeckEntry.id, models.DeckEntry.card_definition_id, models.DeckEntry.quantity,
+               models.DeckEntry.is_commander, models.DeckEntry.is_sideboard)
+        .filter(models.DeckEntry.deck_id == deck_id)
+        .order_by(models.DeckEntry.id)
+    )
+    state = _DeckState([
+        _Entry(id=row.id, card_definition_id=row.card_definition_id, quantity=row.quantity,
+               is_commander=bool(row.is_commander), is_sideboard=bool(row.is_sideboard))
+        for row in result
+    ])
+    for index, op in enumerate(patch.operations):
+        try:
+            state.apply(op, card_ids)
+        except ValueError as e:
+            raise ValueError(f"Operation {index}: {e}")
+
+    outcome = DeckPatchOutcome(deck_id=deck_id, version=deck.version)
+    changed = [entry for entry in state.entries if entry.changed and not (entry.deleted and entry.id is None)]
+    if changed:
+        await _write(db, user_id, deck_id, changed, outcome)
+        outcome.version = await crud.bump_deck_version(db, user_id=user_id, deck_id=deck_id)
+    return outcome
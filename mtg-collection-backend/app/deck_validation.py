@@ -0,0 +1,211 @@
+# app/deck_validation.py
+"""
+Whole-deck format validation: card legality, copy limits (restricted cards, basic lands and
+"any number of" cards included), deck and sideboard size, commanders and color identity.
+
+Per-card legality is precomputed at ingest as format bitmasks in card_features (legal_mask,
+restricted_mask; bits from card_features.FORMAT_BITS), next to the color identity mask and
+deck-building flags. A deck's cards are read with one query into NumPy arrays and every rule
+is a mask or bincount over them, so a 100-card deck costs one query and a few array operations
+instead of a JSONB lookup per card. Every violation is reported, not just the first.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import card_features, models, schemas
+
+# Who may lead a commander-style deck
+LEGENDARY_CREATURE = "legendary_creature"          # Or a card saying it can be your commander
+LEGENDARY_CREATURE_OR_PLANESWALKER = "legendary_creature_or_planeswalker"
+PLANESWALKER = "planeswalker"
+CREATURE = "creature"
+
+
+@dataclass(frozen=True)
+class FormatRules:
+    deck_size: int                         # Minimum main deck size, commanders included
+    exact_size: bool = False
+    max_copies: int = 4                    # Per card name, main deck and sideboard together
+    sideboard_size: Optional[int] = 15     # None: sideboard not checked
+    commander: Optional[str] = None        # Commander rule, for formats played with a commander
+    max_commanders: int = 2                # Partners
+
+
+_CONSTRUCTED = FormatRules(deck_size=60)
+_COMMANDER = FormatRules(deck_size=100, exact_size=True, max_copies=1, sideboard_size=None, commander=LEGENDARY_CREATURE)
+
+FORMAT_RULES: Dict[str, FormatRules] = {
+    **{fmt: _CONSTRUCTED for fmt in (
+        "standard", "future", "historic", "timeless", "pioneer", "explorer", "modern", "legacy",
+        "vintage", "pauper", "penny", "alchemy", "oldschool", "premodern",
+    )},
+    "gladiator": FormatRules(deck_size=100, exact_size=True, max_copies=1, sideboard_size=None),
+    "commander": _COMMANDER,
+    "duel": _COMMANDER,
+    "predh": _COMMANDER,
+    "paupercommander": FormatRules(deck_size=100, exact_size=True, max_copies=1, sideboard_size=None, commander=CREATURE),
+    "brawl": FormatRules(deck_size=100, exact_size=True, max_copies=1, sideboard_size=None, commander=LEGENDARY_CREATURE_OR_PLANESWALKER, max_commanders=1),
+    "standardbrawl": FormatRules(deck_size=60, exact_size=True, max_copies=1, sideboard_size=None, commander=LEGENDARY_CREATURE_OR_PLANESWALKER, max_commanders=1),
+    "oathbreaker": FormatRules(deck_size=60, exact_size=True, max_copies=1, sideboard_size=None, commander=PLANESWALKER, max_commanders=1),
+}
+
+
+@dataclass
+class ValidationEntry:
+    card_definition_id: int
+    quantity: int
+    is_commander: bool = False
+    is_sideboard: bool = False
+
+
+async def card_statuses(db: AsyncSession, card_definition_ids: List[int], fmt: str) -> Dict[int, str]:
+    """
+    "legal", "restricted" or "not_legal" in `fmt` for each card, from the precomputed masks.
+    Cards without derived features are left out. Raises ValueError for an unknown format.
+    """
+    bit = card_features.format_bit(fmt)
+    result = await db.execute(
+        select(models.CardFeatures.card_definition_id, models.CardFeatures.legal_mask, models.CardFeatures.restricted_mask)
+        .filter(models.CardFeatures.card_definition_id.in_(card_definition_ids))
+    )
+    return {
+        card_id: "legal" if legal & bit else "restricted" if restricted & bit else "not_legal"
+        for card_id, legal, restricted in result
+    }
+
+
+async def _load_cards(db: AsyncSession, card_definition_ids: List[int]) -> Dict[str, list]:
+    card, features = models.CardDefinition, models.CardFeatures
+    result = await db.execute(
+        select(
+            card.id, card.name,
+            func.coalesce(features.legal_mask, 0), func.coalesce(features.restricted_mask, 0),
+            func.coalesce(features.color_identity_mask, 0), func.coalesce(features.type_flags, 0),
+            func.coalesce(features.unlimited_copies, False), features.copy_limit,
+            func.coalesce(features.can_be_commander, False),
+        )
+        .outerjoin(features, features.card_definition_id == card.id)
+        .filter(card.id.in_(card_definition_ids))
+    )
+    rows = {row[0]: row for row in result}
+    return {
+        name: [rows[card_id][i] for card_id in card_definition_ids]
+        for i, name in enumerate(("id", "name", "legal", "restricted", "identity", "types", "unlimited", "copy_limit", "can_be_commander"))
+    }
+
+
+def _violation(rule: str, message: str, card_id: Optional[int] = None, name: Optional[str] = None) -> schemas.DeckViolation:
+    return schemas.DeckViolation(rule=rule, message=message, card_definition_id=card_id, card_name=name)
+
+
+def _commander_allowed(rule: str, can_be_commander: bool, types: int) -> bool:
+    is_planeswalker = bool(types & card_features.TYPE_FLAGS["planeswalker"])
+    if rule == PLANESWALKER:
+        return is_planeswalker
+    if rule == CREATURE:
+        return bool(types & card_features.TYPE_FLAGS["creature"])
+    if rule == LEGENDARY_CREATURE_OR_PLANESWALKER:
+        return can_be_commander or (is_planeswalker and bool(types & card_features.TYPE_FLAGS["legendary"]))
+    return can_be_commander
+
+
+async def validate_entries(db: AsyncSession, fmt: Optional[str], entries: List[ValidationEntry]) -> schemas.DeckValidationResult:
+    """Check a deck given as entries against `fmt`'s rules. Without a format nothing is checked."""
+    main_count = sum(entry.quantity for entry in entries if not entry.is_sideboard)
+    sideboard_count = sum(entry.quantity for entry in entries if entry.is_sideboard)
+    validation = schemas.DeckValidationResult(format=fmt, main_count=main_count, sideboard_count=sideboard_count)
+    if not fmt:
+        return validation
+    fmt = fmt.lower()
+    rules = FORMAT_RULES.get(fmt)
+    if rules is None or fmt not in card_features.FORMAT_BITS:
+        validation.violations.append(_violation("format", f"Unknown format '{fmt}'; the deck was not checked."))
+        validation.valid = False
+        return validation
+    violations = validation.violations
+
+    # Deck-level counts need no card data
+    if main_count < rules.deck_size or (rules.exact_size and main_count != rules.deck_size):
+        expected = f"exactly {rules.deck_size}" if rules.exact_size else f"at least {rules.deck_size}"
+        violations.append(_violation("deck_size", f"The main deck has {main_count} cards; {fmt} needs {expected}."))
+    if rules.sideboard_size is not None and sideboard_count > rules.sideboard_size:
+        violations.append(_violation("sideboard_size", f"The sideboard has {sideboard_count} cards; {fmt} allows at most {rules.sideboard_size}."))
+
+    if entries:
+        card_ids = sorted({entry.card_definition_id for entry in entries})
+        cards = await _load_cards(db, card_ids)
+        position = {card_id: i for i, card_id in enumerate(card_ids)}
+        quantity = np.zeros(len(card_ids), dtype=np.int64)
+        commander_quantity = np.zeros(len(card_ids), dtype=np.int64)
+        for entry in entries:
+            quantity[position[entry.card_definition_id]] += entry.quantity
+            if entry.is_commander and not entry.is_sideboard:
+                commander_quantity[position[entry.card_definition_id]] += entry.quantity
+
+        bit = card_features.FORMAT_BITS[fmt]
+        legal = np.array(cards["legal"], dtype=np.int64)
+        restricted = np.array(cards["restricted"], dtype=np.int64)
+        identity = np.array(cards["identity"], dtype=np.int64)
+        is_restricted = (restricted & bit) != 0
+        playable = ((legal & bit) != 0) | is_restricted
+
+        for i in np.flatnonzero(~playable):
+            violations.append(_violation("illegal_card", f"'{cards['name'][i]}' is not legal in {fmt}.", card_ids[i], cards["name"][i]))
+
+        # Copy limits apply per card name, across printings
+        names, name_index = np.unique(np.array(cards["name"], dtype=object), return_inverse=True)
+        copies = np.bincount(name_index, weights=quantity, minlength=len(names)).astype(np.int64)
+        limits = np.full(len(card_ids), rules.max_copies, dtype=np.int64)
+        limits[is_restricted] = 1
+        custom = np.array([limit is not None for limit in cards["copy_limit"]], dtype=bool)
+        limits[custom] = [limit for limit in cards["copy_limit"] if limit is not None]
+        limits[np.array(cards["unlimited"], dtype=bool)] = np.iinfo(np.int64).max
+        name_limits = np.full(len(names), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(name_limits, name_index, limits)
+        for n in np.flatnonzero(copies > name_limits):
+            violations.append(_violation(
+                "too_many_copies", f"{copies[n]} copies of '{names[n]}'; {fmt} allows {name_limits[n]}.", name=names[n],
+            ))
+
+        if rules.commander:
+            commander_count = int(commander_quantity.sum())
+            if commander_count == 0:
+                violations.append(_violation("commander", f"{fmt} decks need a commander."))
+            elif commander_count > rules.max_commanders:
+                violations.append(_violation("commander", f"{commander_count} commanders; {fmt} allows at most {rules.max_commanders}."))
+            is_commander = commander_quantity > 0
+            for i in np.flatnonzero(is_commander):
+                if not _commander_allowed(rules.commander, cards["can_be_commander"][i], cards["types"][i]):
+                    violations.append(_violation("commander", f"'{cards['name'][i]}' cannot be a commander in {fmt}.", card_ids[i], cards["name"][i]))
+            if commander_count:
+                commander_identity = int(np.bitwise_or.reduce(identity[is_commander]))
+                outside = (identity & (card_features.ALL_COLORS_MASK ^ commander_identity)) != 0
+                for i in np.flatnonzero(outside & ~is_commander):
+                    violations.append(_violation(
+                        "color_identity", f"'{cards['name'][i]}' is outside the commander's color identity.", card_ids[i], cards["name"][i],
+                    ))
+        elif commander_quantity.any():
+            violations.append(_violation("commander", f"{fmt} is not played with a commander."))
+
+    validation.valid = not violations
+    return validation
+
+
+async def validate_deck(db: AsyncSession, user_id: int, deck_id: int, fmt: Optional[str] = None) -> Optional[schemas.DeckValidationResult]:
+    """Validate the user's deck against its own format (or `fmt`). None if there is no such deck."""
+    deck_format = (await db.execute(
+        select(models.Deck.format).filter(models.Deck.id == deck_id, models.Deck.user_id == user_id)
+    )).first()
+    if deck_format is None:
+        return None
+    result = await db.execute(
+        select(models.DeckEntry.card_definition_id, models.DeckEntry.quantity, models.DeckEntry.is_commander, models.DeckEntry.is_sideboard)
+        .filter(models.DeckEntry.deck_id == deck_id)
+    )
+    entries = [ValidationEntry(row.card_definition_id, row.quantity, bool(row.is_commander), bool(row.is_sideboard)) for row in result]
+    return await validate_entries(db, fmt or deck_format.format, entries)
@@ -0,0 +1,163 @@
+# app/decklist.py
+"""
+Decklist text import: parse MTGO, Arena and Moxfield style lists, resolve every card in
+one card_resolver call, check format legality for all cards in one query, and create the
+deck with all of its entries in one transaction.
+
+Recognized line shapes: "4 Lightning Bolt", "4x Lightning Bolt", "Lightning Bolt",
+"1 Sol Ring (CMR) 332", "1 Atraxa (ONE) 1 *F*" and "SB: 2 Duress". Sections come from
+headings ("Commander", "Deck", "Sideboard", "COMMANDER:", "SIDEBOARD:", "Companion", ...)
+or, in plain MTGO lists, from the blank line between main deck and sideboard.
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import card_resolver, crud, deck_validation, models, schemas
+
+MAIN, SIDEBOARD, COMMANDER, IGNORED = "main", "sideboard", "commander", "ignored"
+
+_SECTION_HEADINGS = {
+    "deck": MAIN, "main": MAIN, "maindeck": MAIN, "mainboard": MAIN,
+    "sideboard": SIDEBOARD, "side": SIDEBOARD, "companion": SIDEBOARD,
+    "commander": COMMANDER, "commanders": COMMANDER,
+    "maybeboard": IGNORED, "considering": IGNORED, "about": IGNORED, "tokens": IGNORED,
+}
+_LINE_RE = re.compile(
+    r"^(?:(?P<sideboard>SB:)\s*)?"
+    r"(?:(?P<quantity>\d+)\s*[xX]?\s+)?"
+    r"(?P<name>.+?)"
+    r"(?:\s+\((?P<set_code>[A-Za-z0-9]{2,6})\)(?:\s+(?P<collector_number>[^\s*]+))?)?"
+    r"(?:\s+\*[A-Za-z]\*)*\s*$"
+)
+
+
+@dataclass
+class DecklistLine:
+    line_number: int
+    quantity: int
+    name: str
+    section: str
+    set_code: Optional[str] = None
+    collector_number: Optional[str] = None
+
+
+def parse_decklist(text: str) -> Tuple[List[DecklistLine], List[schemas.DeckImportProblem]]:
+    """Split decklist text into card lines and problems (lines that could not be read)."""
+    lines: List[DecklistLine] = []
+    problems: List[schemas.DeckImportProblem] = []
+    section = MAIN
+    main_heading_seen = False
+    cards_in_section = 0
+
+    for line_number, raw in enumerate(text.splitlines(), start=1):
+        line = raw.strip()
+        if not line:
+            # Plain MTGO lists: the sideboard follows the first blank line after the main deck
+            if section == COMMANDER and cards_in_section:
+                section, cards_in_section = MAIN, 0
+            elif section == MAIN and cards_in_section and not main_heading_seen:
+                section, cards_in_section = SIDEBOARD, 0
+            continue
+        if line.startswith(("//", "#")):
+            continue
+        heading = line.rstrip(":").strip().lower()
+        if heading in _SECTION_HEADINGS:
+            section, cards_in_section = _SECTION_HEADINGS[heading], 0
+            main_heading_seen = main_heading_seen or section == MAIN
+            continue
+        if section == IGNORED:
+            continue
+
+        match = _LINE_RE.match(line)
+        if not match or not match.group("name").strip():
+            problems.append(schemas.DeckImportProblem(line=line_number, text=line, reason="Could not read this line"))
+            continue
+        quantity = int(match.group("quantity") or 1)
+        if not 1 <= quantity <= schemas.MAX_ENTRY_QUANTITY:
+            problems.append(schemas.DeckImportProblem(line=line_number, text=line, reason=f"Quantity must be between 1 and {schemas.MAX_ENTRY_QUANTITY}"))
+            continue
+        lines.append(DecklistLine(
+            line_number=line_number, quantity=quantity, name=match.group("name").strip(),
+            section=SIDEBOARD if match.group("sideboard") else section,
+            set_code=match.group("set_code"), collector_number=match.group("collector_number"),
+        ))
+        cards_in_section += 1
+    return lines, problems
+
+
+async def import_decklist(
+    db: AsyncSession, user_id: int, import_request: schemas.DeckImportRequest
+) -> Tuple[Optional[int], List[schemas.DeckImportProblem]]:
+    """
+    Create a deck from decklist text. Returns (deck id, problems). Unless skip_invalid is
+    set, any problem (unreadable line, unresolved or illegal card) means nothing is created
+    and the deck id is None.
+    """
+    lines, problems = parse_decklist(import_request.text)
+    if not lines and not problems:
+        raise ValueError("The decklist is empty.")
+
+    matches = await card_resolver.resolve_card_lines(db, [
+        schemas.CardResolveLine(name=line.name, set_code=line.set_code, collector_number=line.collector_number)
+        for line in lines
+    ]) if lines else []
+    resolved: List[Tuple[DecklistLine, schemas.ResolvedPrinting]] = []
+    for line, match in zip(lines, matches):
+        if match.status == schemas.ResolveStatus.exact:
+            resolved.append((line, match.card))
+        else:
+            reason = "Card not found" if match.status == schemas.ResolveStatus.not_found else f"No exact match ({match.status.value})"
+            problems.append(schemas.DeckImportProblem(line=line.line_number, text=line.name, reason=reason, candidates=match.candidates))
+
+    if import_request.format and resolved:
+        # Same rule as add_card_to_deck: cards legal or restricted in the deck's format
+        statuses = await deck_validation.card_statuses(db, sorted({card.id for _, card in resolved}), import_request.format)
+        legal = []
+        for line, card in resolved:
+            status = statuses.get(card.id)
+            if status in ("legal", "restricted"):
+                legal.append((line, card))
+            else:
+                problems.append(schemas.DeckImportProblem(
+                    line=line.line_number, text=line.name,
+                    reason=f"Not legal in the '{import_request.format}' format (Status: {status or 'unknown'})",
+                ))
+        resolved = legal
+
+    # One entry per printing and board (unique in deck_entries), quantities summed; a commander
+    # also listed in the main deck shares its entry
+    entries: Dict[Tuple[int, bool], Tuple[int, bool]] = {}
+    first_lines: Dict[Tuple[int, bool], DecklistLine] = {}
+    for line, card in resolved:
+        key = (card.id, line.section == SIDEBOARD)
+        quantity, is_commander = entries.get(key, (0, False))
+        entries[key] = (quantity + line.quantity, is_commander or line.section == COMMANDER)
+        first_lines.setdefault(key, line)
+    for key, (quantity, _) in list(entries.items()):
+        if quantity > schemas.MAX_ENTRY_QUANTITY:
+            line = first_lines[key]
+            problems.append(schemas.DeckImportProblem(
+                line=line.line_number, text=line.name,
+                reason=f"{quantity} copies in total; at most {schemas.MAX_ENTRY_QUANTITY} per card and board",
+            ))
+            del entries[key]
+
+    problems.sort(key=lambda problem: problem.line)
+    if problems and not import_request.skip_invalid:
+        return None, problems
+
+    db_deck = models.Deck(user_id=user_id, **import_request.model_dump(include={"name", "description", "format"}))
+    db.add(db_deck)
+    await db.flush()
+    if entries:
+        await db.execute(insert(models.DeckEntry), [
+            {"deck_id": db_deck.id, "card_definition_id": card_id, "quantity": quantity,
+             "is_commander": is_commander, "is_sideboard": is_sideboard}
+            for (card_id, is_sideboard), (quantity, is_commander) in entries.items()
+        ])
+    await crud.bump_deck_version(db, user_id=user_id, deck_id=db_deck.id)
+    return db_deck.id, problems
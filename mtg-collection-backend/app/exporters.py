@@ -0,0 +1,246 @@
+# app/exporters.py
+"""
+Streaming exports of a user's collection and decks.
+
+Rows are read through a server-side cursor (AsyncSession.stream with yield_per), joined with
+only the CardDefinition columns the formats need, and written out one partition at a time,
+so memory stays flat however large the collection is. Each export opens its own session:
+the request's get_db session is closed before a StreamingResponse body is sent.
+"""
+import csv
+import io
+from enum import Enum
+from typing import AsyncIterator, Callable, Dict, Iterable, List
+from urllib.parse import quote
+
+import orjson
+from sqlalchemy.future import select
+
+from . import models
+from .database import AsyncSessionLocal
+
+STREAM_BATCH_SIZE = 1000
+
+
+class CollectionExportFormat(str, Enum):
+    csv = "csv"           # One row per entry, every field
+    ndjson = "ndjson"     # One JSON object per entry
+    text = "text"         # "4 Lightning Bolt (2X2) 117" per printing, foils marked *F*
+    moxfield = "moxfield" # Moxfield collection CSV
+
+
+class DeckExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+    arena = "arena"       # MTG Arena import text (Commander / Deck / Sideboard sections)
+    mtgo = "mtgo"         # "4 Lightning Bolt" lines, sideboard after a blank line
+    moxfield = "moxfield" # "4 Lightning Bolt (2X2) 117" lines with SIDEBOARD: / COMMANDER: sections
+
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "moxfield": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "text": "text/plain; charset=utf-8",
+    "arena": "text/plain; charset=utf-8",
+    "mtgo": "text/plain; charset=utf-8",
+}
+FILE_EXTENSIONS = {"csv": "csv", "moxfield": "csv", "ndjson": "ndjson", "text": "txt", "arena": "txt", "mtgo": "txt"}
+
+COLLECTION_CSV_COLUMNS = (
+    "quantity_normal", "quantity_foil", "name", "set_code", "collector_number", "scryfall_id",
+    "condition", "language", "notes", "date_added_to_collection",
+)
+DECK_CSV_COLUMNS = ("quantity", "name", "set_code", "collector_number", "scryfall_id", "is_commander", "is_sideboard")
+MOXFIELD_COLLECTION_COLUMNS = (
+    "Count", "Tradelist Count", "Name", "Edition", "Condition", "Language", "Foil", "Tags", "Last Modified", "Collector Number",
+)
+# Moxfield condition names for the short codes we store
+MOXFIELD_CONDITIONS = {
+    "M": "Mint", "NM": "Near Mint", "LP": "Good (Lightly Played)", "MP": "Played", "HP": "Heavily Played", "D": "Damaged", "DMG": "Damaged",
+}
+MOXFIELD_LANGUAGES = {
+    "en": "English", "es": "Spanish", "fr": "French", "de": "German", "it": "Italian", "pt": "Portuguese",
+    "ja": "Japanese", "ko": "Korean", "ru": "Russian", "zhs": "Chinese Simplified", "zht": "Chinese Traditional",
+}
+
+_CARD_COLUMNS = (
+    models.CardDefinition.name,
+    models.CardDefinition.set_code,
+    models.CardDefinition.collector_number,
+    models.CardDefinition.scryfall_id,
+)
+
+
+def _collection_query(user_id: int):
+    entry = models.UserCollectionEntry
+    return (
+        select(
+            entry.quantity_normal, entry.quantity_foil, entry.condition, entry.language, entry.notes,
+            entry.date_added_to_collection, *_CARD_COLUMNS,
+        )
+        .join(models.CardDefinition, models.CardDefinition.id == entry.card_definition_id)
+        .filter(entry.user_id == user_id)
+        .order_by(models.CardDefinition.name, models.CardDefinition.set_code, models.CardDefinition.collector_number, entry.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+
+
+def _deck_query(deck_id: int):
+    entry = models.DeckEntry
+    return (
+        select(entry.quantity, entry.is_commander, entry.is_sideboard, *_CARD_COLUMNS)
+        .join(models.CardDefinition, models.CardDefinition.id == entry.card_definition_id)
+        .filter(entry.deck_id == deck_id)
+        # Commanders first, then the main deck, then the sideboard, alphabetically within each
+        .order_by(entry.is_commander.desc().nulls_last(), entry.is_sideboard.asc().nulls_first(), models.CardDefinition.name, entry.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+
+
+async def _stream_partitions(query) -> AsyncIterator[list]:
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+
+def _csv_chunk(rows: Iterable[Iterable]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
+
+
+def _printing_label(row) -> str:
+    label = row.name
+    if row.set_code:
+        label += f" ({row.set_code.upper()})"
+        if row.collector_number:
+            label += f" {row.collector_number}"
+    return label
+
+
+# --- Collection row formatters: one partition of rows -> one chunk of text ---
+
+def _collection_csv(rows: List) -> str:
+    return _csv_chunk(
+        (row.quantity_normal, row.quantity_foil, row.name, row.set_code, row.collector_number, row.scryfall_id,
+         row.condition, row.language, row.notes, row.date_added_to_collection.isoformat() if row.date_added_to_collection else "")
+        for row in rows
+    )
+
+
+def _collection_ndjson(rows: List) -> str:
+    return "".join(
+        orjson.dumps({column: getattr(row, column) for column in COLLECTION_CSV_COLUMNS}).decode() + "\n"
+        for row in rows
+    )
+
+
+def _collection_text(rows: List) -> str:
+    lines = []
+    for row in rows:
+        if row.quantity_normal:
+            lines.append(f"{row.quantity_normal} {_printing_label(row)}\n")
+        if row.quantity_foil:
+            lines.append(f"{row.quantity_foil} {_printing_label(row)} *F*\n")
+    return "".join(lines)
+
+
+def _collection_moxfield(rows: List) -> str:
+    out = []
+    for row in rows:
+        for quantity, foil in ((row.quantity_normal, ""), (row.quantity_foil, "foil")):
+            if quantity:
+                out.append((
+                    quantity, 0, row.name, (row.set_code or "").lower(),
+                    MOXFIELD_CONDITIONS.get((row.condition or "NM").upper(), "Near Mint"),
+                    MOXFIELD_LANGUAGES.get(row.language or "en", "English"), foil, "",
+                    row.date_added_to_collection.strftime("%Y-%m-%d %H:%M:%S") if row.date_added_to_collection else "",
+                    row.collector_number or "",
+                ))
+    return _csv_chunk(out)
+
+
+_COLLECTION_FORMATTERS: Dict[CollectionExportFormat, Callable[[List], str]] = {
+    CollectionExportFormat.csv: _collection_csv,
+    CollectionExportFormat.ndjson: _collection_ndjson,
+    CollectionExportFormat.text: _collection_text,
+    CollectionExportFormat.moxfield: _collection_moxfield,
+}
+_COLLECTION_HEADERS = {
+    CollectionExportFormat.csv: _csv_chunk([COLLECTION_CSV_COLUMNS]),
+    CollectionExportFormat.moxfield: _csv_chunk([MOXFIELD_COLLECTION_COLUMNS]),
+}
+
+
+async def export_collection(user_id: int, export_format: CollectionExportFormat) -> AsyncIterator[str]:
+    """Yield the user's collection in `export_format`, one chunk per fetched batch of rows."""
+    header = _COLLECTION_HEADERS.get(export_format)
+    if header:
+        yield header
+    formatter = _COLLECTION_FORMATTERS[export_format]
+    async for partition in _stream_partitions(_collection_query(user_id)):
+        yield formatter(partition)
+
+
+# --- Decks ---
+
+def _deck_section(row) -> str:
+    if row.is_commander:
+        return "commander"
+    return "sideboard" if row.is_sideboard else "main"
+
+
+_DECK_SECTION_HEADINGS = {
+    DeckExportFormat.arena: {"commander": "Commander", "main": "Deck", "sideboard": "Sideboard"},
+    DeckExportFormat.moxfield: {"commander": "COMMANDER:", "main": None, "sideboard": "SIDEBOARD:"},
+    DeckExportFormat.mtgo: {"commander": None, "main": None, "sideboard": None},
+}
+
+
+async def export_deck(deck_id: int, export_format: DeckExportFormat) -> AsyncIterator[str]:
+    """Yield one deck in `export_format`. Rows arrive ordered commander -> main -> sideboard."""
+    partitions = _stream_partitions(_deck_query(deck_id))
+    if export_format == DeckExportFormat.csv:
+        yield _csv_chunk([DECK_CSV_COLUMNS])
+        async for partition in partitions:
+            yield _csv_chunk(
+                (row.quantity, row.name, row.set_code, row.collector_number, row.scryfall_id, bool(row.is_commander), bool(row.is_sideboard))
+                for row in partition
+            )
+        return
+    if export_format == DeckExportFormat.ndjson:
+        async for partition in partitions:
+            yield "".join(orjson.dumps({column: getattr(row, column) for column in DECK_CSV_COLUMNS}).decode() + "\n" for row in partition)
+        return
+
+    headings = _DECK_SECTION_HEADINGS[export_format]
+    current_section = None
+    async for partition in partitions:
+        lines = []
+        for row in partition:
+            section = _deck_section(row)
+            if section == "commander" and export_format == DeckExportFormat.mtgo:
+                section = "main" # MTGO lists have no commander section
+            if section != current_section:
+                if current_section is not None:
+                    lines.append("\n")
+                if headings[section]:
+                    lines.append(headings[section] + "\n")
+                current_section = section
+            label = row.name if export_format == DeckExportFormat.mtgo else _printing_label(row)
+            lines.append(f"{row.quantity} {label}\n")
+        yield "".join(lines)
+
+
+def content_disposition(base_name: str, export_format: str) -> str:
+    """
+    Content-Disposition for downloading `base_name` in `export_format`. Headers are latin-1, so
+    filename= gets an ASCII-only name and filename* (RFC 5987) the full UTF-8 one.
+    """
+    extension = FILE_EXTENSIONS[export_format]
+    ascii_name = "".join(ch if ch.isascii() and (ch.isalnum() or ch in "-_ ") else "_" for ch in base_name).strip() or "export"
+    utf8_name = "".join(ch if ch.isalnum() or ch in "-_ " else "_" for ch in base_name).strip() or "export"
+    return f'attachment; filename="{ascii_name}.{extension}"; filename*=UTF-8\'\'{quote(f"{utf8_name}.{extension}", safe="")}'
+
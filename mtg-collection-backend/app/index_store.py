@@ -0,0 +1,74 @@
+# app/index_store.py
+"""
+On-disk storage for read-only NumPy column sets (card index, similarity index, ...).
+
+An index directory holds one subdirectory per build plus a CURRENT file naming the live
+build. Writers build into a fresh subdirectory and then atomically replace CURRENT, so
+readers never see a half-written index. Readers memory-map the .npy files read-only;
+every uvicorn worker mapping the same files shares one copy of the pages via the OS page cache.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+CURRENT_FILE = "CURRENT"
+META_FILE = "meta.json"
+
+
+def current_version(directory: str) -> Optional[str]:
+    """Name of the live build in `directory`, or None if nothing has been built yet."""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_arrays(directory: str, arrays: Dict[str, np.ndarray], meta: dict) -> str:
+    """
+    Write a new build of `arrays` (one .npy per column) plus `meta` and make it current.
+    The previous build is kept so readers racing the swap can still open it; older ones are
+    removed (processes that already mapped them keep working until they reload).
+    Returns the new build's version string.
+    """
+    os.makedirs(directory, exist_ok=True)
+    previous_version = current_version(directory)
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    build_dir = os.path.join(directory, version)
+    os.makedirs(build_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(build_dir, f"{name}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(build_dir, META_FILE), "w") as f:
+        json.dump({**meta, "version": version}, f)
+
+    tmp_current = os.path.join(directory, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_current, "w") as f:
+        f.write(version)
+    os.replace(tmp_current, os.path.join(directory, CURRENT_FILE))
+
+    for entry in os.listdir(directory):
+        entry_path = os.path.join(directory, entry)
+        if entry not in (version, previous_version) and os.path.isdir(entry_path):
+            shutil.rmtree(entry_path, ignore_errors=True)
+    return version
+
+
+def load_arrays(directory: str, version: Optional[str] = None) -> Tuple[Dict[str, np.ndarray], dict]:
+    """Memory-map every column of a build (the current one by default) read-only."""
+    version = version or current_version(directory)
+    if version is None:
+        raise FileNotFoundError(f"No index has been built in {directory}.")
+    build_dir = os.path.join(directory, version)
+    with open(os.path.join(build_dir, META_FILE)) as f:
+        meta = json.load(f)
+    arrays = {
+        filename[:-len(".npy")]: np.load(os.path.join(build_dir, filename), mmap_mode="r")
+        for filename in os.listdir(build_dir)
+        if filename.endswith(".npy")
+    }
+    return arrays, meta
@@ -1,19 +1,24 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException, status, Query, Request, Path # Import Query, Request, and Path
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Request, Path, UploadFile, File # Import Query, Request, and Path
 from fastapi.middleware.cors import CORSMiddleware # Import CORSMiddleware
-from fastapi.responses import Response # Added for serving image data
+from fastapi.responses import Response, StreamingResponse # Added for serving image data
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import timedelta
 from jose import JWTError # Import JWTError
 
 
 from . import models, schemas, crud, security # Import security
-from .database import engine, get_db
+from . import card_resolver, card_index, card_features, similarity, exporters, collection_batch, collection_import, collection_stats, collection_summary, decklist, deck_analytics, deck_operations, deck_validation, value_history
+from .serializers import ResponseSerializer, json_response, CardView, select_card_fields, card_columns, enable_card_documents, DECK_ENTRY_FIELDS
+from .compression import CompressionMiddleware
+from .conditional import version_etag, not_modified, tagged_json_response
+from .database import AsyncSessionLocal, engine, get_db
 from .core.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False) # For endpoints that also work anonymously
 from enum import Enum # Added for StoredImageSize
 
 async def create_db_and_tables():
@@ -22,11 +27,17 @@ async def create_db_and_tables():
         # Be careful with drop_all in production!
         await conn.run_sync(models.Base.metadata.create_all)
 
+async def enable_stored_card_documents():
+    # Serve the full/slim card views from the stored JSON only if none of it is missing or stale
+    # (scripts/refresh_card_documents.py rebuilds it; restart afterwards to pick it up)
+    async with AsyncSessionLocal() as session:
+        enable_card_documents(await crud.card_documents_current(session))
+
 app = FastAPI(
     title="MTG Collection Tracker API",
     description="API for managing a Magic: The Gathering card collection.",
     version="0.1.0",
-    on_startup=[create_db_and_tables],
+    on_startup=[create_db_and_tables, enable_stored_card_documents],
 )
 
 # --- CORS Middleware ---
@@ -50,8 +61,13 @@ app.add_middleware(
     allow_credentials=True,      # Allow cookies to be included in requests
     allow_methods=["*"],         # Allow all methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],         # Allow all headers
+    expose_headers=["X-Total-Count", "ETag"], # Let the frontend read paging totals and validators
 )
 
+# --- Compression Middleware ---
+# Brotli (if installed) or gzip for responses of 1 KB and more; images are passed through
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
 # --- Helper Dependency for Current User ---
 async def get_current_active_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> models.User:
     try:
@@ -71,6 +87,34 @@ async def get_current_active_user(token: str = Depends(oauth2_scheme), db: Async
         )
     return user
 
+async def _user_for_ownership(include_owned: bool, token: Optional[str], db: AsyncSession) -> Optional[models.User]:
+    """
+    The authenticated user when include_owned is set (a valid token is then required), otherwise
+    None. Anonymous reads never look at the token, so a stale one can't turn them into a 401.
+    """
+    if not include_owned:
+        return None
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication is required for include_owned",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_active_user(token=token, db=db)
+
+def get_card_fields(
+    view: CardView = Query(CardView.full, description="slim: id, name, set, collector number and thumbnail only; full: every card field"),
+    fields: Optional[str] = Query(None, description="Comma-separated card fields to return (overrides view), e.g. 'name,set_code,prices,local_image_url_small'")
+) -> Tuple[str, ...]:
+    """Card fields selected by the view/fields query parameters. They drive both the JSON shape and the SQL columns."""
+    try:
+        return select_card_fields(view, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def _ownership_dict(quantity_normal: int, quantity_foil: int, deck_quantity: int, deck_count: int) -> dict:
+    return {"quantity_normal": quantity_normal, "quantity_foil": quantity_foil, "deck_quantity": deck_quantity, "deck_count": deck_count}
+
 # --- Authentication Endpoints ---
 @app.post("/auth/register", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
 async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
@@ -119,7 +163,7 @@ async def create_new_card_definition(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Card Definition with this Scryfall ID already exists")
     return await crud.create_card_definition(db=db, card_def=card_def)
 
-@app.get("/card-definitions/", response_model=List[schemas.CardDefinition])
+@app.get("/card-definitions/", response_model=List[schemas.CardDefinitionWithOwnership])
 async def read_card_definitions_list(
     request: Request, # Inject Request
     skip: int = 0,
@@ -127,29 +171,60 @@ async def read_card_definitions_list(
     name: Optional[str] = None,
     type_line: Optional[str] = None,
     set_code: Optional[str] = None,
+    include_owned: bool = Query(False, description="Annotate each card with the caller's owned quantities and deck usage (requires auth)"),
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
     # Add other searchable fields as query parameters here
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    token: Optional[str] = Depends(optional_oauth2_scheme)
 ):
     """
     Retrieve a list of card definitions.
     Supports pagination and filtering by name, type_line, set_code, etc.
     Providing a 'name' will list all printings of cards matching that name.
     """
-    card_defs = await crud.get_card_definitions(
-        db=db, skip=skip, limit=limit, name=name, type_line=type_line, set_code=set_code
-    )
+    current_user = await _user_for_ownership(include_owned, token, db)
+    if include_owned:
+        rows = await crud.get_card_definitions_with_ownership(
+            db=db, user_id=current_user.id, skip=skip, limit=limit, name=name, type_line=type_line, set_code=set_code,
+            card_columns=card_columns(card_fields)
+        )
+    else:
+        card_defs = await crud.get_card_definitions(
+            db=db, skip=skip, limit=limit, name=name, type_line=type_line, set_code=set_code,
+            card_columns=card_columns(card_fields)
+        )
+        rows = [(db_card, None) for db_card in card_defs]
     
-    response_cards: List[schemas.CardDefinition] = []
-    for db_card in card_defs: # Iterate over the correct variable 'card_defs'
-        pydantic_card = schemas.CardDefinition.from_orm(db_card)
-        if db_card.image_data_small:
-            pydantic_card.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card.scryfall_id, size='small'))
-        if db_card.image_data_normal:
-            pydantic_card.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card.scryfall_id, size='normal'))
-        if db_card.image_data_large:
-            pydantic_card.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card.scryfall_id, size='large'))
-        response_cards.append(pydantic_card)
-    return response_cards
+    serializer = ResponseSerializer(request, card_fields)
+    return tagged_json_response(request, [
+        serializer.card(db_card, owned=_ownership_dict(*ownership) if include_owned else None)
+        for db_card, *ownership in rows
+    ])
+
+@app.post("/card-definitions/batch", response_model=schemas.CardDefinitionBatchResult)
+async def read_card_definitions_batch(
+    batch_request: schemas.CardDefinitionBatchRequest,
+    request: Request, # Inject Request
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Fetch up to 500 card definitions by id and/or 500 by Scryfall ID in one request
+    (one query each). Cards come back in request order; unknown ids are listed as missing.
+    Supports the same view= / fields= selection as the list endpoints.
+    """
+    columns = card_columns(card_fields)
+    by_id = await crud.get_card_definitions_by_ids(db=db, card_definition_ids=batch_request.ids, card_columns=columns)
+    by_scryfall_id = await crud.get_card_definitions_by_scryfall_ids(db=db, scryfall_ids=batch_request.scryfall_ids, card_columns=columns)
+    found_ids = {db_card.id for db_card in by_id}
+    found_scryfall_ids = {db_card.scryfall_id for db_card in by_scryfall_id}
+
+    serializer = ResponseSerializer(request, card_fields)
+    return json_response({
+        "cards": [serializer.card(db_card) for db_card in by_id + by_scryfall_id],
+        "missing_ids": [card_id for card_id in batch_request.ids if card_id not in found_ids],
+        "missing_scryfall_ids": [scryfall_id for scryfall_id in batch_request.scryfall_ids if scryfall_id not in found_scryfall_ids],
+    })
 
 @app.get("/card-definitions/{card_def_id}", response_model=schemas.CardDefinition)
 async def read_card_definition(
@@ -161,46 +236,176 @@ async def read_card_definition(
     if db_card_def is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Card Definition not found")
     
-    pydantic_card = schemas.CardDefinition.from_orm(db_card_def)
-    if db_card_def.image_data_small:
-        pydantic_card.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='small'))
-    if db_card_def.image_data_normal:
-        pydantic_card.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='normal'))
-    if db_card_def.image_data_large:
-        pydantic_card.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='large'))
-    return pydantic_card
+    return tagged_json_response(request, ResponseSerializer(request).card(db_card_def))
 
 # --- Card Search Endpoint (as requested by frontend) ---
-@app.get("/cards/search", response_model=List[schemas.CardDefinition])
+@app.get("/cards/search", response_model=List[schemas.CardDefinitionWithOwnership])
 async def search_card_definitions_by_name(
     request: Request, # Inject Request
     name: str = Query(..., min_length=1, description="Card name to search for"),
     skip: int = 0,
     limit: int = 20, # Default limit for search results
-    db: AsyncSession = Depends(get_db)
+    include_owned: bool = Query(False, description="Annotate each card with the caller's owned quantities and deck usage (requires auth)"),
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
+    db: AsyncSession = Depends(get_db),
+    token: Optional[str] = Depends(optional_oauth2_scheme)
 ):
     """
     Search for Magic: The Gathering card definitions by name.
     This endpoint is specifically for the frontend's /cards/search path.
+    With include_owned=true, ownership is joined in the same query, so the frontend
+    never has to download the whole collection to render ownership badges.
     """
-    # Uses the existing crud.get_card_definitions function
-    card_defs_models = await crud.get_card_definitions(
-        db=db, skip=skip, limit=limit, name=name
-        # You can add other parameters like type_line, set_code if the frontend sends them
-    )
+    current_user = await _user_for_ownership(include_owned, token, db)
+    if include_owned:
+        rows = await crud.get_card_definitions_with_ownership(
+            db=db, user_id=current_user.id, skip=skip, limit=limit, name=name, card_columns=card_columns(card_fields)
+        )
+    else:
+        # Uses the existing crud.get_card_definitions function
+        card_defs_models = await crud.get_card_definitions(
+            db=db, skip=skip, limit=limit, name=name, card_columns=card_columns(card_fields)
+            # You can add other parameters like type_line, set_code if the frontend sends them
+        )
+        rows = [(db_card, None) for db_card in card_defs_models]
     # Standard practice is to return an empty list if no results are found,
     # rather than a 404, as the endpoint itself was found and processed the query.
-    response_cards: List[schemas.CardDefinition] = []
-    for db_card in card_defs_models:
-        pydantic_card = schemas.CardDefinition.from_orm(db_card)
-        if db_card.image_data_small: # Check if image data exists before creating URL
-            pydantic_card.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card.scryfall_id, size='small'))
-        if db_card.image_data_normal:
-            pydantic_card.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card.scryfall_id, size='normal'))
-        if db_card.image_data_large:
-            pydantic_card.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card.scryfall_id, size='large'))
-        response_cards.append(pydantic_card)
-    return response_cards
+    serializer = ResponseSerializer(request, card_fields)
+    return tagged_json_response(request, [
+        serializer.card(db_card, owned=_ownership_dict(*ownership) if include_owned else None)
+        for db_card, *ownership in rows
+    ])
+
+@app.get("/cards/search/collapsed", response_model=List[schemas.CardDefinitionCollapsed])
+async def search_card_definitions_collapsed(
+    request: Request, # Inject Request
+    name: str = Query(..., min_length=1, description="Card name to search for"),
+    skip: int = 0,
+    limit: int = 20,
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Search card definitions by name, returning one representative printing per card name
+    along with how many printings matched. Use /cards/printings to page through the
+    printings of a single result.
+    """
+    rows = await crud.get_collapsed_card_definitions(db=db, skip=skip, limit=limit, name=name, card_columns=card_columns(card_fields))
+    serializer = ResponseSerializer(request, card_fields)
+    return tagged_json_response(request, [
+        serializer.card(db_card, printing_count=printing_count, newest_printing_id=db_card.id, cheapest_printing_id=cheapest_printing_id)
+        for db_card, printing_count, cheapest_printing_id in rows
+    ])
+
+@app.get("/cards/printings", response_model=List[schemas.CardDefinition])
+async def read_card_printings(
+    request: Request, # Inject Request
+    name: str = Query(..., min_length=1, description="Exact card name, e.g. from a collapsed search result"),
+    skip: int = 0,
+    limit: int = 20,
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
+    db: AsyncSession = Depends(get_db)
+):
+    """Page through the printings of a single card, newest first."""
+    card_defs = await crud.get_card_printings(db=db, name=name, skip=skip, limit=limit, card_columns=card_columns(card_fields))
+    serializer = ResponseSerializer(request, card_fields)
+    return tagged_json_response(request, [serializer.card(db_card) for db_card in card_defs])
+
+@app.post("/cards/resolve", response_model=List[schemas.CardResolveResult])
+async def resolve_card_names(
+    resolve_request: schemas.CardResolveRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Resolve a batch of card names (optionally with set code / collector number) to printings.
+    Handles case, punctuation, split/DFC names ("Fire // Ice", front face only) and falls back
+    to fuzzy matching for typos. One result is returned per input line, in order.
+    """
+    return await card_resolver.resolve_card_lines(db, resolve_request.lines)
+
+@app.get("/cards/filter", response_model=List[schemas.CardDefinition])
+async def filter_card_definitions(
+    request: Request, # Inject Request
+    identity: Optional[str] = Query(None, description="Color identity must fit within these colors, e.g. 'UG' ('C' for colorless only)"),
+    colors: Optional[str] = Query(None, description="Card colors must include all of these, e.g. 'R' ('C' for colorless only)"),
+    cmc_min: Optional[float] = None,
+    cmc_max: Optional[float] = None,
+    card_types: List[str] = Query([], alias="type", description="Required types/supertypes, e.g. type=legendary&type=creature"),
+    format: Optional[str] = Query(None, description="Only cards legal in this format, e.g. 'commander'"),
+    rarity: List[str] = Query([], description="Any of these rarities"),
+    skip: int = Query(0, ge=0),
+    limit: int = 100,
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Filter the whole card catalog by color identity, colors, cmc range, types, format legality
+    and rarity. Filters are evaluated against the in-memory columnar card index; only the
+    requested page of cards is loaded from the database.
+    """
+    index = card_index.get_card_index()
+    if index is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Card index has not been built yet. Run scripts/build_card_index.py.")
+    try:
+        filters = card_index.filters_from_query(
+            identity=identity, colors=colors, cmc_min=cmc_min, cmc_max=cmc_max,
+            types=card_types, format=format, rarities=rarity
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    matching_ids = index.filter_ids(**filters)
+    card_defs = await crud.get_card_definitions_by_ids(
+        db=db, card_definition_ids=matching_ids[skip:skip + limit].tolist(), card_columns=card_columns(card_fields)
+    )
+
+    serializer = ResponseSerializer(request, card_fields)
+    return tagged_json_response(request, 
+        [serializer.card(db_card) for db_card in card_defs],
+        headers={"X-Total-Count": str(len(matching_ids))}
+    )
+
+@app.get("/cards/{card_def_id}/similar", response_model=List[schemas.CardDefinitionSimilar])
+async def read_similar_cards(
+    card_def_id: int,
+    request: Request, # Inject Request
+    identity: Optional[str] = Query(None, description="Only cards whose color identity fits within these colors, e.g. 'UG'"),
+    format: Optional[str] = Query(None, description="Only cards legal in this format, e.g. 'commander'"),
+    limit: int = Query(20, ge=1, le=100),
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cards whose rules text and type line are most similar to the given card ("cards like this").
+    Any printing's id may be given; one (newest) printing per similar card name is returned,
+    best match first. Scored against the precomputed TF-IDF similarity index.
+    """
+    index = similarity.get_similarity_index()
+    if index is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Similarity index has not been built yet. Run scripts/build_similarity_index.py.")
+    db_card_def = await crud.get_card_definition(db=db, card_definition_id=card_def_id)
+    if db_card_def is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Card definition not found")
+    row = index.row_for_name(db_card_def.name)
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Card is not in the similarity index yet. Rebuild it with scripts/build_similarity_index.py.")
+    try:
+        matches = index.most_similar(
+            row, limit=limit,
+            identity_mask=card_features.parse_color_string(identity) if identity is not None else None,
+            format_mask=card_features.format_bit(format) if format else 0,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    scores = dict(matches)
+    card_defs = await crud.get_card_definitions_by_ids(db=db, card_definition_ids=list(scores), card_columns=card_columns(card_fields))
+
+    serializer = ResponseSerializer(request, card_fields)
+    return tagged_json_response(request, [
+        serializer.card(db_card, similarity=round(min(scores[db_card.id], 1.0), 4))
+        for db_card in card_defs
+    ])
 
 # --- Card Image Endpoint ---
 class StoredImageSize(str, Enum):
@@ -263,42 +468,122 @@ async def add_card_to_my_collection(
     """
     try:
         db_entry = await crud.add_card_to_collection(db=db, user_id=current_user.id, entry_create=entry_create)
-        pydantic_entry = schemas.UserCollectionEntry.from_orm(db_entry)
-        if db_entry.card_definition:
-            db_card_def = db_entry.card_definition
-            if db_card_def.image_data_small:
-                pydantic_entry.card_definition.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='small'))
-            if db_card_def.image_data_normal:
-                pydantic_entry.card_definition.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='normal'))
-            if db_card_def.image_data_large:
-                pydantic_entry.card_definition.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='large'))
-        return pydantic_entry
+        return json_response(ResponseSerializer(request).collection_entry(db_entry), status_code=status.HTTP_201_CREATED)
     except ValueError as e: # Catch specific error from CRUD if CardDefinition not found
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+@app.post("/collection/cards/batch", response_model=schemas.CollectionBatchResult)
+async def apply_my_collection_batch(
+    batch_request: schemas.CollectionBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Add, set or remove up to 1000 cards in one request and one transaction. Cards are given
+    by Scryfall ID or by name (with optional set code / collector number). One result is
+    returned per operation, in order; cards that can't be resolved are reported as not_found.
+    """
+    result = await collection_batch.apply_collection_batch(db=db, user_id=current_user.id, operations=batch_request.operations)
+    return json_response(result.model_dump())
+
+@app.post("/collection/import", response_model=schemas.CollectionImportReport)
+async def import_my_collection_csv(
+    file: UploadFile = File(...),
+    import_format: schemas.CollectionImportFormat = Query(schemas.CollectionImportFormat.auto, alias="format"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Import a collection CSV exported from Moxfield, Deckbox, TCGplayer, ManaBox or this API.
+    The format is detected from the header unless given. Every row is added to the collection
+    in one transaction; rows whose card can't be resolved are listed in the report.
+    Poll GET /collection/import/progress from another request to follow a large import.
+    """
+    try:
+        report = await collection_import.import_collection_csv(db=db, user_id=current_user.id, upload=file, import_format=import_format)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return json_response(report.model_dump())
+
+@app.get("/collection/import/progress", response_model=schemas.CollectionImportProgress)
+async def read_my_collection_import_progress(
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Progress of the authenticated user's running (or last) CSV import."""
+    progress = await collection_import.get_import_progress(db, current_user.id)
+    if progress is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No collection import in progress")
+    return json_response(progress.model_dump())
+
+@app.get("/collection/summary", response_model=schemas.CollectionSummary)
+async def read_my_collection_summary(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Total and foil/non-foil copies, entries and USD/EUR value of the authenticated user's collection."""
+    summary = await collection_summary.get_summary(db, current_user.id)
+    return tagged_json_response(request, summary.model_dump())
+
+@app.get("/collection/stats", response_model=schemas.CollectionStats)
+async def read_my_collection_stats(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Copies and entries of the authenticated user's collection by color identity, rarity, set, type and mana value."""
+    etag = version_etag(request, current_user.id, current_user.collection_version)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    stats = await collection_stats.get_collection_stats(db, current_user)
+    return tagged_json_response(request, stats.model_dump(), etag=etag)
+
+@app.get("/collection/value-history", response_model=List[schemas.CollectionValuePoint])
+async def read_my_collection_value_history(
+    request: Request,
+    days: int = Query(365, ge=1, le=3660, description="How many days back, today included"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Daily USD/EUR value of the authenticated user's collection, oldest first, from the daily snapshots."""
+    history = await value_history.get_value_history(db, current_user.id, days)
+    return tagged_json_response(request, [point.model_dump() for point in history])
+
 @app.get("/collection/cards/", response_model=List[schemas.UserCollectionEntry])
 async def read_my_collection(
     request: Request, # Inject Request
     skip: int = 0, 
     limit: int = 100,
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
     db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    db_collection_entries = await crud.get_user_collection(db=db, user_id=current_user.id, skip=skip, limit=limit)
+    etag = version_etag(request, current_user.id, current_user.collection_version)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    db_collection_entries = await crud.get_user_collection(
+        db=db, user_id=current_user.id, skip=skip, limit=limit, card_columns=card_columns(card_fields)
+    )
     
-    response_entries: List[schemas.UserCollectionEntry] = []
-    for db_entry in db_collection_entries:
-        pydantic_entry = schemas.UserCollectionEntry.from_orm(db_entry)
-        if db_entry.card_definition: # Ensure card_definition exists
-            db_card_def = db_entry.card_definition 
-            if db_card_def.image_data_small:
-                pydantic_entry.card_definition.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='small'))
-            if db_card_def.image_data_normal:
-                pydantic_entry.card_definition.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='normal'))
-            if db_card_def.image_data_large:
-                pydantic_entry.card_definition.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='large'))
-        response_entries.append(pydantic_entry)
-    return response_entries
+    serializer = ResponseSerializer(request, card_fields)
+    return tagged_json_response(request, [serializer.collection_entry(db_entry) for db_entry in db_collection_entries], etag=etag)
+
+@app.get("/collection/export")
+async def export_my_collection(
+    export_format: exporters.CollectionExportFormat = Query(exporters.CollectionExportFormat.csv, alias="format"),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Stream the authenticated user's whole collection as CSV, NDJSON, decklist text or a
+    Moxfield collection CSV. Rows are streamed from a server-side cursor, so memory use
+    does not grow with the collection.
+    """
+    return StreamingResponse(
+        exporters.export_collection(current_user.id, export_format),
+        media_type=exporters.MEDIA_TYPES[export_format.value],
+        headers={"Content-Disposition": exporters.content_disposition("collection", export_format.value)},
+    )
 
 @app.get("/collection/cards/{collection_entry_id}", response_model=schemas.UserCollectionEntry)
 async def read_my_collection_entry(
@@ -307,20 +592,14 @@ async def read_my_collection_entry(
     db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
+    etag = version_etag(request, current_user.id, current_user.collection_version)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
     db_entry = await crud.get_collection_entry(db=db, user_id=current_user.id, collection_entry_id=collection_entry_id)
     if db_entry is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Collection entry not found")
     
-    pydantic_entry = schemas.UserCollectionEntry.from_orm(db_entry)
-    if db_entry.card_definition:
-        db_card_def = db_entry.card_definition
-        if db_card_def.image_data_small:
-            pydantic_entry.card_definition.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='small'))
-        if db_card_def.image_data_normal:
-            pydantic_entry.card_definition.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='normal'))
-        if db_card_def.image_data_large:
-            pydantic_entry.card_definition.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='large'))
-    return pydantic_entry
+    return tagged_json_response(request, ResponseSerializer(request).collection_entry(db_entry), etag=etag)
 
 @app.put("/collection/cards/{collection_entry_id}", response_model=schemas.UserCollectionEntry)
 async def update_my_collection_entry(
@@ -335,16 +614,7 @@ async def update_my_collection_entry(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Collection entry not found")
     updated_db_entry = await crud.update_collection_entry(db=db, db_collection_entry=db_entry, entry_update=entry_update)
     
-    pydantic_entry = schemas.UserCollectionEntry.from_orm(updated_db_entry)
-    if updated_db_entry.card_definition:
-        db_card_def = updated_db_entry.card_definition
-        if db_card_def.image_data_small:
-            pydantic_entry.card_definition.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='small'))
-        if db_card_def.image_data_normal:
-            pydantic_entry.card_definition.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='normal'))
-        if db_card_def.image_data_large:
-            pydantic_entry.card_definition.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='large'))
-    return pydantic_entry
+    return json_response(ResponseSerializer(request).collection_entry(updated_db_entry))
 
 @app.delete("/collection/cards/{collection_entry_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_my_collection_entry(
@@ -389,65 +659,181 @@ async def create_new_deck_for_user(
 ):
     """Create a new deck for the authenticated user."""
     db_deck = await crud.create_deck(db=db, user_id=current_user.id, deck_create=deck_create)
-    # Even if deck_entries is empty, we convert to Pydantic schema
-    pydantic_deck = schemas.Deck.from_orm(db_deck)
-    # No need to iterate pydantic_deck.deck_entries here as it will be empty upon creation
-    return pydantic_deck
+    # deck_entries is empty upon creation
+    return json_response(ResponseSerializer(request).deck(db_deck), status_code=status.HTTP_201_CREATED)
 
 @app.get("/decks/", response_model=List[schemas.Deck])
 async def read_user_decks(
     request: Request, # Inject Request
     skip: int = 0, 
     limit: int = 100,
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
     db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Retrieve decks for the authenticated user."""
-    db_decks = await crud.get_user_decks(db=db, user_id=current_user.id, skip=skip, limit=limit)
+    """Retrieve decks for the authenticated user. Use view=slim (or fields=) to trim the nested cards."""
+    etag = version_etag(request, current_user.id, current_user.deck_version)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    db_decks = await crud.get_user_decks(db=db, user_id=current_user.id, skip=skip, limit=limit, card_columns=card_columns(card_fields))
     
-    response_decks: List[schemas.Deck] = []
-    for db_deck in db_decks:
-        pydantic_deck = schemas.Deck.from_orm(db_deck)
-        for pydantic_deck_entry in pydantic_deck.deck_entries:
-            # Find the corresponding SQLAlchemy model for the card_definition
-            # This assumes db_deck.deck_entries were loaded with their card_definitions by CRUD
-            original_db_deck_entry = next((de for de in db_deck.deck_entries if de.id == pydantic_deck_entry.id), None)
-            if original_db_deck_entry and original_db_deck_entry.card_definition:
-                db_card_def = original_db_deck_entry.card_definition
-                if db_card_def.image_data_small:
-                    pydantic_deck_entry.card_definition.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='small'))
-                if db_card_def.image_data_normal:
-                    pydantic_deck_entry.card_definition.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='normal'))
-                if db_card_def.image_data_large:
-                    pydantic_deck_entry.card_definition.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='large'))
-        response_decks.append(pydantic_deck)
-    return response_decks
+    # Assumes db_deck.deck_entries were loaded with their card_definitions by CRUD
+    serializer = ResponseSerializer(request, card_fields)
+    return tagged_json_response(request, [serializer.deck(db_deck) for db_deck in db_decks], etag=etag)
+
+@app.post("/decks/import", response_model=schemas.DeckImportResult, status_code=status.HTTP_201_CREATED)
+async def import_deck_from_text(
+    import_request: schemas.DeckImportRequest,
+    request: Request, # Inject Request
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Create a deck from pasted MTGO, Arena or Moxfield decklist text in one request.
+    All cards are resolved and checked for legality in the deck's format together; if any
+    line fails, nothing is created and the problems are returned (400) unless skip_invalid is set.
+    """
+    try:
+        deck_id, problems = await decklist.import_decklist(db=db, user_id=current_user.id, import_request=import_request)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if deck_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "The decklist has problems; nothing was imported.", "problems": [problem.model_dump() for problem in problems]},
+        )
+    db_deck = await crud.get_deck(db=db, user_id=current_user.id, deck_id=deck_id)
+    validation = await deck_validation.validate_deck(db, current_user.id, deck_id)
+    content = {
+        "deck": ResponseSerializer(request).deck(db_deck),
+        "problems": [problem.model_dump() for problem in problems],
+        "validation": validation.model_dump(),
+    }
+    return json_response(content, status_code=status.HTTP_201_CREATED)
+
+@app.get("/decks/summary", response_model=List[schemas.DeckSummary])
+async def read_user_deck_summaries(
+    request: Request, # Inject Request
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    List the authenticated user's decks with card counts, commanders and color identity,
+    without loading deck contents. Fetch /decks/{deck_id} for the full deck.
+    """
+    etag = version_etag(request, current_user.id, current_user.deck_version)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    rows = await crud.get_user_deck_summaries(db=db, user_id=current_user.id, skip=skip, limit=limit)
+    content = []
+    for row in rows:
+        deck = dict(row._mapping)
+        deck["commanders"] = sorted(set(deck.pop("commander_names") or []))
+        deck["color_identity"] = card_features.colors_from_mask(deck.pop("color_identity_mask"))
+        content.append(deck)
+    return tagged_json_response(request, content, etag=etag)
+
+@app.get("/decks/missing", response_model=List[schemas.DeckMissingCards])
+async def read_missing_cards_by_deck(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    For every deck of the authenticated user, the cards (matched by name, any printing) the
+    collection doesn't hold enough of, with the cost of the shortfall at the cheapest printing.
+    """
+    # Costs follow card prices, which change without a version bump, so this is tagged by its body
+    rows = await crud.get_missing_cards_by_deck(db=db, user_id=current_user.id)
+    decks = {}
+    for deck_id, deck_name, card_name, needed, owned, cheapest_printing_id, usd in rows:
+        deck = decks.get(deck_id)
+        if deck is None:
+            deck = decks[deck_id] = schemas.DeckMissingCards(deck_id=deck_id, deck_name=deck_name)
+        if card_name is None:
+            continue
+        short = needed - owned
+        card = schemas.MissingCard(
+            name=card_name, needed=needed, owned=owned, short=short, cheapest_printing_id=cheapest_printing_id,
+            unit_price_usd=usd, cost_usd=round(float(usd) * short, 2) if usd is not None else None,
+        )
+        deck.missing.append(card)
+        deck.total_short += short
+        if card.cost_usd is None:
+            deck.unpriced_cards += 1
+        else:
+            deck.estimated_cost_usd = round(deck.estimated_cost_usd + card.cost_usd, 2)
+    return tagged_json_response(request, [deck.model_dump() for deck in decks.values()])
 
 @app.get("/decks/{deck_id}", response_model=schemas.Deck)
 async def read_single_deck(
     deck_id: int,
     request: Request, # Inject Request
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
     db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Retrieve a specific deck owned by the authenticated user."""
-    db_deck = await crud.get_deck(db=db, user_id=current_user.id, deck_id=deck_id)
+    deck_version = await crud.get_deck_version(db=db, user_id=current_user.id, deck_id=deck_id)
+    if deck_version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deck not found or not owned by user")
+    etag = version_etag(request, current_user.id, deck_id, deck_version)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+
+    db_deck = await crud.get_deck(db=db, user_id=current_user.id, deck_id=deck_id, card_columns=card_columns(card_fields))
     if db_deck is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deck not found or not owned by user")
+    return tagged_json_response(request, ResponseSerializer(request, card_fields).deck(db_deck), etag=etag)
+
+@app.get("/decks/{deck_id}/export")
+async def export_single_deck(
+    deck_id: int,
+    export_format: exporters.DeckExportFormat = Query(exporters.DeckExportFormat.arena, alias="format"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Stream a deck owned by the authenticated user as CSV, NDJSON, or Arena/MTGO/Moxfield decklist text."""
+    deck_name = await crud.get_deck_name(db=db, user_id=current_user.id, deck_id=deck_id)
+    if deck_name is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deck not found or not owned by user")
+    return StreamingResponse(
+        exporters.export_deck(deck_id, export_format),
+        media_type=exporters.MEDIA_TYPES[export_format.value],
+        headers={"Content-Disposition": exporters.content_disposition(deck_name, export_format.value)},
+    )
 
-    pydantic_deck = schemas.Deck.from_orm(db_deck)
-    for pydantic_deck_entry in pydantic_deck.deck_entries:
-        # Find the corresponding SQLAlchemy model for the card_definition
-        original_db_deck_entry = next((de for de in db_deck.deck_entries if de.id == pydantic_deck_entry.id), None)
-        if original_db_deck_entry and original_db_deck_entry.card_definition:
-            db_card_def = original_db_deck_entry.card_definition
-            if db_card_def.image_data_small:
-                pydantic_deck_entry.card_definition.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='small'))
-            if db_card_def.image_data_normal:
-                pydantic_deck_entry.card_definition.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='normal'))
-            if db_card_def.image_data_large:
-                pydantic_deck_entry.card_definition.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='large'))
-    return pydantic_deck
+@app.get("/decks/{deck_id}/validate", response_model=schemas.DeckValidationResult)
+async def validate_my_deck(
+    deck_id: int,
+    validate_format: Optional[str] = Query(None, alias="format", description="Check against this format instead of the deck's own"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Check a deck owned by the authenticated user against its format's rules and list every violation."""
+    validation = await deck_validation.validate_deck(db, current_user.id, deck_id, validate_format)
+    if validation is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deck not found or not owned by user")
+    return json_response(validation.model_dump())
+
+@app.get("/decks/{deck_id}/analytics", response_model=schemas.DeckAnalytics)
+async def read_deck_analytics(
+    request: Request,
+    deck_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Mana curve, pips, type counts, land/ramp counts and color identity check for a deck owned by the authenticated user."""
+    deck_version = await crud.get_deck_version(db=db, user_id=current_user.id, deck_id=deck_id)
+    if deck_version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deck not found or not owned by user")
+    etag = version_etag(request, current_user.id, deck_id, deck_version)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    analytics = await deck_analytics.get_deck_analytics(db, deck_id, deck_version)
+    return tagged_json_response(request, analytics.model_dump(), etag=etag)
 
 @app.put("/decks/{deck_id}", response_model=schemas.Deck)
 async def update_existing_deck(
@@ -463,18 +849,7 @@ async def update_existing_deck(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deck not found or not owned by user")
     updated_db_deck = await crud.update_deck(db=db, db_deck=db_deck, deck_update=deck_update)
 
-    pydantic_deck = schemas.Deck.from_orm(updated_db_deck)
-    for pydantic_deck_entry in pydantic_deck.deck_entries:
-        original_db_deck_entry = next((de for de in updated_db_deck.deck_entries if de.id == pydantic_deck_entry.id), None)
-        if original_db_deck_entry and original_db_deck_entry.card_definition:
-            db_card_def = original_db_deck_entry.card_definition
-            if db_card_def.image_data_small:
-                pydantic_deck_entry.card_definition.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='small'))
-            if db_card_def.image_data_normal:
-                pydantic_deck_entry.card_definition.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='normal'))
-            if db_card_def.image_data_large:
-                pydantic_deck_entry.card_definition.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='large'))
-    return pydantic_deck
+    return json_response(ResponseSerializer(request).deck(updated_db_deck))
 
 @app.delete("/decks/{deck_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_existing_deck(
@@ -505,22 +880,93 @@ async def add_card_to_specific_deck(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deck not found or not owned by user")
     try:
         db_deck_entry = await crud.add_card_to_deck(db=db, deck_model=deck_model, deck_entry_create=deck_entry_create)
-        pydantic_deck_entry = schemas.DeckEntry.from_orm(db_deck_entry)
-        if db_deck_entry.card_definition:
-            db_card_def = db_deck_entry.card_definition
-            if db_card_def.image_data_small:
-                pydantic_deck_entry.card_definition.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='small'))
-            if db_card_def.image_data_normal:
-                pydantic_deck_entry.card_definition.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='normal'))
-            if db_card_def.image_data_large:
-                pydantic_deck_entry.card_definition.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='large'))
-        return pydantic_deck_entry
+        return json_response(ResponseSerializer(request).deck_entry(db_deck_entry), status_code=status.HTTP_201_CREATED)
     except ValueError as e: # From crud if CardDefinition not found
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-# You would also add endpoints for:
-# - PUT /decks/{deck_id}/cards/{deck_entry_id} (Update card quantity/role in deck)
-# - DELETE /decks/{deck_id}/cards/{deck_entry_id} (Remove a card from a deck)
+@app.patch("/decks/{deck_id}/entries", response_model=schemas.DeckEntriesPatchResult)
+async def patch_deck_entries(
+    deck_id: int,
+    patch: schemas.DeckEntriesPatch,
+    request: Request, # Inject Request
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Apply a list of add / remove / set_quantity / set_commander / set_sideboard operations to
+    a deck atomically: if any operation is invalid nothing changes. Returns the created or
+    changed entries, the removed entry ids and the new deck version (pass it back as
+    expected_version to detect concurrent edits).
+    """
+    try:
+        outcome = await deck_operations.apply_deck_operations(db=db, user_id=current_user.id, deck_id=deck_id, patch=patch)
+    except deck_operations.DeckVersionConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if outcome is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deck not found or not owned by user")
+
+    serializer = ResponseSerializer(request, card_fields)
+    card_ids = sorted({row.card_definition_id for row in outcome.entries})
+    db_cards = await crud.get_card_definitions_by_ids(db=db, card_definition_ids=card_ids, card_columns=card_columns(card_fields)) if card_ids else []
+    cards_by_id = {db_card.id: db_card for db_card in db_cards}
+    entries = [
+        {**{name: getattr(row, name) for name in DECK_ENTRY_FIELDS}, "card_definition": serializer.optional_card(cards_by_id.get(row.card_definition_id))}
+        for row in sorted(outcome.entries, key=lambda row: row.id)
+    ]
+    return json_response({
+        "deck_id": outcome.deck_id, "version": outcome.version, "entries": entries, "removed_entry_ids": outcome.removed_entry_ids,
+    })
+
+# --- Delta Sync Endpoints ---
+@app.get("/sync/collection", response_model=schemas.CollectionSync)
+async def sync_my_collection(
+    request: Request,
+    since: int = Query(0, ge=0, description="Collection version from the previous sync; 0 for everything"),
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Collection entries added, changed or deleted since version `since`. Keep the returned
+    version and pass it as since= next time; reset=true means replace the local copy.
+    """
+    version = current_user.collection_version # Read before the rows, see app/sync.py
+    etag = version_etag(request, current_user.id, version)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    changes = await crud.get_collection_changes(db, current_user.id, since, version, card_columns=card_columns(card_fields))
+    serializer = ResponseSerializer(request, card_fields)
+    return tagged_json_response(request, {
+        "since": since, "version": version, "reset": changes.reset,
+        "entries": [serializer.collection_entry(db_entry) for db_entry in changes.entries],
+        "deleted_entry_ids": changes.deleted_entry_ids,
+    }, etag=etag)
+
+@app.get("/sync/decks", response_model=schemas.DeckSync)
+async def sync_my_decks(
+    request: Request,
+    since: int = Query(0, ge=0, description="Deck list version from the previous sync; 0 for everything"),
+    card_fields: Tuple[str, ...] = Depends(get_card_fields),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Decks and deck entries added, changed or deleted since deck list version `since`, like /sync/collection."""
+    version = current_user.deck_version
+    etag = version_etag(request, current_user.id, version)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    changes = await crud.get_deck_changes(db, current_user.id, since, version, card_columns=card_columns(card_fields))
+    serializer = ResponseSerializer(request, card_fields)
+    return tagged_json_response(request, {
+        "since": since, "version": version, "reset": changes.reset,
+        "decks": [serializer.deck_fields(db_deck) for db_deck in changes.decks],
+        "entries": [serializer.deck_entry(db_entry) for db_entry in changes.entries],
+        "deleted_deck_ids": changes.deleted_deck_ids,
+        "deleted_entry_ids": changes.deleted_entry_ids,
+    }, etag=etag)
 
 from app.api import meta
 app.include_router(meta.router, prefix="/api")
@@ -1,8 +1,8 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON, LargeBinary, Float, Date
+from sqlalchemy import Column, Integer, SmallInteger, BigInteger, String, Boolean, DateTime, ForeignKey, JSON, LargeBinary, Float, Date, Index, Numeric, UniqueConstraint
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB # For PostgreSQL specific types
-from sqlalchemy.sql import func # For server-side default timestamp
-from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func, literal_column, null # now() defaults, index expressions and onupdate=null() for change_version
+from sqlalchemy.orm import relationship, column_property, deferred
 from .database import Base
 
 class User(Base):
@@ -14,6 +14,9 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     date_joined = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped on every change to the user's collection / decks; used for ETags (see app/conditional.py)
+    collection_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    deck_version = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     collection_entries = relationship("UserCollectionEntry", back_populates="owner")
     decks = relationship("Deck", back_populates="owner")
@@ -76,27 +79,82 @@ class CardDefinition(Base): # Renamed from Card
     image_data_small = Column(LargeBinary, nullable=True)
     image_data_normal = Column(LargeBinary, nullable=True)
     image_data_large = Column(LargeBinary, nullable=True)
+    # Whether each image is stored, without loading the blob (used to build local image URLs)
+    has_image_small = column_property(image_data_small.isnot(None))
+    has_image_normal = column_property(image_data_normal.isnot(None))
+    has_image_large = column_property(image_data_large.isnot(None))
 
     date_added = Column(DateTime(timezone=True), server_default=func.now())
     date_updated = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
 
+    # The full and slim card views pre-encoded as JSON at ingest (see serializers.build_card_documents).
+    # json_version is NULL until the documents are (re)built; deferred so ordinary loads skip them.
+    json_full = deferred(Column(LargeBinary, nullable=True))
+    json_slim = deferred(Column(LargeBinary, nullable=True))
+    json_version = Column(Integer, nullable=True)
+
     collection_entries = relationship("UserCollectionEntry", back_populates="card_definition")
     deck_entries = relationship("DeckEntry", back_populates="card_definition")
+    features = relationship("CardFeatures", back_populates="card_definition", uselist=False)
+
+    __table_args__ = (
+        # Rows whose JSON documents need building (new or changed by populate_cards.py)
+        Index("ix_card_definitions_json_pending", "id", postgresql_where=json_version.is_(None)),
+        # Cheapest printing of a card name (crud.get_missing_cards_by_deck)
+        Index("ix_card_definitions_name_usd", name, prices.op("->>")(literal_column("'usd'")).cast(Numeric)),
+    )
+
+class CardFeatures(Base):
+    """Typed per-card values derived at ingest (see app/card_features.py) for fast filtering and analytics."""
+    __tablename__ = "card_features"
+
+    card_definition_id = Column(Integer, ForeignKey("card_definitions.id", ondelete="CASCADE"), primary_key=True)
+    # Colored pips in the front face's mana cost; hybrid/phyrexian symbols count for each color
+    pips_w = Column(SmallInteger, nullable=False, default=0)
+    pips_u = Column(SmallInteger, nullable=False, default=0)
+    pips_b = Column(SmallInteger, nullable=False, default=0)
+    pips_r = Column(SmallInteger, nullable=False, default=0)
+    pips_g = Column(SmallInteger, nullable=False, default=0)
+    pips_c = Column(SmallInteger, nullable=False, default=0)
+    color_mask = Column(SmallInteger, nullable=False, default=0) # W=1, U=2, B=4, R=8, G=16
+    color_identity_mask = Column(SmallInteger, nullable=False, default=0, index=True)
+    type_flags = Column(Integer, nullable=False, default=0, index=True) # card_features.TYPE_FLAGS bits, all faces
+    primary_type = Column(String, nullable=True, index=True) # Front face main type, e.g. "Creature"
+    is_land = Column(Boolean, nullable=False, default=False, index=True)
+    produces_mana = Column(Boolean, nullable=False, default=False, index=True)
+    is_ramp = Column(Boolean, nullable=False, default=False, index=True) # Non-land mana source or land search/extra land drop
+    front_face_cmc = Column(Float, nullable=True, index=True)
+    # Deck validation (see app/deck_validation.py); format bits are card_features.FORMAT_BITS
+    legal_mask = Column(Integer, nullable=False, default=0, server_default="0")
+    restricted_mask = Column(Integer, nullable=False, default=0, server_default="0")
+    unlimited_copies = Column(Boolean, nullable=False, default=False, server_default="false") # Basic lands, Relentless Rats...
+    copy_limit = Column(SmallInteger, nullable=True) # Own copy limit, e.g. 7 for Seven Dwarves
+    can_be_commander = Column(Boolean, nullable=False, default=False, server_default="false") # Legendary creature or says so
+    date_updated = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+
+    card_definition = relationship("CardDefinition", back_populates="features")
 
 class Deck(Base):
     __tablename__ = "decks"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     name = Column(String, nullable=False, index=True)
     description = Column(String, nullable=True)
     format = Column(String, nullable=True) # e.g., "Commander", "Standard", "Modern"
     date_created = Column(DateTime(timezone=True), server_default=func.now())
     date_updated = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    version = Column(BigInteger, nullable=False, default=0, server_default="0") # Bumped on any change to the deck or its entries
+    # Owner's deck_version at the last change; NULL until the write's version bump stamps it (see app/sync.py)
+    change_version = Column(BigInteger, nullable=True, onupdate=null())
 
     owner = relationship("User", back_populates="decks")
     deck_entries = relationship("DeckEntry", back_populates="deck", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_decks_user_id_change_version", "user_id", "change_version"),
+    )
+
 class DeckEntry(Base):
     __tablename__ = "deck_entries"
 
@@ -105,11 +163,19 @@ class DeckEntry(Base):
     card_definition_id = Column(Integer, ForeignKey("card_definitions.id"), nullable=False)
     quantity = Column(Integer, default=1, nullable=False)
     is_commander = Column(Boolean, default=False)
-    is_sideboard = Column(Boolean, default=False)
+    is_sideboard = Column(Boolean, default=False, nullable=False, server_default="false")
+    change_version = Column(BigInteger, nullable=True, onupdate=null()) # Owner's deck_version at the last change, like Deck's
 
     deck = relationship("Deck", back_populates="deck_entries")
     card_definition = relationship("CardDefinition", back_populates="deck_entries")
 
+    __table_args__ = (
+        Index("ix_deck_entries_card_definition_id_deck_id", "card_definition_id", "deck_id"),
+        # One entry per card and board; the conflict target of add_card_to_deck's upsert
+        UniqueConstraint("deck_id", "card_definition_id", "is_sideboard", name="uq_deck_entries_deck_id_card_definition_id_is_sideboard"),
+        Index("ix_deck_entries_deck_id_change_version", "deck_id", "change_version"),
+    )
+
 class UserCollectionEntry(Base):
     __tablename__ = "user_collection_entries"
 
@@ -124,10 +190,81 @@ class UserCollectionEntry(Base):
     notes = Column(String, nullable=True)
     date_added_to_collection = Column(DateTime(timezone=True), server_default=func.now())
     date_updated_in_collection = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    # Owner's collection_version at the last change; NULL until the write's version bump stamps it (see app/sync.py)
+    change_version = Column(BigInteger, nullable=True, onupdate=null())
 
     owner = relationship("User", back_populates="collection_entries")
     card_definition = relationship("CardDefinition", back_populates="collection_entries")
 
+    __table_args__ = (
+        # One entry per card; the conflict target of add_card_to_collection's upsert
+        UniqueConstraint("user_id", "card_definition_id", name="uq_user_collection_entries_user_id_card_definition_id"),
+        Index("ix_user_collection_entries_user_id_change_version", "user_id", "change_version"),
+    )
+
+class CardPriceHistory(Base):
+    """
+    A printing's prices on one day, in integer cents (see app/value_history.py). Range-partitioned
+    by year; value_history.ensure_partition creates each year's partition.
+    """
+    __tablename__ = "card_price_history"
+
+    card_definition_id = Column(Integer, ForeignKey("card_definitions.id", ondelete="CASCADE"), primary_key=True)
+    price_date = Column(Date, primary_key=True)
+    usd_cents = Column(Integer, nullable=True) # NULL: no price that day
+    usd_foil_cents = Column(Integer, nullable=True)
+    eur_cents = Column(Integer, nullable=True)
+    eur_foil_cents = Column(Integer, nullable=True)
+
+    __table_args__ = {"postgresql_partition_by": "RANGE (price_date)"}
+
+class UserCollectionValueHistory(Base):
+    """A user's collection valued at one day's prices, in cents; the primary key serves the chart's range scan."""
+    __tablename__ = "user_collection_value_history"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    value_date = Column(Date, primary_key=True)
+    value_usd_cents = Column(BigInteger, nullable=False, default=0)
+    value_eur_cents = Column(BigInteger, nullable=False, default=0)
+
+class UserImportProgress(Base):
+    """A user's running (or last) collection CSV import's progress, written outside the import's transaction (see app/collection_import.py)."""
+    __tablename__ = "user_import_progress"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    progress = Column(JSONB, nullable=False) # schemas.CollectionImportProgress
+    date_updated = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class SyncTombstone(Base):
+    """A deleted collection entry, deck or deck entry, kept so delta sync can report it (see app/sync.py)."""
+    __tablename__ = "sync_tombstones"
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    entity = Column(String, nullable=False) # collection_entry, deck or deck_entry
+    entity_id = Column(Integer, nullable=False)
+    change_version = Column(BigInteger, nullable=True) # Version of the deletion, stamped like the rows'
+    date_deleted = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_id_change_version", "user_id", "change_version"),
+    )
+
+class UserCollectionSummary(Base):
+    """Per-user collection totals, adjusted by every collection write (see app/collection_summary.py)."""
+    __tablename__ = "user_collection_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    quantity_normal = Column(BigInteger, nullable=False, default=0)
+    quantity_foil = Column(BigInteger, nullable=False, default=0)
+    unique_printings = Column(Integer, nullable=False, default=0) # Collection entries (one per printing)
+    # Current card prices times quantity; recomputed for everyone after a price refresh
+    value_usd_normal = Column(Numeric(14, 2), nullable=False, default=0)
+    value_usd_foil = Column(Numeric(14, 2), nullable=False, default=0)
+    value_eur_normal = Column(Numeric(14, 2), nullable=False, default=0)
+    value_eur_foil = Column(Numeric(14, 2), nullable=False, default=0)
+    date_updated = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+
 class MetaTournament(Base):
     __tablename__ = "meta_tournaments"
     id = Column(Integer, primary_key=True, index=True)
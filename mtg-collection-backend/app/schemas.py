@@ -1,7 +1,10 @@
 # app/schemas.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List, Dict # Ensure List and Dict are imported
-from datetime import datetime
+from datetime import date, datetime
+from enum import Enum
+
+MAX_ENTRY_QUANTITY = 10_000 # Copies per collection or deck entry; keeps quantities and their sums far inside int4
 
 # --- Card Definition Schemas ---
 # (Represents the general information about a card, not a user's specific copy)
@@ -40,12 +43,76 @@ class CardDefinition(CardDefinitionBase): # For returning a card definition
     class Config:
         from_attributes = True # Changed from orm_mode = True for Pydantic v2
 
+class CardOwnership(BaseModel): # The caller's copies of one printing
+    quantity_normal: int = 0
+    quantity_foil: int = 0
+    deck_quantity: int = 0 # Copies used across all of the caller's decks
+    deck_count: int = 0 # Number of the caller's decks using this printing
+
+class CardDefinitionWithOwnership(CardDefinition):
+    owned: Optional[CardOwnership] = None # Only set when the caller asked for it
+
+class CardDefinitionCollapsed(CardDefinition): # One representative printing per card name
+    printing_count: int = 1
+    newest_printing_id: Optional[int] = None # Same as id; the representative is the newest printing
+    cheapest_printing_id: Optional[int] = None # Printing with the lowest USD price, if any are priced
+
+class CardDefinitionSimilar(CardDefinition): # Newest printing of a card similar to the requested one
+    similarity: float = 0.0 # Cosine similarity of rules text and type line, 0..1
+
+class CardDefinitionBatchRequest(BaseModel):
+    ids: List[int] = Field(default=[], max_length=500)
+    scryfall_ids: List[str] = Field(default=[], max_length=500)
+
+    @model_validator(mode="after")
+    def _check_not_empty(self):
+        if not self.ids and not self.scryfall_ids:
+            raise ValueError("Give ids and/or scryfall_ids")
+        return self
+
+class CardDefinitionBatchResult(BaseModel):
+    cards: List[CardDefinition] # Requested ids first, then scryfall_ids, each in request order
+    missing_ids: List[int] = []
+    missing_scryfall_ids: List[str] = []
+
+# --- Card Name Resolution Schemas ---
+# (Used to turn typed names from decklists and CSV imports into printings in bulk)
+
+class CardResolveLine(BaseModel):
+    name: str = Field(..., min_length=1)
+    set_code: Optional[str] = None # Optional hint, e.g. "cmr"
+    collector_number: Optional[str] = None # Only used together with set_code
+
+class CardResolveRequest(BaseModel):
+    lines: List[CardResolveLine] = Field(..., max_length=2000)
+
+class ResolveStatus(str, Enum):
+    exact = "exact"         # Matched a card name (or the front face of one)
+    fuzzy = "fuzzy"         # No exact match; closest name by trigram similarity
+    ambiguous = "ambiguous" # Several different cards match; see candidates
+    not_found = "not_found"
+
+class ResolvedPrinting(BaseModel):
+    id: int
+    scryfall_id: str
+    name: str
+    set_code: Optional[str] = None
+    collector_number: Optional[str] = None
+
+class CardResolveResult(BaseModel):
+    index: int # Position of the line in the request
+    input_name: str
+    status: ResolveStatus
+    card: Optional[ResolvedPrinting] = None # The chosen printing
+    candidates: List[str] = [] # Card names considered for fuzzy/ambiguous matches
+    note: Optional[str] = None # e.g. when a set/collector number hint could not be honoured
+
 # --- User Collection Entry Schemas ---
 # (Represents a specific card instance in a user's collection)
 
 class UserCollectionEntryBase(BaseModel):
-    quantity_normal: int = Field(default=0, ge=0)
-    quantity_foil: int = Field(default=0, ge=0)
+    quantity_normal: int = Field(default=0, ge=0, le=MAX_ENTRY_QUANTITY)
+    quantity_foil: int = Field(default=0, ge=0, le=MAX_ENTRY_QUANTITY)
     condition: Optional[str] = None
     language: Optional[str] = Field(default="en")
     notes: Optional[str] = None
@@ -55,8 +122,8 @@ class UserCollectionEntryCreate(UserCollectionEntryBase):
     # quantity_normal and quantity_foil will use defaults if not provided
 
 class UserCollectionEntryUpdate(BaseModel): # More specific for updates
-    quantity_normal: Optional[int] = Field(default=None, ge=0)
-    quantity_foil: Optional[int] = Field(default=None, ge=0)
+    quantity_normal: Optional[int] = Field(default=None, ge=0, le=MAX_ENTRY_QUANTITY)
+    quantity_foil: Optional[int] = Field(default=None, ge=0, le=MAX_ENTRY_QUANTITY)
     condition: Optional[str] = None
     language: Optional[str] = None
     notes: Optional[str] = None
@@ -72,6 +139,124 @@ class UserCollectionEntry(UserCollectionEntryBase): # For returning a collection
     class Config:
         from_attributes = True
 
+# --- Batch collection changes ---
+
+class CollectionBatchAction(str, Enum):
+    add = "add"       # Add the quantities to the entry, creating it if needed
+    set = "set"       # Set the quantities; an entry set to 0/0 is deleted
+    remove = "remove" # Subtract the quantities (down to 0); with no quantities, delete the entry
+
+class CollectionBatchOperation(BaseModel):
+    action: CollectionBatchAction = CollectionBatchAction.add
+    # Identify the card by Scryfall ID, or by name (optionally with set code / collector number)
+    card_definition_scryfall_id: Optional[str] = None
+    name: Optional[str] = None
+    set_code: Optional[str] = None
+    collector_number: Optional[str] = None
+    quantity_normal: int = Field(default=0, ge=0, le=MAX_ENTRY_QUANTITY)
+    quantity_foil: int = Field(default=0, ge=0, le=MAX_ENTRY_QUANTITY)
+    condition: Optional[str] = None
+    language: Optional[str] = None
+    notes: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _check_card_reference(self):
+        if not self.card_definition_scryfall_id and not (self.name and self.name.strip()):
+            raise ValueError("Either card_definition_scryfall_id or name is required")
+        return self
+
+class CollectionBatchRequest(BaseModel):
+    operations: List[CollectionBatchOperation] = Field(..., max_length=1000)
+
+class CollectionBatchStatus(str, Enum):
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+    unchanged = "unchanged"   # e.g. removing a card that isn't in the collection
+    not_found = "not_found"   # The card could not be resolved; nothing was changed
+
+class CollectionBatchItemResult(BaseModel):
+    index: int # Position of the operation in the request
+    status: CollectionBatchStatus
+    card_definition_id: Optional[int] = None
+    scryfall_id: Optional[str] = None
+    collection_entry_id: Optional[int] = None # None once the entry is deleted
+    quantity_normal: int = 0 # Quantities after this operation
+    quantity_foil: int = 0
+    detail: Optional[str] = None
+
+class CollectionBatchResult(BaseModel):
+    results: List[CollectionBatchItemResult]
+    collection_version: int
+
+# --- Collection summary ---
+class CollectionSummary(BaseModel):
+    total_quantity: int = 0
+    quantity_normal: int = 0
+    quantity_foil: int = 0
+    unique_printings: int = 0 # Collection entries, one per printing
+    # Copies times current Scryfall prices; foils are valued at the foil price
+    value_usd: float = 0.0
+    value_usd_normal: float = 0.0
+    value_usd_foil: float = 0.0
+    value_eur: float = 0.0
+    value_eur_normal: float = 0.0
+    value_eur_foil: float = 0.0
+    date_updated: Optional[datetime] = None
+
+# --- Collection value history ---
+class CollectionValuePoint(BaseModel):
+    date: date
+    value_usd: float = 0.0 # At that day's prices; foils at the foil price
+    value_eur: float = 0.0
+
+# --- Collection statistics ---
+class CollectionStatsBucket(BaseModel):
+    key: str # Color identity ("WU", "C" for colorless), rarity, set code, type or mana value
+    copies: int = 0
+    entries: int = 0
+
+class CollectionStats(BaseModel):
+    collection_version: int
+    total_copies: int = 0
+    total_entries: int = 0
+    color_identity: List[CollectionStatsBucket] = []
+    rarity: List[CollectionStatsBucket] = []
+    set_code: List[CollectionStatsBucket] = []
+    type: List[CollectionStatsBucket] = [] # Front face primary type
+    cmc: List[CollectionStatsBucket] = [] # Nonland cards by front face mana value, 7 meaning 7+
+
+# --- CSV collection import ---
+
+class CollectionImportFormat(str, Enum):
+    auto = "auto"           # Detect from the header row
+    native = "native"       # This API's own /collection/export?format=csv
+    moxfield = "moxfield"
+    deckbox = "deckbox"
+    tcgplayer = "tcgplayer"
+    manabox = "manabox"
+
+class CollectionImportUnresolvedRow(BaseModel):
+    row: int # 1-based line number in the file, header included
+    name: Optional[str] = None
+    set_code: Optional[str] = None
+    collector_number: Optional[str] = None
+    reason: str
+
+class CollectionImportProgress(BaseModel):
+    format: CollectionImportFormat
+    rows_read: int = 0
+    rows_imported: int = 0
+    unresolved_count: int = 0
+    done: bool = False
+
+class CollectionImportReport(CollectionImportProgress):
+    cards_created: int = 0
+    cards_updated: int = 0
+    quantity_imported: int = 0 # Normal + foil copies added
+    unresolved: List[CollectionImportUnresolvedRow] = [] # The first unresolved rows; see unresolved_count
+    collection_version: int = 0
+
 # Schemas for User Authentication
 class UserBase(BaseModel):
     username: str
@@ -96,7 +281,7 @@ class TokenData(BaseModel):
 
 # --- Deck Schemas ---
 class DeckEntryBase(BaseModel):
-    quantity: int = Field(default=1, ge=1)
+    quantity: int = Field(default=1, ge=1, le=MAX_ENTRY_QUANTITY)
     is_commander: bool = False
     is_sideboard: bool = False
 
@@ -104,7 +289,7 @@ class DeckEntryCreate(DeckEntryBase):
     card_definition_scryfall_id: str # To identify the card to add
 
 class DeckEntryUpdate(BaseModel):
-    quantity: Optional[int] = Field(default=None, ge=0) # Allow setting to 0 to remove, or handle removal separately
+    quantity: Optional[int] = Field(default=None, ge=0, le=MAX_ENTRY_QUANTITY) # Allow setting to 0 to remove, or handle removal separately
     is_commander: Optional[bool] = None
     is_sideboard: Optional[bool] = None
 
@@ -116,6 +301,47 @@ class DeckEntry(DeckEntryBase): # For returning a deck entry
     class Config:
         from_attributes = True
 
+class DeckEntryAction(str, Enum):
+    add = "add"                   # Add copies of a card, merging with its entry in the same board
+    remove = "remove"             # Remove `quantity` copies, or the whole entry without a quantity
+    set_quantity = "set_quantity" # 0 removes the entry
+    set_commander = "set_commander"
+    set_sideboard = "set_sideboard" # Moving onto a board that already has the card merges the entries
+
+class DeckEntryOperation(BaseModel):
+    action: DeckEntryAction
+    entry_id: Optional[int] = None # Target an existing entry...
+    card_definition_scryfall_id: Optional[str] = None # ...or a card (required for add)
+    quantity: Optional[int] = Field(default=None, ge=0, le=MAX_ENTRY_QUANTITY)
+    is_commander: Optional[bool] = None
+    is_sideboard: Optional[bool] = None # For add, and to pick the board when targeting by card (set_sideboard: the board to move to)
+
+    @model_validator(mode="after")
+    def _check_operation(self):
+        if self.action == DeckEntryAction.add and not self.card_definition_scryfall_id:
+            raise ValueError("add needs card_definition_scryfall_id")
+        if self.entry_id is None and not self.card_definition_scryfall_id:
+            raise ValueError("Either entry_id or card_definition_scryfall_id is required")
+        if self.action == DeckEntryAction.remove and self.quantity == 0:
+            raise ValueError("remove needs a quantity of at least 1 (omit it to remove the whole entry)")
+        if self.action == DeckEntryAction.set_quantity and self.quantity is None:
+            raise ValueError("set_quantity needs quantity")
+        if self.action == DeckEntryAction.set_commander and self.is_commander is None:
+            raise ValueError("set_commander needs is_commander")
+        if self.action == DeckEntryAction.set_sideboard and self.is_sideboard is None:
+            raise ValueError("set_sideboard needs is_sideboard")
+        return self
+
+class DeckEntriesPatch(BaseModel):
+    operations: List[DeckEntryOperation] = Field(..., min_length=1, max_length=500)
+    expected_version: Optional[int] = None # Fail with 409 if the deck changed since this version
+
+class DeckEntriesPatchResult(BaseModel):
+    deck_id: int
+    version: int
+    entries: List[DeckEntry] = [] # Entries created or changed by the operations
+    removed_entry_ids: List[int] = []
+
 class DeckBase(BaseModel):
     name: str
     description: Optional[str] = None
@@ -138,3 +364,108 @@ class Deck(DeckBase): # For returning a deck
 
     class Config:
         from_attributes = True
+
+# --- Deck validation ---
+class DeckViolation(BaseModel):
+    rule: str # illegal_card, too_many_copies, deck_size, sideboard_size, commander, color_identity or format
+    message: str
+    card_definition_id: Optional[int] = None
+    card_name: Optional[str] = None
+
+class DeckValidationResult(BaseModel):
+    format: Optional[str] = None # Nothing is checked without a format
+    valid: bool = True
+    main_count: int = 0 # Commanders included
+    sideboard_count: int = 0
+    violations: List[DeckViolation] = []
+
+class DeckImportRequest(DeckBase):
+    text: str = Field(..., max_length=200_000) # MTGO, Arena or Moxfield decklist text
+    skip_invalid: bool = False # Create the deck without unreadable, unresolved or illegal lines instead of failing
+
+class DeckImportProblem(BaseModel):
+    line: int # 1-based line number in the text
+    text: str
+    reason: str
+    candidates: List[str] = [] # Card names considered for fuzzy/ambiguous matches
+
+class DeckImportResult(BaseModel):
+    deck: Deck
+    problems: List[DeckImportProblem] = [] # Lines left out (only with skip_invalid)
+    validation: Optional[DeckValidationResult] = None # The imported deck checked against its format
+
+class DeckSummary(DeckBase): # Deck list item; counts are aggregated in SQL, entries are not loaded
+    id: int
+    user_id: int
+    date_created: datetime
+    date_updated: Optional[datetime] = None
+    card_count: int = 0 # Main deck cards, counting quantities
+    sideboard_count: int = 0
+    entry_count: int = 0 # Distinct entries (printings) in the deck
+    commanders: List[str] = [] # Commander card names
+    color_identity: List[str] = [] # Union of all cards' color identities, WUBRG order
+
+    class Config:
+        from_attributes = True
+
+# --- Missing cards ---
+class MissingCard(BaseModel):
+    name: str
+    needed: int # Copies the deck uses, any printing
+    owned: int # Copies in the collection, any printing
+    short: int
+    cheapest_printing_id: Optional[int] = None # Lowest USD price among all printings; None if none is priced
+    unit_price_usd: Optional[float] = None
+    cost_usd: Optional[float] = None # short * unit_price_usd
+
+class DeckMissingCards(BaseModel):
+    deck_id: int
+    deck_name: str
+    missing: List[MissingCard] = []
+    total_short: int = 0
+    estimated_cost_usd: float = 0.0 # Priced cards only
+    unpriced_cards: int = 0 # Missing names with no USD price on any printing
+
+# --- Delta sync ---
+class CollectionSync(BaseModel):
+    since: int
+    version: int # The collection version this brings the client to; pass it as since= next time
+    reset: bool = False # since was 0 or unknown: everything is listed and the local copy should be replaced
+    entries: List[UserCollectionEntry] = [] # Added or changed
+    deleted_entry_ids: List[int] = []
+
+class DeckSyncDeck(DeckBase): # A deck's own fields; its entries are listed separately
+    id: int
+    user_id: int
+    date_created: datetime
+    date_updated: Optional[datetime] = None
+
+class DeckSync(BaseModel):
+    since: int
+    version: int # The user's deck list version
+    reset: bool = False
+    decks: List[DeckSyncDeck] = [] # Created or changed, including decks whose entries changed
+    entries: List[DeckEntry] = [] # Added or changed, with their deck_id
+    deleted_deck_ids: List[int] = [] # Their entries are gone too
+    deleted_entry_ids: List[int] = []
+
+# --- Deck analytics ---
+class DeckAnalyticsCard(BaseModel):
+    card_definition_id: int
+    name: str
+    color_identity: str # e.g. "UG", "C" for colorless
+
+class DeckAnalytics(BaseModel): # Main deck and commanders; sideboards are not counted
+    version: Optional[int] = None # Deck version the figures were computed at (user decks only)
+    total_cards: int = 0
+    land_count: int = 0
+    nonland_count: int = 0
+    ramp_count: int = 0 # Nonland mana sources and land search
+    land_ratio: float = 0.0
+    average_cmc: float = 0.0 # Nonland cards, front face
+    mana_curve: List[int] = [] # Nonland cards by mana value 0..7, the last bucket being 7+
+    pips: Dict[str, int] = {} # Colored (and {C}) mana symbols in mana costs, W U B R G C
+    types: Dict[str, int] = {} # Cards having each type/supertype; a card can count for several
+    color_identity: str = "C" # The commanders' identity, or the whole deck's without a commander
+    off_identity_cards: List[DeckAnalyticsCard] = [] # Cards outside the commanders' identity
+    unresolved_cards: List[str] = [] # Meta deck card names not found in the catalog
@@ -0,0 +1,246 @@
+# app/serializers.py
+"""
+Shared JSON serialization for cards, collection entries and decks.
+
+Endpoints used to build every response with `schemas.X.from_orm`, then up to three
+`request.url_for` route lookups per card, and FastAPI then validated the result again
+against `response_model`. Instead, `ResponseSerializer` turns ORM objects straight into
+plain dicts (with the same keys as the schemas) and `json_response` encodes them once
+with orjson. Returning a Response skips FastAPI's response_model validation; the
+response_model on each route still documents the shape in OpenAPI.
+
+Local image URLs are built from a per-base-URL template: the image route is resolved
+once with a placeholder scryfall_id, and every card just splices its id in.
+
+List endpoints can ask for a subset of card fields (`view=slim` or `fields=...`);
+`card_columns` turns that selection into the load_only() column list for the query,
+so unused columns are never selected either.
+
+The full and slim views are also stored pre-encoded per printing (card_definitions.json_full
+and json_slim, built by `build_card_documents` at ingest). When every stored document is
+current, `card_columns` loads just those bytes for the two views and `ResponseSerializer.card`
+splices them into the response as an orjson.Fragment, adding the request-dependent image
+URLs and any extra keys, instead of encoding each field again. Every card write must rebuild
+the row's documents (crud.refresh_card_documents) before it commits: a row loaded that way
+has no columns to fall back on, so a missing or stale document raises StaleCardDocumentError.
+"""
+import zlib
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+from . import models, schemas
+
+IMAGE_ROUTE_NAME = "get_card_image_data"
+IMAGE_SIZES = ("small", "normal", "large")
+_SCRYFALL_ID_PLACEHOLDER = "00000000-scryfall-id-placeholder"
+_MAX_CACHED_BASE_URLS = 16 # Base URLs come from the Host header; don't let the cache grow unbounded
+
+# Keys are taken from the schemas so the JSON shape stays in sync with response_model.
+_LOCAL_IMAGE_FIELDS = {f"local_image_url_{size}" for size in IMAGE_SIZES}
+COLLECTION_ENTRY_FIELDS: Tuple[str, ...] = tuple(name for name in schemas.UserCollectionEntry.model_fields if name != "card_definition")
+DECK_ENTRY_FIELDS: Tuple[str, ...] = tuple(name for name in schemas.DeckEntry.model_fields if name != "card_definition")
+DECK_FIELDS: Tuple[str, ...] = tuple(name for name in schemas.Deck.model_fields if name != "deck_entries")
+
+FULL_CARD_FIELDS: Tuple[str, ...] = tuple(schemas.CardDefinition.model_fields)
+# What collection and deck grids need to draw a card tile
+SLIM_CARD_FIELDS: Tuple[str, ...] = ("id", "scryfall_id", "name", "set_code", "collector_number", "image_uri_small", "local_image_url_small")
+# Not part of the full view, but can be requested with fields=
+OPTIONAL_CARD_FIELDS: Tuple[str, ...] = ("prices", "mana_cost", "cmc", "rarity", "color_identity")
+SELECTABLE_CARD_FIELDS = frozenset(FULL_CARD_FIELDS + OPTIONAL_CARD_FIELDS)
+
+# Stored documents hold everything but the local image URLs, which depend on the request's base URL
+_DOCUMENT_FIELDS = {
+    "json_full": tuple(name for name in FULL_CARD_FIELDS if name not in _LOCAL_IMAGE_FIELDS),
+    "json_slim": tuple(name for name in SLIM_CARD_FIELDS if name not in _LOCAL_IMAGE_FIELDS),
+}
+# Stamped on every stored document; changes whenever the field lists above do
+CARD_DOCUMENT_VERSION = zlib.crc32(repr(sorted(_DOCUMENT_FIELDS.items())).encode()) & 0x7FFFFFFF
+_card_documents_enabled = False
+
+
+class StaleCardDocumentError(RuntimeError):
+    """A query loaded only the stored document (see card_columns), but the row's document is missing or stale."""
+
+
+class CardView(str, Enum):
+    slim = "slim"
+    full = "full"
+
+
+def select_card_fields(view: CardView = CardView.full, fields: Optional[str] = None) -> Tuple[str, ...]:
+    """
+    Card fields to return: a comma-separated `fields` list if given, otherwise the view's fields.
+    "id" is always included. Raises ValueError for unknown field names.
+    """
+    if not fields:
+        return SLIM_CARD_FIELDS if view == CardView.slim else FULL_CARD_FIELDS
+    selected = ["id"]
+    for name in (part.strip() for part in fields.split(",")):
+        if not name or name in selected:
+            continue
+        if name not in SELECTABLE_CARD_FIELDS:
+            raise ValueError(f"Unknown card field '{name}'. Choose from: {', '.join(sorted(SELECTABLE_CARD_FIELDS))}.")
+        selected.append(name)
+    return tuple(selected)
+
+
+def enable_card_documents(enabled: bool) -> None:
+    """Serve the full and slim views from the stored documents (only once all of them are current)."""
+    global _card_documents_enabled
+    _card_documents_enabled = enabled
+
+
+def card_documents_enabled() -> bool:
+    return _card_documents_enabled
+
+
+def _document_column(card_fields: Iterable[str]) -> Optional[str]:
+    if card_fields == FULL_CARD_FIELDS:
+        return "json_full"
+    if card_fields == SLIM_CARD_FIELDS:
+        return "json_slim"
+    return None
+
+
+def build_card_documents(db_card) -> Dict[str, bytes]:
+    """{"json_full": ..., "json_slim": ...}: the card's stored views, encoded like json_response."""
+    return {
+        column: orjson.dumps({name: getattr(db_card, name) for name in fields}, option=orjson.OPT_NON_STR_KEYS)
+        for column, fields in _DOCUMENT_FIELDS.items()
+    }
+
+
+def card_columns(card_fields: Iterable[str]) -> List[Any]:
+    """CardDefinition attributes to load (for load_only) to serialize `card_fields`."""
+    document_column = _document_column(card_fields) if _card_documents_enabled else None
+    if document_column:
+        card_fields = ("scryfall_id", *(name for name in card_fields if name in _LOCAL_IMAGE_FIELDS))
+        columns = [getattr(models.CardDefinition, document_column), models.CardDefinition.json_version]
+    else:
+        columns = []
+    for name in card_fields:
+        if name in _LOCAL_IMAGE_FIELDS:
+            # The URL needs the scryfall_id and whether the image is stored, not the blob
+            columns += [models.CardDefinition.scryfall_id, getattr(models.CardDefinition, name.replace("local_image_url_", "has_image_"))]
+        else:
+            columns.append(getattr(models.CardDefinition, name))
+    return list(dict.fromkeys(columns))
+
+_image_url_templates: Dict[str, Dict[str, Tuple[str, str]]] = {}
+
+
+def _image_url_template(request: Request) -> Dict[str, Tuple[str, str]]:
+    """{size: (prefix, suffix)} such that prefix + scryfall_id + suffix is the card's image URL."""
+    base_url = str(request.base_url)
+    template = _image_url_templates.get(base_url)
+    if template is None:
+        template = {}
+        for size in IMAGE_SIZES:
+            url = str(request.url_for(IMAGE_ROUTE_NAME, scryfall_id=_SCRYFALL_ID_PLACEHOLDER, size=size))
+            prefix, suffix = url.split(_SCRYFALL_ID_PLACEHOLDER)
+            template[size] = (prefix, suffix)
+        if len(_image_url_templates) >= _MAX_CACHED_BASE_URLS:
+            _image_url_templates.clear()
+        _image_url_templates[base_url] = template
+    return template
+
+
+class ResponseSerializer:
+    """Builds response dicts for one request. Create one per request and reuse it for every item."""
+
+    def __init__(self, request: Request, card_fields: Tuple[str, ...] = FULL_CARD_FIELDS):
+        self.image_urls = _image_url_template(request)
+        self.card_attributes = tuple(name for name in card_fields if name not in _LOCAL_IMAGE_FIELDS)
+        self.image_sizes = tuple(size for size in IMAGE_SIZES if f"local_image_url_{size}" in card_fields)
+        self.document_column = _document_column(card_fields)
+        if self.document_column:
+            # Pre-encoded pieces of each image URL key, so splicing a document needs no encoding per card
+            self.image_url_json = {
+                size: (
+                    f',"local_image_url_{size}":'.encode() + orjson.dumps(self.image_urls[size][0])[:-1],
+                    orjson.dumps(self.image_urls[size][1])[1:],
+                    f',"local_image_url_{size}":null'.encode(),
+                )
+                for size in self.image_sizes
+            }
+
+    def _image_url(self, db_card, size: str) -> Optional[str]:
+        # has_image_* are SQL expressions, so the image blobs themselves are never loaded
+        if getattr(db_card, f"has_image_{size}"):
+            prefix, suffix = self.image_urls[size]
+            return prefix + db_card.scryfall_id + suffix
+        return None
+
+    def card(self, db_card, **extra: Any) -> Union[Dict[str, Any], orjson.Fragment]:
+        """
+        A CardDefinition as a dict with the selected schemas.CardDefinition keys (all of them
+        by default), plus any `extra` keys. If the query loaded a current stored document for
+        the view, the same JSON is returned as an orjson.Fragment instead.
+        """
+        if self.document_column:
+            loaded = db_card.__dict__ # Only use documents the query loaded; never trigger a lazy load
+            document = loaded.get(self.document_column)
+            if document is not None and loaded.get("json_version") == CARD_DOCUMENT_VERSION:
+                return self._card_fragment(db_card, document, extra)
+            if self.document_column in loaded and any(name not in loaded for name in self.card_attributes):
+                # card_columns loaded just the document; reading the columns would need a lazy load
+                raise StaleCardDocumentError(
+                    f"Card {loaded.get('id')} has no current {self.document_column} document (version {loaded.get('json_version')}, "
+                    f"expected {CARD_DOCUMENT_VERSION}); every card write must call crud.refresh_card_documents. "
+                    "Run scripts/refresh_card_documents.py and restart the API."
+                )
+        data = {name: getattr(db_card, name) for name in self.card_attributes}
+        for size in self.image_sizes:
+            data[f"local_image_url_{size}"] = self._image_url(db_card, size)
+        if extra:
+            data.update(extra)
+        return data
+
+    def _card_fragment(self, db_card, document: bytes, extra: Dict[str, Any]) -> orjson.Fragment:
+        # The document is a JSON object: drop its closing brace and append the remaining keys
+        if not self.image_sizes and not extra:
+            return orjson.Fragment(document)
+        parts = [document[:-1]]
+        for size in self.image_sizes:
+            prefix, suffix, null = self.image_url_json[size]
+            parts += (prefix, db_card.scryfall_id.encode(), suffix) if getattr(db_card, f"has_image_{size}") else (null,)
+        if extra:
+            parts += (b",", orjson.dumps(extra, option=orjson.OPT_NON_STR_KEYS)[1:-1])
+        parts.append(b"}")
+        return orjson.Fragment(b"".join(parts))
+
+    def optional_card(self, db_card) -> Optional[Union[Dict[str, Any], orjson.Fragment]]:
+        return self.card(db_card) if db_card is not None else None
+
+    def collection_entry(self, db_entry) -> Dict[str, Any]:
+        data = {name: getattr(db_entry, name) for name in COLLECTION_ENTRY_FIELDS}
+        data["card_definition"] = self.optional_card(db_entry.card_definition)
+        return data
+
+    def deck_entry(self, db_entry) -> Dict[str, Any]:
+        data = {name: getattr(db_entry, name) for name in DECK_ENTRY_FIELDS}
+        data["card_definition"] = self.optional_card(db_entry.card_definition)
+        return data
+
+    def deck_fields(self, db_deck) -> Dict[str, Any]:
+        """The deck without its entries."""
+        return {name: getattr(db_deck, name) for name in DECK_FIELDS}
+
+    def deck(self, db_deck) -> Dict[str, Any]:
+        data = self.deck_fields(db_deck)
+        data["deck_entries"] = [self.deck_entry(db_entry) for db_entry in db_deck.deck_entries]
+        return data
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Encode `content` (dicts/lists of plain values, datetimes and card Fragments included) with orjson."""
+    return Response(
+        content=orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
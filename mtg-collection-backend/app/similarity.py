@@ -0,0 +1,207 @@
+# app/similarity.py
+"""
+"Cards like this" search: TF-IDF over hashed word n-grams of each card's rules text and type line.
+
+`build_similarity_index` (run after ingest by populate_cards.py, or via
+scripts/build_similarity_index.py) keeps one row per card name (its newest printing), turns
+oracle text + type line into L2-normalized sparse TF-IDF vectors and stores them twice:
+row-wise (CSR) to fetch a query card's terms, and term-wise (inverted postings) to score
+every other card against them with a single np.bincount. Stored with app.index_store, so
+workers memory-map the same files the way they do for the card index.
+"""
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import card_features, index_store, models
+from .core.config import settings
+
+INDEX_FORMAT_VERSION = 1
+HASH_BUCKETS = 1 << 20 # Hashed feature space; collisions are rare at this size
+MAX_DOCUMENT_FREQUENCY = 0.3 # Terms in more than this share of cards carry no signal and are dropped
+SELF_REFERENCE = "cardname" # Replaces the card's own name so "When X enters" matches across cards
+
+_TOKEN_RE = re.compile(r"\{[^}]+\}|[a-z0-9+\-/']+")
+_REMINDER_TEXT_RE = re.compile(r"\([^)]*\)")
+
+
+def _document_text(name: str, oracle_text: Optional[str], card_faces: Optional[list], type_line: Optional[str]) -> str:
+    faces = card_faces or []
+    texts = [face.get("oracle_text") or "" for face in faces if face.get("oracle_text")] or [oracle_text or ""]
+    text = "\n".join(texts)
+    for face_name in {name, *name.split(" // "), *(face.get("name") for face in faces if face.get("name"))}:
+        if face_name:
+            text = text.replace(face_name, SELF_REFERENCE)
+            short_name = face_name.split(",")[0] # "Thalia, Guardian of Thraben" is also called "Thalia"
+            if short_name != face_name:
+                text = text.replace(short_name, SELF_REFERENCE)
+    text = _REMINDER_TEXT_RE.sub(" ", text)
+    return f"{text}\n{type_line or ''}".lower()
+
+
+def document_terms(text: str) -> Counter:
+    """Hashed unigram and bigram counts of one card document. Bigrams don't cross line breaks."""
+    counts: Counter = Counter()
+    for line in text.split("\n"):
+        tokens = _TOKEN_RE.findall(line)
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for gram in grams:
+            counts[zlib.crc32(gram.encode()) % HASH_BUCKETS] += 1
+    return counts
+
+
+class SimilarityIndex:
+    """Read-only view over one build of the similarity index. Rows are sorted by card name."""
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.version: str = meta["version"]
+        self.names = arrays["names"]                   # str, sorted, one row per card name
+        self.ids = arrays["ids"]                       # int32 CardDefinition.id of the newest printing
+        self.color_identity = arrays["color_identity"] # uint8 color bitmask
+        self.legal = arrays["legal"]                   # uint32 format bitmask
+        self.row_indptr = arrays["row_indptr"]         # CSR: row -> slice of row_terms/row_weights
+        self.row_terms = arrays["row_terms"]
+        self.row_weights = arrays["row_weights"]
+        self.term_ids = arrays["term_ids"]             # sorted hashed terms that have postings
+        self.term_indptr = arrays["term_indptr"]       # term -> slice of posting_rows/posting_weights
+        self.posting_rows = arrays["posting_rows"]
+        self.posting_weights = arrays["posting_weights"]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, directory: str, version: Optional[str] = None) -> "SimilarityIndex":
+        arrays, meta = index_store.load_arrays(directory, version)
+        return cls(arrays, meta)
+
+    def row_for_name(self, name: str) -> Optional[int]:
+        row = int(np.searchsorted(self.names, name))
+        return row if row < len(self.names) and self.names[row] == name else None
+
+    def scores_for_row(self, row: int) -> np.ndarray:
+        """Cosine similarity of every row against `row` (vectors are L2-normalized)."""
+        start, end = self.row_indptr[row], self.row_indptr[row + 1]
+        query_terms = self.row_terms[start:end]
+        query_weights = self.row_weights[start:end]
+        positions = np.searchsorted(self.term_ids, query_terms)
+        starts = self.term_indptr[positions]
+        lengths = self.term_indptr[positions + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(len(self), dtype=np.float32)
+        # Gather every posting of every query term at once: flat offsets into posting_rows.
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        weights = self.posting_weights[offsets] * np.repeat(query_weights, lengths)
+        return np.bincount(self.posting_rows[offsets], weights=weights, minlength=len(self)).astype(np.float32)
+
+    def most_similar(
+        self,
+        row: int,
+        limit: int = 20,
+        identity_mask: Optional[int] = None,
+        format_mask: int = 0,
+    ) -> List[Tuple[int, float]]:
+        """Top `limit` (card_definition_id, score) pairs for `row`, best first, excluding the card itself."""
+        scores = self.scores_for_row(row)
+        scores[row] = 0
+        if identity_mask is not None:
+            scores[(self.color_identity & np.uint8(card_features.ALL_COLORS_MASK ^ identity_mask)) != 0] = 0
+        if format_mask:
+            scores[(self.legal & np.uint32(format_mask)) != format_mask] = 0
+        limit = min(limit, int(np.count_nonzero(scores)))
+        if limit <= 0:
+            return []
+        top = np.argpartition(scores, -limit)[-limit:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(self.ids[i]), float(scores[i])) for i in top]
+
+
+_loaded_index: Optional[SimilarityIndex] = None
+
+
+def get_similarity_index() -> Optional[SimilarityIndex]:
+    """The current similarity index for this worker, or None if none has been built."""
+    global _loaded_index
+    version = index_store.current_version(settings.SIMILARITY_INDEX_DIR)
+    if version is None:
+        return None
+    if _loaded_index is None or _loaded_index.version != version:
+        _loaded_index = SimilarityIndex.load(settings.SIMILARITY_INDEX_DIR, version)
+    return _loaded_index
+
+
+async def build_similarity_index(db: AsyncSession, directory: Optional[str] = None) -> str:
+    """Vectorize the newest printing of every card name and write a new similarity index build."""
+    card = models.CardDefinition
+    query = (
+        select(card.id, card.name, card.oracle_text, card.card_faces, card.type_line, card.color_identity, card.legalities)
+        .order_by(card.name, card.released_at.desc().nulls_last(), card.id.desc())
+        .execution_options(yield_per=5000)
+    )
+    newest: Dict[str, tuple] = {}
+    result = await db.stream(query)
+    async for partition in result.partitions():
+        for row in partition:
+            if row.name not in newest:
+                newest[row.name] = row
+
+    names = sorted(newest)
+    documents = [
+        document_terms(_document_text(name, newest[name].oracle_text, newest[name].card_faces, newest[name].type_line))
+        for name in names
+    ]
+    document_frequency: Counter = Counter()
+    for terms in documents:
+        document_frequency.update(terms.keys())
+    max_df = max(1, int(MAX_DOCUMENT_FREQUENCY * len(names)))
+    idf = {
+        term: math.log((1 + len(names)) / (1 + df)) + 1
+        for term, df in document_frequency.items()
+        if df <= max_df
+    }
+
+    row_indptr = [0]
+    row_terms: List[int] = []
+    row_weights: List[float] = []
+    for terms in documents:
+        vector = sorted((term, (1 + math.log(count)) * idf[term]) for term, count in terms.items() if term in idf)
+        norm = math.sqrt(sum(weight * weight for _, weight in vector)) or 1.0
+        row_terms.extend(term for term, _ in vector)
+        row_weights.extend(weight / norm for _, weight in vector)
+        row_indptr.append(len(row_terms))
+
+    row_terms_array = np.array(row_terms, dtype=np.int32)
+    row_weights_array = np.array(row_weights, dtype=np.float32)
+    row_of_entry = np.repeat(np.arange(len(names), dtype=np.int32), np.diff(row_indptr))
+    # Transpose CSR -> inverted postings grouped by term
+    order = np.argsort(row_terms_array, kind="stable")
+    sorted_terms = row_terms_array[order]
+    term_ids, term_starts = np.unique(sorted_terms, return_index=True)
+
+    arrays = {
+        "names": np.array(names, dtype=str),
+        "ids": np.array([newest[name].id for name in names], dtype=np.int32),
+        "color_identity": np.array([card_features.color_mask(newest[name].color_identity) for name in names], dtype=np.uint8),
+        "legal": np.array([card_features.legality_mask(newest[name].legalities) for name in names], dtype=np.uint32),
+        "row_indptr": np.array(row_indptr, dtype=np.int64),
+        "row_terms": row_terms_array,
+        "row_weights": row_weights_array,
+        "term_ids": term_ids.astype(np.int32),
+        "term_indptr": np.append(term_starts, len(sorted_terms)).astype(np.int64),
+        "posting_rows": row_of_entry[order],
+        "posting_weights": row_weights_array[order],
+    }
+    meta = {
+        "format_version": INDEX_FORMAT_VERSION,
+        "rows": len(names),
+        "terms": len(term_ids),
+        "hash_buckets": HASH_BUCKETS,
+    }
+    return index_store.write_arrays(directory or settings.SIMILARITY_INDEX_DIR, arrays, meta)
@@ -0,0 +1,85 @@
+# app/sync.py
+"""
+Delta sync: what changed in a user's collection or decks since a version the client already has.
+
+user_collection_entries, decks and deck_entries carry a change_version. Writes leave it NULL
+(the column's onupdate), and crud.bump_collection_version / bump_deck_version, which every
+write already calls, stamp the user's NULL rows with the version they just took. Taking the
+version locks the user's row until commit, so versions are handed out in commit order: once a
+client has seen version N, no row can still turn up stamped N or lower. Deletes leave a
+tombstone in sync_tombstones, stamped the same way. The changes themselves are read by
+crud.get_collection_changes / get_deck_changes.
+"""
+from dataclasses import dataclass, field
+from typing import Iterable, List
+
+from sqlalchemy import insert, literal, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import models
+
+# sync_tombstones.entity values
+COLLECTION_ENTRY = "collection_entry"
+DECK = "deck"
+DECK_ENTRY = "deck_entry"
+
+
+@dataclass
+class CollectionChanges:
+    reset: bool # Everything is returned; the client should replace its copy
+    entries: List[models.UserCollectionEntry] = field(default_factory=list)
+    deleted_entry_ids: List[int] = field(default_factory=list)
+
+
+@dataclass
+class DeckChanges:
+    reset: bool
+    decks: List[models.Deck] = field(default_factory=list) # Entries not loaded; they are listed in `entries`
+    entries: List[models.DeckEntry] = field(default_factory=list)
+    deleted_deck_ids: List[int] = field(default_factory=list)
+    deleted_entry_ids: List[int] = field(default_factory=list)
+
+
+async def record_deletions(db: AsyncSession, user_id: int, entity: str, entity_ids: Iterable[int]) -> None:
+    """Leave tombstones for rows being deleted; the caller's version bump stamps them."""
+    rows = [{"user_id": user_id, "entity": entity, "entity_id": entity_id} for entity_id in entity_ids]
+    if rows:
+        await db.execute(insert(models.SyncTombstone.__table__), rows)
+
+
+async def _stamp(db: AsyncSession, *statements) -> None:
+    # One round trip: each UPDATE runs as a data-modifying CTE
+    ctes = [statement.returning(literal(1)).cte(f"stamped_{i}") for i, statement in enumerate(statements)]
+    await db.execute(select(literal(1)).add_cte(*ctes))
+
+
+async def stamp_collection(db: AsyncSession, user_id: int, version: int) -> None:
+    """Stamp the user's unstamped collection entries and tombstones with collection `version`."""
+    entries, tombstones = models.UserCollectionEntry.__table__, models.SyncTombstone.__table__
+    await _stamp(
+        db,
+        update(entries)
+        .where(entries.c.user_id == user_id, entries.c.change_version.is_(None))
+        .values(change_version=version, date_updated_in_collection=entries.c.date_updated_in_collection), # Not a user-visible change
+        update(tombstones)
+        .where(tombstones.c.user_id == user_id, tombstones.c.entity == COLLECTION_ENTRY, tombstones.c.change_version.is_(None))
+        .values(change_version=version),
+    )
+
+
+async def stamp_decks(db: AsyncSession, user_id: int, version: int) -> None:
+    """Stamp the user's unstamped decks, deck entries and their tombstones with deck list `version`."""
+    decks, entries, tombstones = models.Deck.__table__, models.DeckEntry.__table__, models.SyncTombstone.__table__
+    await _stamp(
+        db,
+        update(decks)
+        .where(decks.c.user_id == user_id, decks.c.change_version.is_(None))
+        .values(change_version=version, date_updated=decks.c.date_updated),
+        update(entries)
+        .where(entries.c.deck_id.in_(select(decks.c.id).where(decks.c.user_id == user_id)), entries.c.change_version.is_(None))
+        .values(change_version=version),
+        update(tombstones)
+        .where(tombstones.c.user_id == user_id, tombstones.c.entity.in_([DECK, DECK_ENTRY]), tombstones.c.change_version.is_(None))
+        .values(change_version=version),
+    )
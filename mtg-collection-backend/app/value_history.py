@@ -0,0 +1,118 @@
+# app/value_history.py
+"""
+Card price history and daily collection valuations, behind /collection/value-history.
+
+`record_prices` copies every printing's current Scryfall prices into card_price_history as one
+row of four integer-cent columns (about 50 bytes with its key) per printing per day, with one
+INSERT ... SELECT. The table is range-partitioned by year, so a year of ~100k printings is a
+couple of GB and old years can be detached or dropped whole. `snapshot_values` then values
+every user's collection at that day's prices with one grouped INSERT ... SELECT into
+user_collection_value_history, whose (user_id, value_date) primary key serves a chart as a
+single range scan. populate_cards.py runs both after each price refresh;
+scripts/snapshot_collection_values.py runs them on their own.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import BigInteger, Date, Integer, Numeric, cast, func, or_, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import models, schemas
+
+# card_price_history column -> Scryfall price key
+_PRICE_COLUMNS = {
+    "usd_cents": "usd",
+    "usd_foil_cents": "usd_foil",
+    "eur_cents": "eur",
+    "eur_foil_cents": "eur_foil",
+}
+# Value column -> price columns multiplied by quantity_normal and quantity_foil (foils at the foil price, like collection_summary)
+_VALUE_COLUMNS = {
+    "value_usd_cents": ("usd_cents", "usd_foil_cents"),
+    "value_eur_cents": ("eur_cents", "eur_foil_cents"),
+}
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+async def ensure_partition(db: AsyncSession, day: date) -> None:
+    """Create the card_price_history partition for `day`'s year if it doesn't exist yet."""
+    table = models.CardPriceHistory.__tablename__
+    await db.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {table}_{day.year} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{day.year}-01-01') TO ('{day.year + 1}-01-01')"
+    ))
+
+
+async def record_prices(db: AsyncSession, day: Optional[date] = None) -> int:
+    """Store every priced printing's current prices as `day`'s (default: today, UTC) history row. Returns the rows written."""
+    day = day or _today()
+    await ensure_partition(db, day)
+    card = models.CardDefinition
+    cents = {
+        name: func.round(card.prices[key].astext.cast(Numeric) * 100).cast(Integer)
+        for name, key in _PRICE_COLUMNS.items()
+    }
+    prices = (
+        select(card.id, cast(day, Date), *cents.values())
+        .filter(or_(*(card.prices[key].astext.isnot(None) for key in _PRICE_COLUMNS.values())))
+    )
+    upsert = pg_insert(models.CardPriceHistory).from_select(["card_definition_id", "price_date", *_PRICE_COLUMNS], prices)
+    upsert = upsert.on_conflict_do_update( # Re-running a day overwrites it
+        index_elements=[models.CardPriceHistory.card_definition_id, models.CardPriceHistory.price_date],
+        set_={name: upsert.excluded[name] for name in _PRICE_COLUMNS},
+    )
+    result = await db.execute(upsert)
+    return result.rowcount
+
+
+async def snapshot_values(db: AsyncSession, day: Optional[date] = None) -> int:
+    """
+    Value every user's collection at `day`'s recorded prices (default: today, UTC). Unpriced
+    printings count as 0 and users without cards get a 0 row. Returns the rows written.
+    """
+    day = day or _today()
+    entry, history = models.UserCollectionEntry, models.CardPriceHistory
+    totals = (
+        select(
+            models.User.id,
+            cast(day, Date),
+            *(
+                func.coalesce(func.sum(
+                    entry.quantity_normal.cast(BigInteger) * func.coalesce(getattr(history, normal), 0)
+                    + entry.quantity_foil.cast(BigInteger) * func.coalesce(getattr(history, foil), 0)
+                ), 0)
+                for normal, foil in _VALUE_COLUMNS.values()
+            ),
+        )
+        .select_from(models.User)
+        .outerjoin(entry, entry.user_id == models.User.id)
+        .outerjoin(history, (history.card_definition_id == entry.card_definition_id) & (history.price_date == day))
+        .group_by(models.User.id)
+    )
+    value_history = models.UserCollectionValueHistory
+    upsert = pg_insert(value_history).from_select(["user_id", "value_date", *_VALUE_COLUMNS], totals)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[value_history.user_id, value_history.value_date],
+        set_={name: upsert.excluded[name] for name in _VALUE_COLUMNS},
+    )
+    result = await db.execute(upsert)
+    return result.rowcount
+
+
+async def get_value_history(db: AsyncSession, user_id: int, days: int = 365) -> List[schemas.CollectionValuePoint]:
+    """The user's daily collection values over the last `days` days, oldest first."""
+    value_history = models.UserCollectionValueHistory
+    result = await db.execute(
+        select(value_history.value_date, value_history.value_usd_cents, value_history.value_eur_cents)
+        .filter(value_history.user_id == user_id, value_history.value_date > _today() - timedelta(days=days))
+        .order_by(value_history.value_date)
+    )
+    return [
+        schemas.CollectionValuePoint(date=row.value_date, value_usd=row.value_usd_cents / 100, value_eur=row.value_eur_cents / 100)
+        for row in result
+    ]
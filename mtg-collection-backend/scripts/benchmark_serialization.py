@@ -0,0 +1,128 @@
+# scripts/benchmark_serialization.py
+import sys
+import os
+import time
+from datetime import datetime, timezone
+from typing import List
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from starlette.requests import Request
+
+from app.main import app
+from app import models, schemas
+from app.serializers import ResponseSerializer, json_response, build_card_documents, CARD_DOCUMENT_VERSION, SLIM_CARD_FIELDS
+
+DECKS = 100
+ENTRIES_PER_DECK = 100
+ROUNDS = 5
+
+LEGALITIES = {fmt: "legal" for fmt in (
+    "standard", "future", "historic", "timeless", "gladiator", "pioneer", "explorer", "modern", "legacy", "pauper",
+    "vintage", "penny", "commander", "oathbreaker", "standardbrawl", "brawl", "alchemy", "paupercommander", "duel",
+    "oldschool", "premodern", "predh",
+)}
+
+def scryfall_image_uri(version: str, scryfall_id: str) -> str:
+    # Same shape as the URIs stored by populate_cards.py
+    return f"https://cards.scryfall.io/{version}/front/{scryfall_id[0]}/{scryfall_id[1]}/{scryfall_id}.jpg?1673147852"
+
+def make_request() -> Request:
+    return Request({
+        "type": "http", "app": app, "router": app.router, "scheme": "http", "server": ("localhost", 8000),
+        "path": "/decks/", "root_path": "", "query_string": b"", "headers": [(b"host", b"localhost:8000")],
+    })
+
+def make_decks() -> List[models.Deck]:
+    now = datetime.now(timezone.utc)
+    decks = []
+    for deck_id in range(DECKS):
+        deck = models.Deck(id=deck_id, user_id=1, name=f"Deck {deck_id}", format="commander", date_created=now, date_updated=now)
+        entries = []
+        for n in range(ENTRIES_PER_DECK):
+            card_id = deck_id * ENTRIES_PER_DECK + n
+            scryfall_id = f"{card_id:08d}-5f1b-4c2e-9d3a-7e6b2c1a0f4d"
+            card = models.CardDefinition(
+                id=card_id, scryfall_id=scryfall_id, name=f"Card {card_id}",
+                set_code="cmr", collector_number=str(n), legalities=LEGALITIES, type_line="Creature — Elf Druid",
+                image_uri_small=scryfall_image_uri("small", scryfall_id), image_uri_normal=scryfall_image_uri("normal", scryfall_id),
+                image_uri_large=scryfall_image_uri("large", scryfall_id), image_uri_art_crop=scryfall_image_uri("art_crop", scryfall_id),
+                image_uri_border_crop=scryfall_image_uri("border_crop", scryfall_id), date_added=now, date_updated=now,
+                # The old path checks the blobs themselves; a few bytes stand in for stored images
+                image_data_small=b"x", image_data_normal=b"x", image_data_large=b"x",
+            )
+            card.has_image_small = card.has_image_normal = card.has_image_large = True
+            entries.append(models.DeckEntry(id=card_id, deck_id=deck_id, quantity=1, is_commander=False, is_sideboard=False, card_definition=card))
+        deck.deck_entries = entries
+        decks.append(deck)
+    return decks
+
+def serialize_with_from_orm(request: Request, db_decks: List[models.Deck]) -> bytes:
+    # What read_user_decks used to do, followed by FastAPI's response_model validation and encoding
+    response_decks = []
+    for db_deck in db_decks:
+        pydantic_deck = schemas.Deck.from_orm(db_deck)
+        for pydantic_deck_entry in pydantic_deck.deck_entries:
+            original_db_deck_entry = next((de for de in db_deck.deck_entries if de.id == pydantic_deck_entry.id), None)
+            if original_db_deck_entry and original_db_deck_entry.card_definition:
+                db_card_def = original_db_deck_entry.card_definition
+                if db_card_def.image_data_small:
+                    pydantic_deck_entry.card_definition.local_image_url_small = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='small'))
+                if db_card_def.image_data_normal:
+                    pydantic_deck_entry.card_definition.local_image_url_normal = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='normal'))
+                if db_card_def.image_data_large:
+                    pydantic_deck_entry.card_definition.local_image_url_large = str(request.url_for('get_card_image_data', scryfall_id=db_card_def.scryfall_id, size='large'))
+        response_decks.append(pydantic_deck)
+    validated = TypeAdapter(List[schemas.Deck]).validate_python(jsonable_encoder(response_decks))
+    return JSONResponse(content=jsonable_encoder(validated)).body
+
+def serialize_with_serializer(request: Request, db_decks: List[models.Deck]) -> bytes:
+    serializer = ResponseSerializer(request)
+    return json_response([serializer.deck(db_deck) for db_deck in db_decks]).body
+
+def serialize_slim(request: Request, db_decks: List[models.Deck]) -> bytes:
+    serializer = ResponseSerializer(request, SLIM_CARD_FIELDS)
+    return json_response([serializer.deck(db_deck) for db_deck in db_decks]).body
+
+def attach_card_documents(db_decks: List[models.Deck]) -> None:
+    # As if the query had loaded card_definitions.json_full/json_slim (see serializers.card_columns)
+    for db_deck in db_decks:
+        for db_entry in db_deck.deck_entries:
+            card = db_entry.card_definition
+            documents = build_card_documents(card)
+            card.json_full, card.json_slim, card.json_version = documents["json_full"], documents["json_slim"], CARD_DOCUMENT_VERSION
+
+def bench(label: str, fn, request: Request, db_decks: List[models.Deck]) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        body = fn(request, db_decks)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<28} {best * 1000:8.1f} ms  ({len(body) / 1024:.0f} KiB)")
+    return best
+
+def main():
+    request = make_request()
+    db_decks = make_decks()
+    print(f"{DECKS} decks x {ENTRIES_PER_DECK} entries, best of {ROUNDS}")
+    old = bench("from_orm + url_for", serialize_with_from_orm, request, db_decks)
+    new = bench("ResponseSerializer + orjson", serialize_with_serializer, request, db_decks)
+    print(f"Speedup: {old / new:.1f}x")
+    bench("ResponseSerializer view=slim", serialize_slim, request, db_decks)
+
+    full_body, slim_body = serialize_with_serializer(request, db_decks), serialize_slim(request, db_decks)
+    attach_card_documents(db_decks)
+    assert serialize_with_serializer(request, db_decks) == full_body and serialize_slim(request, db_decks) == slim_body
+    stored = bench("Stored card documents", serialize_with_serializer, request, db_decks)
+    print(f"Speedup over ResponseSerializer: {new / stored:.1f}x")
+    bench("Stored card documents slim", serialize_slim, request, db_decks)
+
+if __name__ == "__main__":
+    main()
+# Serialization only: no database is needed, the ORM objects are built in memory.
+# Usage: python scripts/benchmark_serialization.py
@@ -0,0 +1,22 @@
+# scripts/build_card_index.py
+import asyncio
+import sys
+import os
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app.database import AsyncSessionLocal
+from app.card_index import build_card_index
+from app.core.config import settings
+
+async def main():
+    async with AsyncSessionLocal() as session:
+        version = await build_card_index(session)
+    print(f"Card index build {version} written to {settings.CARD_INDEX_DIR}.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
+# Rebuilds the memory-mapped card index without re-downloading Scryfall data.
+# Running API workers pick up the new build on their next filter request.
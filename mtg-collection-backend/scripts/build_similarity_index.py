@@ -0,0 +1,22 @@
+# scripts/build_similarity_index.py
+import asyncio
+import sys
+import os
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app.database import AsyncSessionLocal
+from app.similarity import build_similarity_index
+from app.core.config import settings
+
+async def main():
+    async with AsyncSessionLocal() as session:
+        version = await build_similarity_index(session)
+    print(f"Similarity index build {version} written to {settings.SIMILARITY_INDEX_DIR}.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
+# Rebuilds the TF-IDF "cards like this" index from the card definitions already in the database.
+# Running API workers pick up the new build on their next /cards/{id}/similar request.
@@ -20,6 +20,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import AsyncSessionLocal, Base, engine # Adjust imports as needed
 from app.models import CardDefinition as CardDefinitionModel
 from app.crud import get_card_definition_by_scryfall_id # Import the CRUD function
+from app.card_index import build_card_index
+from app.similarity import build_similarity_index
+from app.crud import refresh_card_documents, refresh_card_features
+from app import collection_summary, value_history
 
 
 # URL for a Scryfall bulk data file (e.g., Oracle Cards or All Cards)
@@ -105,6 +109,7 @@ async def process_card_data(db: AsyncSession, card_data: dict, image_client: htt
         card_to_process.image_uri_art_crop = image_uris.get("art_crop")
         card_to_process.image_uri_border_crop = image_uris.get("border_crop")
         # SQLAlchemy's onupdate mechanism should handle 'date_updated'
+        card_to_process.json_version = None # Stored JSON documents are rebuilt before the next commit
 
     else: # Card does not exist, create a new one
         print(f"Card {scryfall_id} ({card_name_from_bulk}) not found. Creating new record...")
@@ -300,6 +305,7 @@ async def main_populate():
 
                     if processed_count_since_last_commit >= commit_batch_size:
                         print(f"Committing {processed_count_since_last_commit} records...")
+                        await refresh_card_documents(session, stale_only=True)
                         await session.commit()
                         print("Batch committed.")
                         processed_count_since_last_commit = 0
@@ -309,6 +315,7 @@ async def main_populate():
                 # due to the 'async with AsyncSessionLocal() as session:' context manager.
                 if processed_count_since_last_commit > 0: # Commit any remaining cards
                     print(f"Committing final {processed_count_since_last_commit} records...")
+                    await refresh_card_documents(session, stale_only=True)
                     await session.commit()
                     print("Final commit complete.")
             except Exception as e:
@@ -316,6 +323,34 @@ async def main_populate():
                 await session.rollback()
             # 'finally: await session.close()' is not needed here as the context manager handles it.
 
+    # Recompute derived feature columns (pips, types, mana flags) for every card
+    async with AsyncSessionLocal() as session:
+        feature_count = await refresh_card_features(session)
+        await session.commit()
+        print(f"Card features refreshed for {feature_count} cards.")
+
+    # Card prices changed, so revalue every user's collection summary
+    async with AsyncSessionLocal() as session:
+        summary_count = await collection_summary.recompute(session)
+        await session.commit()
+        print(f"Collection summaries recomputed for {summary_count} users.")
+
+    # Keep today's prices and every user's collection value at them for the value history chart
+    async with AsyncSessionLocal() as session:
+        price_count = await value_history.record_prices(session)
+        value_count = await value_history.snapshot_values(session)
+        await session.commit()
+        print(f"Price history recorded for {price_count} cards; collection values snapshot for {value_count} users.")
+
+    # Rebuild the memory-mapped card index so API workers filter against fresh data
+    async with AsyncSessionLocal() as session:
+        index_version = await build_card_index(session)
+        print(f"Card index rebuilt (build {index_version}).")
+
+    # Rebuild the TF-IDF vectors behind /cards/{id}/similar
+    async with AsyncSessionLocal() as session:
+        similarity_version = await build_similarity_index(session)
+        print(f"Similarity index rebuilt (build {similarity_version}).")
 
     print("Card population process finished.")
 
@@ -0,0 +1,25 @@
+# scripts/refresh_card_documents.py
+import asyncio
+import sys
+import os
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app.database import AsyncSessionLocal
+from app.crud import refresh_card_documents
+
+async def main():
+    stale_only = "--stale-only" in sys.argv[1:]
+    async with AsyncSessionLocal() as session:
+        count = await refresh_card_documents(session, stale_only=stale_only)
+        await session.commit()
+    print(f"Stored JSON documents rebuilt for {count} cards.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
+# Rebuilds card_definitions.json_full/json_slim, e.g. right after the add_card_json_documents
+# migration or after changing the card fields in app/serializers.py. With --stale-only, only
+# cards without documents are built. Restart the API afterwards: it serves the stored
+# documents only if all of them were current at startup.
@@ -0,0 +1,22 @@
+# scripts/refresh_card_features.py
+import asyncio
+import sys
+import os
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app.database import AsyncSessionLocal
+from app.crud import refresh_card_features
+
+async def main():
+    async with AsyncSessionLocal() as session:
+        count = await refresh_card_features(session)
+        await session.commit()
+    print(f"Card features refreshed for {count} cards.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
+# Recomputes the card_features table from card_definitions, e.g. right after the
+# add_card_features_table migration or after changing app/card_features.py.
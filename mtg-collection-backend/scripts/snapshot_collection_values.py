@@ -0,0 +1,30 @@
+# scripts/snapshot_collection_values.py
+import asyncio
+import sys
+import os
+from datetime import date
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app.database import AsyncSessionLocal
+from app import value_history
+
+async def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    day = date.fromisoformat(args[0]) if args else None
+    async with AsyncSessionLocal() as session:
+        if "--values-only" not in sys.argv[1:]:
+            price_count = await value_history.record_prices(session, day)
+            print(f"Price history recorded for {price_count} cards.")
+        value_count = await value_history.snapshot_values(session, day)
+        await session.commit()
+    print(f"Collection values snapshot for {value_count} users.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
+# Records today's card prices into card_price_history and values every user's collection at
+# them, like the end of populate_cards.py; run it daily (e.g. from cron) when prices are
+# refreshed some other way. Pass a date (YYYY-MM-DD) to write that day instead. Prices are
+# always the current ones; with --values-only, the day's already recorded prices are reused.
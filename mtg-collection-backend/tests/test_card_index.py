@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from app import card_features
+from app.card_index import CardIndex, filters_from_query
+
+
+def _index(colors) -> CardIndex:
+    count = len(colors)
+    arrays = {
+        "ids": np.arange(1, count + 1, dtype=np.int32),
+        "cmc": np.zeros(count, dtype=np.float32),
+        "colors": np.array([card_features.color_mask(c) for c in colors], dtype=np.uint8),
+        "color_identity": np.array([card_features.color_mask(c) for c in colors], dtype=np.uint8),
+        "legal": np.zeros(count, dtype=np.uint32),
+        "types": np.zeros(count, dtype=np.uint16),
+        "rarity": np.zeros(count, dtype=np.uint8),
+    }
+    return CardIndex(arrays, {"version": "test"})
+
+
+INDEX_COLORS = [[], ["R"], ["U", "R"], []]
+
+
+def test_colorless_colors_filter_matches_only_colorless_cards():
+    ids = _index(INDEX_COLORS).filter_ids(**filters_from_query(colors="C"))
+    assert ids.tolist() == [1, 4]
+
+
+def test_colors_filter_requires_all_colors():
+    ids = _index(INDEX_COLORS).filter_ids(**filters_from_query(colors="r"))
+    assert ids.tolist() == [2, 3]
+
+
+def test_colorless_cannot_be_combined_with_colors():
+    with pytest.raises(ValueError, match="Colorless"):
+        filters_from_query(colors="CR")
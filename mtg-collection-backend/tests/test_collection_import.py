@@ -0,0 +1,32 @@
+import csv
+import io
+
+import pytest
+
+from app import schemas
+from app.collection_import import PROFILES_BY_FORMAT, _read_rows, _RowParser
+
+HEADERS = ["Count", "Name", "Edition", "Collector Number", "Foil"]
+
+
+def _parser() -> _RowParser:
+    return _RowParser(PROFILES_BY_FORMAT[schemas.CollectionImportFormat.moxfield], HEADERS)
+
+
+@pytest.mark.parametrize("count, expected", [("3", 3), ("2.0", 2), (str(schemas.MAX_ENTRY_QUANTITY), schemas.MAX_ENTRY_QUANTITY)])
+def test_valid_quantities(count, expected):
+    row = _parser().parse(2, [count, "Lightning Bolt", "lea", "161", ""])
+    assert row.error is None and row.quantity_normal == expected
+
+
+@pytest.mark.parametrize("count", ["1.9", "-1", str(schemas.MAX_ENTRY_QUANTITY + 1), "1e12", "inf", "many"])
+def test_invalid_quantities_are_row_errors(count):
+    row = _parser().parse(2, [count, "Lightning Bolt", "lea", "161", ""])
+    assert row.error and row.error.startswith("Invalid quantity")
+
+
+def test_malformed_csv_raises_value_error():
+    oversized = "x" * (csv.field_size_limit() + 1)
+    reader = csv.reader(io.StringIO(f"1,Lightning Bolt,lea,161,\n1,{oversized},lea,161,\n"))
+    with pytest.raises(ValueError, match="Malformed CSV"):
+        _read_rows(reader, _parser(), 10)
@@ -0,0 +1,56 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import crud, models
+
+# A throwaway PostgreSQL database, e.g. postgresql+asyncpg://localhost/mtg_test; its tables are created if missing
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+def _run_in_rolled_back_session(test):
+    """Run `test(db)` in a session whose changes are rolled back afterwards."""
+    async def run():
+        engine = create_async_engine(TEST_DATABASE_URL)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(models.Base.metadata.create_all)
+            async with engine.connect() as conn:
+                transaction = await conn.begin()
+                try:
+                    await test(AsyncSession(bind=conn, expire_on_commit=False))
+                finally:
+                    await transaction.rollback()
+        finally:
+            await engine.dispose()
+    asyncio.run(run())
+
+
+def _printing(scryfall_id: str, usd=None) -> models.CardDefinition:
+    return models.CardDefinition(
+        scryfall_id=scryfall_id, name="Test Collapsed Bolt", set_code="tst", collector_number=scryfall_id[-1],
+        prices={"usd": usd} if usd is not None else {},
+    )
+
+
+def test_cheapest_printing_is_none_when_no_printing_is_priced():
+    async def test(db):
+        db.add_all([_printing("test-collapsed-1"), _printing("test-collapsed-2")])
+        await db.flush()
+        rows = await crud.get_collapsed_card_definitions(db, name="Test Collapsed Bolt")
+        assert [(printing_count, cheapest_id) for _, printing_count, cheapest_id in rows] == [(2, None)]
+    _run_in_rolled_back_session(test)
+
+
+def test_cheapest_printing_is_the_lowest_priced_one():
+    async def test(db):
+        cheap = _printing("test-collapsed-2", usd="0.25")
+        db.add_all([_printing("test-collapsed-1"), cheap, _printing("test-collapsed-3", usd="1.50")])
+        await db.flush()
+        rows = await crud.get_collapsed_card_definitions(db, name="Test Collapsed Bolt")
+        assert [cheapest_id for _, _, cheapest_id in rows] == [cheap.id]
+    _run_in_rolled_back_session(test)
@@ -0,0 +1,58 @@
+import pytest
+from pydantic import ValidationError
+
+from app import schemas
+from app.deck_operations import _DeckState, _Entry
+
+CARD_IDS = {"bolt": 1, "island": 2}
+
+
+def _op(**fields) -> schemas.DeckEntryOperation:
+    return schemas.DeckEntryOperation(**fields)
+
+
+def test_set_sideboard_by_card_moves_main_deck_entry_to_sideboard():
+    state = _DeckState([_Entry(id=10, card_definition_id=1, quantity=3, is_commander=False, is_sideboard=False)])
+    state.apply(_op(action="set_sideboard", card_definition_scryfall_id="bolt", is_sideboard=True), CARD_IDS)
+    entry = state.by_id[10]
+    assert entry.is_sideboard and entry.quantity == 3 and not entry.deleted
+
+
+def test_set_sideboard_by_card_moves_sideboard_entry_to_main_deck():
+    state = _DeckState([_Entry(id=10, card_definition_id=1, quantity=2, is_commander=False, is_sideboard=True)])
+    state.apply(_op(action="set_sideboard", card_definition_scryfall_id="bolt", is_sideboard=False), CARD_IDS)
+    entry = state.by_id[10]
+    assert not entry.is_sideboard and entry.quantity == 2 and not entry.deleted
+
+
+def test_set_sideboard_by_card_merges_into_existing_entry():
+    state = _DeckState([
+        _Entry(id=10, card_definition_id=1, quantity=3, is_commander=False, is_sideboard=False),
+        _Entry(id=11, card_definition_id=1, quantity=1, is_commander=False, is_sideboard=True),
+    ])
+    state.apply(_op(action="set_sideboard", card_definition_scryfall_id="bolt", is_sideboard=True), CARD_IDS)
+    assert state.by_id[10].deleted
+    assert state.by_id[11].quantity == 4
+
+
+def test_set_sideboard_by_card_not_on_source_board():
+    state = _DeckState([_Entry(id=10, card_definition_id=1, quantity=3, is_commander=False, is_sideboard=True)])
+    with pytest.raises(ValueError, match="not in this deck"):
+        state.apply(_op(action="set_sideboard", card_definition_scryfall_id="bolt", is_sideboard=True), CARD_IDS)
+
+
+def test_remove_without_quantity_removes_entry():
+    state = _DeckState([_Entry(id=10, card_definition_id=2, quantity=5, is_commander=False, is_sideboard=False)])
+    state.apply(_op(action="remove", entry_id=10), CARD_IDS)
+    assert state.by_id[10].deleted
+
+
+def test_remove_with_quantity_decrements():
+    state = _DeckState([_Entry(id=10, card_definition_id=2, quantity=5, is_commander=False, is_sideboard=False)])
+    state.apply(_op(action="remove", entry_id=10, quantity=2), CARD_IDS)
+    assert state.by_id[10].quantity == 3 and not state.by_id[10].deleted
+
+
+def test_remove_with_zero_quantity_is_rejected():
+    with pytest.raises(ValidationError):
+        _op(action="remove", entry_id=10, quantity=0)
@@ -0,0 +1,14 @@
+from app import schemas
+from app.decklist import parse_decklist
+
+
+def test_parse_decklist_rejects_oversized_quantity():
+    lines, problems = parse_decklist("4 Lightning Bolt\n99999999999 Island\n")
+    assert [line.name for line in lines] == ["Lightning Bolt"]
+    assert len(problems) == 1 and problems[0].line == 2
+    assert str(schemas.MAX_ENTRY_QUANTITY) in problems[0].reason
+
+
+def test_parse_decklist_accepts_maximum_quantity():
+    lines, problems = parse_decklist(f"{schemas.MAX_ENTRY_QUANTITY} Island\n")
+    assert not problems and lines[0].quantity == schemas.MAX_ENTRY_QUANTITY
@@ -0,0 +1,12 @@
+from app.exporters import content_disposition
+
+
+def test_content_disposition_non_ascii_name_is_latin1_safe():
+    header = content_disposition("Ü デッキ", "arena")
+    header.encode("latin-1") # Starlette encodes headers as latin-1
+    assert 'filename="_ ___.txt"' in header
+    assert "filename*=UTF-8''%C3%9C%20%E3%83%87%E3%83%83%E3%82%AD.txt" in header
+
+
+def test_content_disposition_ascii_name():
+    assert content_disposition("My Deck", "csv") == "attachment; filename=\"My Deck.csv\"; filename*=UTF-8''My%20Deck.csv"
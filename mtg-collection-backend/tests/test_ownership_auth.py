@@ -0,0 +1,22 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.main import _user_for_ownership
+
+
+def test_anonymous_read_ignores_invalid_token():
+    assert asyncio.run(_user_for_ownership(False, "expired.or.invalid", db=None)) is None
+
+
+def test_include_owned_requires_token():
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(_user_for_ownership(True, None, db=None))
+    assert raised.value.status_code == 401
+
+
+def test_include_owned_rejects_invalid_token():
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(_user_for_ownership(True, "not-a-jwt", db=None))
+    assert raised.value.status_code == 401
@@ -0,0 +1,41 @@
+import orjson
+import pytest
+from starlette.requests import Request
+
+from app import models, serializers
+from app.main import app
+from app.serializers import CARD_DOCUMENT_VERSION, FULL_CARD_FIELDS, ResponseSerializer, StaleCardDocumentError
+
+
+@pytest.fixture
+def serializer():
+    request = Request({"type": "http", "app": app, "router": app.router, "scheme": "http", "server": ("testserver", 80),
+                       "path": "/", "root_path": "", "query_string": b"", "headers": []})
+    return ResponseSerializer(request, FULL_CARD_FIELDS)
+
+
+def _document_only_card(document, version) -> models.CardDefinition:
+    # As loaded through card_columns(FULL_CARD_FIELDS) with documents enabled
+    card = models.CardDefinition(id=7, scryfall_id="abc", json_full=document, json_version=version)
+    for size in serializers.IMAGE_SIZES:
+        setattr(card, f"has_image_{size}", False)
+    return card
+
+
+def test_current_document_is_spliced(serializer):
+    card = serializer.card(_document_only_card(b'{"id":7}', CARD_DOCUMENT_VERSION))
+    assert orjson.loads(orjson.dumps(card))["id"] == 7
+
+
+@pytest.mark.parametrize("document, version", [(None, None), (b'{"id":7}', CARD_DOCUMENT_VERSION + 1)])
+def test_missing_or_stale_document_raises(serializer, document, version):
+    with pytest.raises(StaleCardDocumentError, match="Card 7"):
+        serializer.card(_document_only_card(document, version))
+
+
+def test_fully_loaded_card_without_document_falls_back(serializer):
+    card = models.CardDefinition(**{name: None for name in serializer.card_attributes})
+    card.id, card.scryfall_id = 7, "abc"
+    for size in serializers.IMAGE_SIZES:
+        setattr(card, f"has_image_{size}", False)
+    assert serializer.card(card)["id"] == 7
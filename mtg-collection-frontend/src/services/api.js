@@ -45,11 +45,25 @@ export default {
     return apiClient.post('/auth/token', credentials, { headers: {'Content-Type': 'application/x-www-form-urlencoded'} });
   },
 
-  async searchCards(query) {
+  async searchCards(query, { includeOwned = false } = {}) {
     // The actual endpoint might be /api/cards/search, /api/v1/cards/search or similar,
     // ensure this matches your backend route for searching cards from the main database.
     // Example: GET /api/cards/search?name=:cardName
-    return apiClient.get(`/cards/search?name=${encodeURIComponent(query)}&lang=en`);
+    // includeOwned (logged-in users only) adds an `owned` object with quantities and deck usage to each card.
+    const owned = includeOwned ? '&include_owned=true' : '';
+    return apiClient.get(`/cards/search?name=${encodeURIComponent(query)}&lang=en${owned}`);
+  },
+
+  async resolveCards(lines) {
+    // Resolve many typed card names to printings in one request.
+    // lines: [{ name: string, set_code?: string, collector_number?: string }]
+    return apiClient.post('/cards/resolve', { lines });
+  },
+
+  async getCardDefinitions({ ids = [], scryfallIds = [], view = 'full' } = {}) {
+    // Up to 500 ids and/or 500 Scryfall IDs in one request instead of one request per card.
+    // Resolves to { cards, missing_ids, missing_scryfall_ids }; cards keep the request order.
+    return apiClient.post('/card-definitions/batch', { ids, scryfall_ids: scryfallIds }, { params: { view } });
   },
 
   async getUserCollection() {
@@ -65,6 +79,51 @@ export default {
     return apiClient.post('/collection/cards/', payload); // Matches backend route
   },
 
+  async applyCollectionBatch(operations) {
+    // Many collection changes in one request.
+    // operations: [{ action: 'add' | 'set' | 'remove', card_definition_scryfall_id?: string, name?: string,
+    //   set_code?: string, collector_number?: string, quantity_normal?: int, quantity_foil?: int, condition?, language?, notes? }]
+    return apiClient.post('/collection/cards/batch', { operations });
+  },
+
+  async importCollectionCsv(file, format = 'auto') {
+    // Upload a Moxfield, Deckbox, TCGplayer or ManaBox collection CSV (or this API's own export).
+    // Resolves to a report with imported counts and unresolved rows.
+    const formData = new FormData();
+    formData.append('file', file);
+    return apiClient.post('/collection/import', formData, { params: { format }, headers: { 'Content-Type': 'multipart/form-data' } });
+  },
+
+  async getCollectionImportProgress() {
+    return apiClient.get('/collection/import/progress');
+  },
+
+  async getCollectionSummary() {
+    // Copies, entries and USD/EUR value of the whole collection
+    return apiClient.get('/collection/summary');
+  },
+
+  async getCollectionStats() {
+    // Copies and entries by color identity, rarity, set, type and mana value
+    return apiClient.get('/collection/stats');
+  },
+
+  async getCollectionValueHistory(days = 365) {
+    // Daily [{ date, value_usd, value_eur }], oldest first, for the value chart
+    return apiClient.get('/collection/value-history', { params: { days } });
+  },
+
+  async syncCollection(since = 0) {
+    // Entries changed/deleted since a previous sync's version: { version, reset, entries, deleted_entry_ids }.
+    // Keep version for the next call; reset means replace the local copy.
+    return apiClient.get('/sync/collection', { params: { since } });
+  },
+
+  async exportCollection(format = 'csv') {
+    // format: 'csv' | 'ndjson' | 'text' | 'moxfield'. Resolves to a Blob for download.
+    return apiClient.get('/collection/export', { params: { format }, responseType: 'blob' });
+  },
+
   async removeCardFromCollection(cardId) {
     // Adjust endpoint as needed for your backend
     return apiClient.delete(`/collection/cards/${cardId}`);
@@ -76,19 +135,65 @@ export default {
     return apiClient.post('/decks/', deckData);
   },
 
+  async importDeck(deckData) {
+    // Create a deck from pasted MTGO/Arena/Moxfield text in one request.
+    // deckData: { name: string, format?: string, description?: string, text: string, skip_invalid?: bool }
+    // Fails with 400 and detail.problems when a line can't be read, resolved or is not legal.
+    return apiClient.post('/decks/import', deckData);
+  },
+
   async getUserDecks() {
     return apiClient.get('/decks/');
   },
 
+  async getDeckSummaries() {
+    // Name, format, card counts, commanders and color identity only; no deck entries.
+    // Use getDeckDetails(deckId) for the full deck.
+    return apiClient.get('/decks/summary');
+  },
+
   async getDeckDetails(deckId) {
     return apiClient.get(`/decks/${deckId}/`);
   },
 
+  async getMissingCardsByDeck() {
+    // For every deck: cards the collection lacks (any printing), shortfall and cheapest cost
+    return apiClient.get('/decks/missing');
+  },
+
+  async syncDecks(since = 0) {
+    // Like syncCollection: { version, reset, decks, entries, deleted_deck_ids, deleted_entry_ids }
+    return apiClient.get('/sync/decks', { params: { since } });
+  },
+
+  async validateDeck(deckId, format = null) {
+    // Every format violation of the deck (its own format unless one is given)
+    return apiClient.get(`/decks/${deckId}/validate`, { params: format ? { format } : {} });
+  },
+
+  async getDeckAnalytics(deckId) {
+    // Mana curve, pips, type counts, land/ramp counts and off-identity cards for the main deck
+    return apiClient.get(`/decks/${deckId}/analytics`);
+  },
+
+  async exportDeck(deckId, format = 'arena') {
+    // format: 'csv' | 'ndjson' | 'arena' | 'mtgo' | 'moxfield'. Resolves to a Blob for download.
+    return apiClient.get(`/decks/${deckId}/export`, { params: { format }, responseType: 'blob' });
+  },
+
   async addCardToDeck(deckId, cardData) {
     // cardData: { card_definition_scryfall_id: string, quantity: int, is_commander?: bool, is_sideboard?: bool }
     return apiClient.post(`/decks/${deckId}/cards/`, cardData);
   },
 
+  async patchDeckEntries(deckId, operations, expectedVersion = null) {
+    // Apply several deck edits atomically in one request.
+    // operations: [{ action: 'add' | 'remove' | 'set_quantity' | 'set_commander' | 'set_sideboard',
+    //   entry_id?: int, card_definition_scryfall_id?: string, quantity?: int, is_commander?: bool, is_sideboard?: bool }]
+    // Responds with the changed entries, removed entry ids and the new deck version (409 if expectedVersion is stale).
+    return apiClient.patch(`/decks/${deckId}/entries`, { operations, expected_version: expectedVersion });
+  },
+
   async register(userData) {
     // userData: { username, email, password }
     return apiClient.post('/users/', userData);